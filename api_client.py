@@ -1,4 +1,5 @@
 from openai import OpenAI
+from llm_cache import cached_chat
 
 class DeepSeekClient:
     """DeepSeek API客户端封装"""
@@ -13,22 +14,19 @@ class DeepSeekClient:
             base_url="https://api.deepseek.com"
         )
     
-    async def chat_completion(self, messages: list, response_format: dict = None, **kwargs):
+    async def chat_completion(self, messages: list, response_format: dict = None, cache: bool = False, **kwargs):
         """统一DeepSeek聊天API调用
         Args:
             messages: 消息列表
             response_format: 响应格式要求
+            cache: 是否使用响应缓存(默认不使用)，只有相同输入应得到相同结果的确定性分析/JSON调用传True，
+                创作类生成每次都应得到新的内容
             **kwargs: 其他API参数
         Returns:
             API响应内容
         """
-        params = {
-            "model": "deepseek-chat",
-            "messages": messages,
-            **kwargs
-        }
+        model = kwargs.pop("model", "deepseek-chat")
         if response_format:
-            params["response_format"] = response_format
+            kwargs["response_format"] = response_format
             
-        response = self.client.chat.completions.create(**params)
-        return response.choices[0].message.content
+        return cached_chat(self.client, model, messages, use_cache=cache, **kwargs)
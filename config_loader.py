@@ -44,7 +44,23 @@ class ConfigLoader:
                 "ollama": {
                     "host": os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434"),
                     "timeout": int(os.getenv("OLLAMA_TIMEOUT", "300")),
-                    "vision_model": os.getenv("OLLAMA_VISION_MODEL", "qwen2.5vl:3b")
+                    "vision_model": os.getenv("OLLAMA_VISION_MODEL", "qwen2.5vl:3b"),
+                    "num_thread": int(os.getenv("OLLAMA_NUM_THREAD", "2")),
+                    "max_in_flight": int(os.getenv("OLLAMA_MAX_IN_FLIGHT", "2")),
+                    "vision_cache": {
+                        "enabled": os.getenv("VISION_CACHE_ENABLED", "1") == "1",
+                        "path": os.getenv("VISION_CACHE_PATH", "video/cache/vision.sqlite"),
+                        "max_entries": int(os.getenv("VISION_CACHE_MAX_ENTRIES", "50000"))
+                    }
+                },
+                "asr": {
+                    "enabled": os.getenv("ASR_SERVER_ENABLED", "1") == "1",
+                    "host": os.getenv("ASR_SERVER_HOST", "127.0.0.1"),
+                    "port": int(os.getenv("ASR_SERVER_PORT", "8765")),
+                    "authkey": os.getenv("ASR_SERVER_AUTHKEY", ""),
+                    "device": os.getenv("ASR_DEVICE", "cpu"),
+                    "compute_type": os.getenv("ASR_COMPUTE_TYPE", "int8"),
+                    "max_jobs": int(os.getenv("ASR_MAX_JOBS", "1"))
                 }
             },
             "tts": {
@@ -56,6 +72,101 @@ class ConfigLoader:
                 "default_chat_model": os.getenv("DEFAULT_CHAT_MODEL", "deepseek-chat"),
                 "default_reasoner_model": os.getenv("DEFAULT_REASONER_MODEL", "deepseek-reasoner")
             },
+            "video": {
+                "asr_mode": os.getenv("VIDEO_ASR_MODE", "stream"),
+                "stream_window_seconds": int(os.getenv("VIDEO_STREAM_WINDOW_SECONDS", "600")),
+                "shard_seconds": int(os.getenv("VIDEO_SHARD_SECONDS", "600")),
+                "shard_workers": int(os.getenv("VIDEO_SHARD_WORKERS", "0")),
+                "shard_threads_per_worker": int(os.getenv("VIDEO_SHARD_THREADS_PER_WORKER", "4")),
+                "chunk_workers": int(os.getenv("VIDEO_CHUNK_WORKERS", "3")),
+                "monitor": {
+                    "execution": os.getenv("MONITOR_EXECUTION", "process"),
+                    "workers": {
+                        "asr": int(os.getenv("MONITOR_ASR_WORKERS", "1")),
+                        "llm": int(os.getenv("MONITOR_LLM_WORKERS", "2")),
+                        "vision": int(os.getenv("MONITOR_VISION_WORKERS", "1"))
+                    },
+                    "debounce": {
+                        "window_seconds": float(os.getenv("MONITOR_DEBOUNCE_WINDOW_SECONDS", "2")),
+                        "stable_seconds": float(os.getenv("MONITOR_STABLE_SECONDS", "5")),
+                        "full_scan_minutes": float(os.getenv("MONITOR_FULL_SCAN_MINUTES", "60"))
+                    },
+                    "log": {
+                        "level": os.getenv("MONITOR_LOG_LEVEL", "INFO"),
+                        "max_queue": int(os.getenv("MONITOR_LOG_MAX_QUEUE", "10000")),
+                        "max_mb": float(os.getenv("MONITOR_LOG_MAX_MB", "10")),
+                        "backups": int(os.getenv("MONITOR_LOG_BACKUPS", "5")),
+                        "rotate_hours": float(os.getenv("MONITOR_LOG_ROTATE_HOURS", "24")),
+                        "console": os.getenv("MONITOR_LOG_CONSOLE", "1") == "1"
+                    },
+                    "scheduling": {
+                        "policy": os.getenv("MONITOR_SCHEDULING_POLICY", "sjf"),
+                        "aging_factor": float(os.getenv("MONITOR_AGING_FACTOR", "1.0")),
+                        "default_duration_seconds": float(os.getenv("MONITOR_DEFAULT_DURATION", "1800")),
+                        "weights": {}
+                    },
+                    "cluster": {
+                        "enabled": os.getenv("MONITOR_CLUSTER_ENABLED", "0") == "1",
+                        "node_id": os.getenv("MONITOR_NODE_ID", ""),
+                        "claims_dir": os.getenv("MONITOR_CLAIMS_DIR", ""),
+                        "heartbeat_seconds": float(os.getenv("MONITOR_HEARTBEAT_SECONDS", "30")),
+                        "stale_seconds": float(os.getenv("MONITOR_STALE_SECONDS", "120"))
+                    },
+                    "queue": {
+                        "path": os.getenv("MONITOR_QUEUE_PATH", "video/jobs/queue.sqlite"),
+                        "lease_seconds": float(os.getenv("MONITOR_LEASE_SECONDS", "300")),
+                        "max_attempts": int(os.getenv("MONITOR_MAX_ATTEMPTS", "3")),
+                        "backoff_seconds": float(os.getenv("MONITOR_BACKOFF_SECONDS", "60")),
+                        "max_backoff_seconds": float(os.getenv("MONITOR_MAX_BACKOFF_SECONDS", "3600"))
+                    }
+                },
+                "embedded_subtitles": {
+                    "enabled": os.getenv("EMBEDDED_SUBTITLES_ENABLED", "1") == "1",
+                    "languages": os.getenv("EMBEDDED_SUBTITLES_LANGUAGES", "zh,chi,zho,chs,cht,中文").split(","),
+                    "fallback_any": os.getenv("EMBEDDED_SUBTITLES_FALLBACK_ANY", "0") == "1",
+                    "min_events": int(os.getenv("EMBEDDED_SUBTITLES_MIN_EVENTS", "10"))
+                },
+                "speech_index": {
+                    "enabled": os.getenv("SPEECH_INDEX_ENABLED", "1") == "1",
+                    "margin_db": float(os.getenv("SPEECH_INDEX_MARGIN_DB", "12")),
+                    "min_speech_seconds": float(os.getenv("SPEECH_INDEX_MIN_SPEECH_SECONDS", "0.3")),
+                    "min_silence_seconds": float(os.getenv("SPEECH_INDEX_MIN_SILENCE_SECONDS", "2.0")),
+                    "pad_seconds": float(os.getenv("SPEECH_INDEX_PAD_SECONDS", "0.5")),
+                    "max_speech_ratio": float(os.getenv("SPEECH_INDEX_MAX_SPEECH_RATIO", "0.9")),
+                    "vision_gap_seconds": float(os.getenv("SPEECH_INDEX_VISION_GAP_SECONDS", "60"))
+                },
+                "chunk_max_tokens": int(os.getenv("VIDEO_CHUNK_MAX_TOKENS", "16000")),
+                "chunk_overlap_seconds": float(os.getenv("VIDEO_CHUNK_OVERLAP_SECONDS", "30")),
+                "frame_extraction": os.getenv("VIDEO_FRAME_EXTRACTION", "single_pass"),
+                "frame_sampler": os.getenv("VIDEO_FRAME_SAMPLER", "iframe"),
+                "prefetch": {
+                    "enabled": os.getenv("VIDEO_PREFETCH_ENABLED", "1") == "1",
+                    "keyframes": os.getenv("VIDEO_PREFETCH_KEYFRAMES", "1") == "1",
+                    "max_seconds": float(os.getenv("VIDEO_PREFETCH_MAX_SECONDS", "600"))
+                },
+                "scene_sampler": {
+                    "fps": float(os.getenv("SCENE_SAMPLER_FPS", "4")),
+                    "threshold": float(os.getenv("SCENE_SAMPLER_THRESHOLD", "0.35")),
+                    "max_frames_per_segment": int(os.getenv("SCENE_SAMPLER_MAX_FRAMES", "20")),
+                    "frames_per_shot": int(os.getenv("SCENE_SAMPLER_FRAMES_PER_SHOT", "2")),
+                    "min_shot_seconds": float(os.getenv("SCENE_SAMPLER_MIN_SHOT_SECONDS", "1.0"))
+                },
+                "frame_dedup": {
+                    "enabled": os.getenv("FRAME_DEDUP_ENABLED", "1") == "1",
+                    "threshold": int(os.getenv("FRAME_DEDUP_THRESHOLD", "6"))
+                },
+                "transcript_cache": {
+                    "enabled": os.getenv("TRANSCRIPT_CACHE_ENABLED", "1") == "1",
+                    "dir": os.getenv("TRANSCRIPT_CACHE_DIR", "video/cache/transcripts"),
+                    "max_mb": int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "512"))
+                }
+            },
+            "llm_cache": {
+                "enabled": os.getenv("LLM_CACHE_ENABLED", "1") == "1",
+                "path": os.getenv("LLM_CACHE_PATH", "cache/llm.sqlite"),
+                "ttl_hours": float(os.getenv("LLM_CACHE_TTL_HOURS", "168")),
+                "max_mb": int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+            },
             "settings": {
                 "max_tool_chain": int(os.getenv("MAX_TOOL_CHAIN", "15")),
                 "tool_timeout": int(os.getenv("TOOL_TIMEOUT", "60")),
@@ -88,6 +199,10 @@ class ConfigLoader:
         """获取Ollama配置"""
         return self.get("services.ollama", {})
     
+    def get_asr_config(self) -> Dict[str, Any]:
+        """获取语音识别服务配置"""
+        return self.get("services.asr", {})
+    
     def get_tts_config(self) -> Dict[str, Any]:
         """获取TTS配置"""
         return self.get("tts", {})
@@ -96,6 +211,14 @@ class ConfigLoader:
         """获取模型配置"""
         return self.get("models", {})
     
+    def get_video_config(self) -> Dict[str, Any]:
+        """获取视频分析流水线配置"""
+        return self.get("video", {})
+    
+    def get_llm_cache_config(self) -> Dict[str, Any]:
+        """获取大模型响应缓存配置"""
+        return self.get("llm_cache", {})
+    
     def get_settings(self) -> Dict[str, Any]:
         """获取设置配置"""
         return self.get("settings", {})
@@ -22,7 +22,8 @@ async def detect_creative_request(
         response = await client.chat_completion(
             messages=[{"role": "user", "content": prompt}],
             response_format={"type": "json_object"},
-            temperature=0.0
+            temperature=0.0,
+            cache=True
         )
         result = json.loads(response)
         return result.get("is_creative", False)
@@ -5,6 +5,7 @@ import asyncio
 from pathlib import Path
 from api_client import DeepSeekClient
 from memory.short_term import ShortTermMemory
+from video.src.report_sidecar import read_video_reports
 
 
 # 从 creative_utils.py 合并的函数
@@ -79,14 +80,8 @@ class CreativeProcessor:
         self.video_output_path = Path("video/output")
     
     def _read_video_output(self) -> str:
-        """读取video/output目录下的文本文件内容"""
-        content = []
-        for file in self.video_output_path.glob("*.txt"):
-            try:
-                with open(file, "r", encoding="utf-8") as f:
-                    content.append(f.read())
-            except Exception:
-                continue
+        """读取video/output目录下的视频报告(有JSON报告的使用紧凑分段表)"""
+        content = [f"## {name}\n{report}" for name, report in read_video_reports(self.video_output_path)]
         return "\n".join(content) if content else "无视频分析内容"
     
     async def _generate_step_interaction(self, plan: str) -> str:
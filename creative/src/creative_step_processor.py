@@ -30,7 +30,8 @@ class CreativeStepProcessor:
             messages=[{"role": "user", "content": prompt}],
             model="deepseek-reasoner",
             response_format={"type": "json_object"},
-            temperature=0.0
+            temperature=0.0,
+            cache=True
         )
         try:
             import json
@@ -1,5 +1,6 @@
 from pathlib import Path
 import subprocess
+import sys
 import asyncio
 import json  # 新增JSON导入
 from api_client import DeepSeekClient
@@ -7,13 +8,17 @@ from typing import Optional
 from .script_generator import ScriptGenerator
 from .no_voiceover_processor import NoVoiceoverProcessor
 from config_loader import config
+from video.src.report_sidecar import read_video_reports
+
+# asr_server与video/src中的模块使用同一导入路径(asr_server)，避免同一进程加载两份模块和两个模型单例
+VIDEO_SRC_DIR = str(Path(__file__).resolve().parent.parent.parent / "video" / "src")
+if VIDEO_SRC_DIR not in sys.path:
+    sys.path.insert(0, VIDEO_SRC_DIR)
 
 class FinalProcessor:
     def __init__(self, api_key: str):
         self.api_key = api_key  # 新增此行
         self.client = DeepSeekClient(api_key)
-        # 初始化模型路径
-        self.model_path = Path(__file__).parent.parent.parent / "video/models/Faster-Whisper"
     
     async def _needs_voiceover(self, content: str) -> bool:
         """判断是否需要口播稿（JSON格式版）"""
@@ -29,7 +34,8 @@ class FinalProcessor:
             response = await self.client.chat_completion(
                 messages=[{"role": "user", "content": prompt}],
                 response_format={"type": "json_object"},  # 强制JSON格式
-                temperature=0.0  # 确定性输出
+                temperature=0.0,  # 确定性输出
+                cache=True
             )
             result = json.loads(response)
             return result.get("needs_voiceover", False)
@@ -42,13 +48,8 @@ class FinalProcessor:
         return await script_generator.generate_full_script()
     
     def _read_video_output(self) -> str:
-        """读取video/output所有文件内容"""
-        output_dir = Path("video/output")
-        content = []
-        for file in output_dir.glob("*"):
-            if file.is_file():
-                content.append(f"## {file.name}\n{file.read_text(encoding='utf-8')}")
-        return "\n\n".join(content)
+        """读取video/output下所有视频报告(有JSON报告的使用紧凑分段表)"""
+        return "\n\n".join(f"## {name}\n{content}" for name, content in read_video_reports("video/output"))
     
     def _cleanup_think_output(self):
         """
@@ -157,15 +158,14 @@ class FinalProcessor:
         list_file.unlink()
     
     async def _generate_subtitles(self, audio_path: Path, output_path: Path) -> str:
-        """生成字幕"""
-        from faster_whisper import WhisperModel
+        """生成字幕(优先使用常驻语音识别服务)"""
+        from asr_server import transcribe
         
-        model = WhisperModel(str(self.model_path), device="cpu", compute_type="int8")
-        segments, _ = model.transcribe(str(audio_path), beam_size=5)
+        result = await asyncio.to_thread(transcribe, audio_path, beam_size=5)
         
         subtitles = []
-        for segment in segments:
-            subtitles.append(f"[{segment.start:.2f}-{segment.end:.2f}]: {segment.text}")
+        for start, end, text in result["segments"]:
+            subtitles.append(f"[{start:.2f}-{end:.2f}]: {text}")
         
         # 保存字幕
         output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -1,6 +1,7 @@
 from pathlib import Path
 from api_client import DeepSeekClient
 from music.src.convertmusic import convert_to_mp3
+from video.src.report_sidecar import read_video_reports
 import asyncio
 import shutil
 import subprocess
@@ -109,11 +110,8 @@ class NoVoiceoverProcessor:
         # 读取用户需求总结
         user_requirements = read_path.read_text(encoding="utf-8") if read_path.exists() else ""
         
-        # 读取视频分析内容
-        video_output = []
-        for file in Path("video/output").glob("*"):
-            if file.is_file() and file.suffix == ".txt":
-                video_output.append(f"## {file.name}\n{file.read_text(encoding='utf-8')}")
+        # 读取视频分析内容(有结构化报告的视频使用其紧凑分段表)
+        video_output = [f"## {name}\n{content}" for name, content in read_video_reports("video/output")]
         
         # 读取音乐相关文件
         music_report = (temp_dir / "Background_Music_report.txt").read_text(encoding="utf-8") \
@@ -235,11 +233,8 @@ hh:mm:ss:ms~hh:mm:ss:ms
     
     async def _select_background_music(self, content: str) -> str:
         """选择背景音乐"""
-        # 读取视频分析内容
-        video_output = []
-        for file in Path("video/output").glob("*"):
-            if file.is_file() and file.suffix == ".txt":
-                video_output.append(f"## {file.name}\n{file.read_text(encoding='utf-8')}")
+        # 读取视频分析内容(有结构化报告的视频使用其紧凑分段表)
+        video_output = [f"## {name}\n{content}" for name, content in read_video_reports("video/output")]
         
         # 获取可用音乐列表
         music_files = [f.name for f in Path("music/MusicInput").glob("*") if f.is_file()]
@@ -274,11 +269,8 @@ hh:mm:ss:ms~hh:mm:ss:ms
         # 读取用户需求总结
         user_requirements = read_path.read_text(encoding="utf-8") if read_path.exists() else ""
         
-        # 读取视频分析内容
-        video_output = []
-        for file in Path("video/output").glob("*"):
-            if file.is_file() and file.suffix == ".txt":
-                video_output.append(f"## {file.name}\n{file.read_text(encoding='utf-8')}")
+        # 读取视频分析内容(有结构化报告的视频使用其紧凑分段表)
+        video_output = [f"## {name}\n{content}" for name, content in read_video_reports("video/output")]
         
         # 读取音乐相关文件
         music_report = (temp_dir / "Background_Music_report.txt").read_text(encoding="utf-8") \
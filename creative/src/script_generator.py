@@ -56,7 +56,8 @@ class ScriptGenerator:
         response = await self.client.chat_completion(
             messages=[{"role": "user", "content": prompt}],
             response_format={"type": "json_object"},
-            temperature=0.0
+            temperature=0.0,
+            cache=True
         )
         
         result = json.loads(response)
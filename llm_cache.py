@@ -0,0 +1,149 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+from config_loader import config
+
+BASE_DIR = Path(__file__).parent
+DEFAULT_CACHE_PATH = BASE_DIR / "cache" / "llm.sqlite"
+
+
+class LLMCache:
+    """按模型、消息和请求参数寻址的大模型响应缓存(SQLite)
+
+    条目超过ttl_hours后视为过期；写入后按最近访问时间淘汰，使响应总大小不超过max_mb。
+    """
+
+    def __init__(self, db_path=None, ttl_hours=None, max_mb=None, enabled=None):
+        cache_config = config.get_llm_cache_config()
+        db_path = Path(db_path or cache_config.get("path") or DEFAULT_CACHE_PATH)
+        if not db_path.is_absolute():
+            db_path = BASE_DIR / db_path
+        self.db_path = db_path
+        ttl_hours = ttl_hours if ttl_hours is not None else cache_config.get("ttl_hours", 168)
+        # ttl_hours为0表示永不过期
+        self.ttl_seconds = float(ttl_hours) * 3600
+        self.max_bytes = int(float(max_mb or cache_config.get("max_mb", 256)) * 1024 * 1024)
+        self.enabled = cache_config.get("enabled", True) if enabled is None else enabled
+        self.lock = threading.Lock()
+        if self.enabled:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, "
+                    "created_at REAL, accessed_at REAL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_accessed ON llm_cache(accessed_at)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_created ON llm_cache(created_at)")
+
+    def _connect(self):
+        # 每次操作使用独立连接，允许多个线程同时读写
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    @staticmethod
+    def make_key(model, messages, params):
+        """由模型名、消息列表和其余请求参数生成缓存键"""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at):
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def get(self, key):
+        """读取缓存响应，未命中或已过期返回None"""
+        if not self.enabled:
+            return None
+        with self._connect() as conn:
+            row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            if self._expired(row[1]):
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key, model, response):
+        """写入响应并淘汰过期和超出容量的条目"""
+        if not self.enabled or not response:
+            return
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now)
+            )
+        self.evict()
+
+    def evict(self):
+        """删除过期条目，再按最近访问时间删除最久未用的条目直到总大小不超过上限"""
+        with self.lock, self._connect() as conn:
+            if self.ttl_seconds > 0:
+                conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            stale = []
+            for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at"):
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale)
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """进程内共享的大模型响应缓存"""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+        return _llm_cache
+
+
+def cached_completion(model, messages, params, compute, use_cache=True):
+    """先查响应缓存，未命中时调用compute()并写入缓存
+
+    Args:
+        model: 模型名
+        messages: 消息列表
+        params: 其余影响输出的请求参数(temperature、response_format等)
+        compute: 无参函数，返回模型输出文本
+        use_cache: 调用方可传False跳过缓存(如需要每次不同回复的对话)
+    """
+    cache = get_llm_cache() if use_cache else None
+    if cache is None or not cache.enabled:
+        return compute()
+
+    key = LLMCache.make_key(model, messages, params)
+    response = cache.get(key)
+    if response is not None:
+        print(f"[LLM缓存] 命中: {model}")
+        return response
+
+    response = compute()
+    cache.put(key, model, response)
+    return response
+
+
+def cached_chat(client, model, messages, use_cache=True, **params):
+    """带缓存的OpenAI兼容聊天接口调用，返回第一条回复的文本"""
+    def compute():
+        response = client.chat.completions.create(model=model, messages=messages, **params)
+        return response.choices[0].message.content
+
+    return cached_completion(model, messages, params, compute, use_cache=use_cache)
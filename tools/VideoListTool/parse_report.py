@@ -3,6 +3,8 @@ from pathlib import Path
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
 from config_loader import config
+from llm_cache import cached_completion
+from video.src.report_sidecar import read_video_reports
 
 class VideoAnalyzer:
     """视频内容分析器"""
@@ -13,18 +15,21 @@ class VideoAnalyzer:
         self.base_url = "https://api.deepseek.com/v1"
         self.client = httpx.Client(timeout=60.0)
         
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def analyze(self, prompt: str, content: str) -> str:
-        """调用DeepSeek分析视频内容"""
+        """调用DeepSeek分析视频内容(相同提示词和报告内容直接读取响应缓存)"""
+        model = "deepseek-chat"
+        messages = [
+            {"role": "system", "content": "你是一个视频内容分析助手，是ai agent的一个工具，需要遵循agent的指令来分析视频内容。输出的内容应当尽可能详细且遵循原文"},
+            {"role": "user", "content": f"{prompt}\n\n视频内容:\n{content}"}
+        ]
+        params = {"temperature": 0.3}
+        return cached_completion(model, messages, params, lambda: self._request(model, messages, params))
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def _request(self, model: str, messages: list, params: dict) -> str:
+        """发送聊天请求"""
         headers = {"Authorization": f"Bearer {self.api_key}"}
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": "你是一个视频内容分析助手，是ai agent的一个工具，需要遵循agent的指令来分析视频内容。输出的内容应当尽可能详细且遵循原文"},
-                {"role": "user", "content": f"{prompt}\n\n视频内容:\n{content}"}
-            ],
-            "temperature": 0.3
-        }
+        payload = {"model": model, "messages": messages, **params}
         try:
             response = self.client.post(
                 f"{self.base_url}/chat/completions",
@@ -68,16 +73,12 @@ def video_content_analyzer(prompt: str) -> dict:
         base_dir = Path(__file__).parent.parent.parent / "video"
         output_dir = base_dir / "output"
         
-        # 读取所有报告内容
+        # 读取所有报告内容(有JSON报告的视频使用结构化分段表)
         reports = []
         sources = []
-        for report_file in output_dir.glob("*_report.txt"):
-            try:
-                with open(report_file, 'r', encoding='utf-8') as f:
-                    reports.append(f.read())
-                    sources.append(report_file.name)
-            except Exception as e:
-                continue
+        for name, content in read_video_reports(output_dir):
+            reports.append(f"## {name}\n{content}")
+            sources.append(name)
         
         # 调用DeepSeek分析
         analyzer = VideoAnalyzer()
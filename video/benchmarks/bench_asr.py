@@ -0,0 +1,102 @@
+"""分片并行转录与单进程转录的耗时对比
+
+用法:
+    python video/benchmarks/bench_asr.py --minutes 60
+    python video/benchmarks/bench_asr.py --sample 说话片段.wav --minutes 60
+
+不指定--sample时生成带静音间隔的合成音频；指定时把样本重复拼接到目标时长，
+结果更接近真实语音的转录负载。
+"""
+import sys
+import time
+import wave
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+import numpy as np
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from audio_stream import SAMPLE_RATE, load_wav_samples
+from asr_server import load_model, run_transcription
+from sharded_asr import transcribe_sharded, get_shard_settings
+
+
+def synth_audio(minutes, seed=0):
+    """生成合成音频：2~8秒的调幅谐波"语句"与0.3~2秒的静音交替"""
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * SAMPLE_RATE)
+    parts = []
+    length = 0
+    while length < total:
+        voiced = int(rng.uniform(2, 8) * SAMPLE_RATE)
+        t = np.arange(voiced) / SAMPLE_RATE
+        f0 = rng.uniform(110, 240)
+        tone = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(2, 5) * t)
+        parts.append((0.2 * tone * envelope).astype(np.float32))
+        gap = int(rng.uniform(0.3, 2.0) * SAMPLE_RATE)
+        parts.append(rng.normal(0, 0.002, gap).astype(np.float32))
+        length += voiced + gap
+    return np.concatenate(parts)[:total]
+
+
+def repeat_sample(sample_path, minutes):
+    """把真实语音样本解码为16kHz单声道并重复到目标时长"""
+    cmd = ['ffmpeg', '-nostdin', '-i', str(sample_path), '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', '-']
+    raw = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+    sample = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    total = int(minutes * 60 * SAMPLE_RATE)
+    return np.tile(sample, total // len(sample) + 1)[:total]
+
+
+def write_wav(path, audio):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分片并行转录基准测试")
+    parser.add_argument("--minutes", type=float, default=30, help="合成输入时长(分钟)")
+    parser.add_argument("--sample", help="用于重复拼接的真实语音文件")
+    parser.add_argument("--workers", type=int, help="分片转录进程数")
+    parser.add_argument("--skip-single", action="store_true", help="跳过单进程基线")
+    args = parser.parse_args()
+
+    audio = repeat_sample(args.sample, args.minutes) if args.sample else synth_audio(args.minutes)
+    with tempfile.TemporaryDirectory() as tmp:
+        wav_path = Path(tmp) / "bench.wav"
+        write_wav(wav_path, audio)
+        del audio
+
+        samples, _ = load_wav_samples(wav_path)
+        duration = len(samples) / SAMPLE_RATE
+        del samples
+        settings = get_shard_settings(args.workers)
+        print(f"输入时长: {duration:.0f}秒, 分片进程数: {settings['workers']} × {settings['threads_per_worker']}线程")
+
+        single = None
+        if not args.skip_single:
+            # 计时包含模型加载，与分片模式各worker加载模型的开销对齐
+            started = time.time()
+            model = load_model()
+            result = run_transcription(model, wav_path)
+            single = time.time() - started
+            print(f"单进程: {single:.1f}秒 ({len(result['segments'])}段, 实时率{duration / single:.1f}x)")
+
+        started = time.time()
+        result = transcribe_sharded(wav_path, workers=args.workers)
+        sharded = time.time() - started
+        print(f"分片并行: {sharded:.1f}秒 ({len(result['segments'])}段, 实时率{duration / sharded:.1f}x)")
+
+        if single:
+            print(f"加速比: {single / sharded:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
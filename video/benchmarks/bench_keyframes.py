@@ -0,0 +1,72 @@
+"""单次解码多段关键帧提取与逐段ffmpeg提取的耗时对比
+
+用法:
+    python video/benchmarks/bench_keyframes.py input/视频.mkv --segments 18
+    python video/benchmarks/bench_keyframes.py input/视频.mkv --segment 00:01:31-00:02:56 --segment 00:05:00-00:06:10
+
+不指定--segment时，按视频时长均匀生成--segments个时长为--length秒的时间段，
+模拟字幕分析标记出的多个"是"片段。
+"""
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from frame_extractor import extract_keyframes_segment, extract_keyframes_multi, seconds_to_time_str
+
+
+def probe_duration(video_path):
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", str(video_path)]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return float(json.loads(result.stdout)["format"]["duration"])
+
+
+def make_segments(duration, count, length):
+    """在视频时长内均匀分布count个时间段"""
+    step = duration / count
+    segments = []
+    for i in range(count):
+        start = i * step + max(0.0, (step - length) / 2)
+        end = min(duration, start + length)
+        segments.append(f"{seconds_to_time_str(start)[:8]}-{seconds_to_time_str(end)[:8]}")
+    return segments
+
+
+def main():
+    parser = argparse.ArgumentParser(description="关键帧提取基准测试")
+    parser.add_argument("video", help="视频文件路径")
+    parser.add_argument("--segment", action="append", help="HH:MM:SS-HH:MM:SS格式的时间段，可重复")
+    parser.add_argument("--segments", type=int, default=18, help="自动生成的时间段数量")
+    parser.add_argument("--length", type=float, default=90, help="自动生成的时间段时长(秒)")
+    args = parser.parse_args()
+
+    segments = args.segment or make_segments(probe_duration(args.video), args.segments, args.length)
+    print(f"时间段数量: {len(segments)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        loop_dir = Path(tmp) / "loop"
+        started = time.time()
+        loop_frames = sum(len(extract_keyframes_segment(args.video, segment, loop_dir)) for segment in segments)
+        loop_time = time.time() - started
+        print(f"逐段提取: {loop_time:.2f}秒, {loop_frames}帧")
+        shutil.rmtree(loop_dir, ignore_errors=True)
+
+        multi_dir = Path(tmp) / "multi"
+        started = time.time()
+        frames = extract_keyframes_multi(args.video, segments, multi_dir)
+        multi_time = time.time() - started
+        multi_frames = sum(len(paths) for paths in frames.values())
+        print(f"单次解码: {multi_time:.2f}秒, {multi_frames}帧")
+
+        print(f"加速比: {loop_time / multi_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""本地Ollama桩服务，用于验证视觉调度器的并发与退避行为
+
+用法:
+    python video/benchmarks/stub_ollama.py --port 11500 --capacity 2 --latency 1.5
+
+把config.json中services.ollama.host指向http://127.0.0.1:11500即可让视觉分析请求打到桩服务。
+在途请求数超过--capacity时返回503(与Ollama排队已满时的响应一致)，日志会打印每个请求的并发度。
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class StubState:
+    def __init__(self, capacity, latency):
+        self.capacity = capacity
+        self.latency = latency
+        self.in_flight = 0
+        self.peak = 0
+        self.served = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": "stub-vision"}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != "/api/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        state = self.state
+        with state.lock:
+            if state.in_flight >= state.capacity:
+                state.rejected += 1
+                rejected = True
+            else:
+                state.in_flight += 1
+                state.peak = max(state.peak, state.in_flight)
+                rejected = False
+                current = state.in_flight
+        if rejected:
+            self._send_json(503, {"error": "server busy, please try again.  maximum pending requests exceeded"})
+            return
+
+        print(f"[stub] 处理请求: {len(request.get('images') or [])}张图片, 在途{current}")
+        time.sleep(state.latency)
+        with state.lock:
+            state.in_flight -= 1
+            state.served += 1
+        self._send_json(200, {
+            "model": request.get("model"),
+            "response": f"桩描述: {len(request.get('images') or [])}张图片",
+            "done": True
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama桩服务")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--capacity", type=int, default=2, help="同时处理的请求数，超出返回503")
+    parser.add_argument("--latency", type=float, default=1.0, help="每个请求的模拟耗时(秒)")
+    args = parser.parse_args()
+
+    StubHandler.state = StubState(args.capacity, args.latency)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    print(f"[stub] Ollama桩服务已启动: 127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        state = StubHandler.state
+        print(f"[stub] 已处理{state.served}个请求，拒绝{state.rejected}个，峰值并发{state.peak}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+import re
+import threading
+from pathlib import Path
+
+# 报告(文本和结构化JSON)与字幕文件名到视频名的映射
+REPORT_NAME = re.compile(r'^(.*)_report\.(txt|json)$')
+SUBTITLE_NAME = re.compile(r'^(.*)_subtitles\.txt$')
+FINAL_SUFFIX = "_final"
+
+
+def video_keys(video_path):
+    """视频可能对应的产物名(合并报告会去掉视频名末尾的_final)"""
+    stem = Path(video_path).stem
+    keys = {stem}
+    if stem.endswith(FINAL_SUFFIX):
+        keys.add(stem[:-len(FINAL_SUFFIX)])
+    return keys
+
+
+def artifact_key(path):
+    """报告或字幕文件对应的视频名，不是产物文件时返回None"""
+    name = Path(path).name
+    match = REPORT_NAME.match(name)
+    if match:
+        return match.group(1)
+    match = SUBTITLE_NAME.match(name)
+    if match:
+        stem = match.group(1)
+        return stem[:-len(FINAL_SUFFIX)] if stem.endswith(FINAL_SUFFIX) else stem
+    return None
+
+
+class ArtifactIndex:
+    """视频名 -> 视频文件、视频名 -> 报告/字幕文件的内存索引
+
+    启动时扫描一次目录建立索引，之后由文件事件逐个更新，判断孤儿文件只需检查发生变化的视频名；
+    rebuild()重新扫描全部目录，用于定期的一致性检查。
+    """
+
+    def __init__(self, input_dir, artifact_dirs, video_exts):
+        self.input_dir = Path(input_dir).resolve()
+        self.artifact_dirs = [Path(directory).resolve() for directory in artifact_dirs]
+        self.video_exts = set(video_exts)
+        self.lock = threading.Lock()
+        self.videos = {}  # 视频名 -> {视频路径}
+        self.artifacts = {}  # 视频名 -> {产物路径}
+
+    def is_video(self, path):
+        return Path(path).suffix.lower() in self.video_exts
+
+    def rebuild(self):
+        """重新扫描输入目录和产物目录"""
+        videos, artifacts = {}, {}
+        for root, _, files in os.walk(self.input_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if self.is_video(path):
+                    for key in video_keys(path):
+                        videos.setdefault(key, set()).add(path)
+        for directory in self.artifact_dirs:
+            if not directory.exists():
+                continue
+            for entry in os.scandir(directory):
+                key = artifact_key(entry.name) if entry.is_file() else None
+                if key is not None:
+                    artifacts.setdefault(key, set()).add(entry.path)
+        with self.lock:
+            self.videos, self.artifacts = videos, artifacts
+
+    def update(self, path):
+        """按文件当前是否存在更新索引，返回受影响的视频名集合"""
+        path = str(Path(path).resolve())
+        exists = os.path.isfile(path)
+        if self.input_dir in Path(path).parents:
+            if not self.is_video(path):
+                return set()
+            keys = video_keys(path)
+            target = self.videos
+        elif Path(path).parent in self.artifact_dirs:
+            key = artifact_key(path)
+            if key is None:
+                return set()
+            keys = {key}
+            target = self.artifacts
+        else:
+            return set()
+
+        with self.lock:
+            for key in keys:
+                if exists:
+                    target.setdefault(key, set()).add(path)
+                elif key in target:
+                    target[key].discard(path)
+                    if not target[key]:
+                        del target[key]
+        return keys
+
+    def orphans(self, keys=None):
+        """没有对应视频的产物文件(keys为None时检查全部)"""
+        with self.lock:
+            keys = self.artifacts.keys() if keys is None else keys
+            return sorted(
+                path for key in keys if key not in self.videos
+                for path in self.artifacts.get(key, ())
+            )
+
+    def discard(self, path):
+        """删除产物文件后从索引中移除"""
+        key = artifact_key(path)
+        with self.lock:
+            if key in self.artifacts:
+                self.artifacts[key].discard(str(path))
+                if not self.artifacts[key]:
+                    del self.artifacts[key]
+
+    def counts(self):
+        """(视频文件数, 产物文件数)"""
+        with self.lock:
+            videos = set().union(*self.videos.values()) if self.videos else set()
+            return len(videos), sum(map(len, self.artifacts.values()))
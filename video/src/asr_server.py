@@ -0,0 +1,313 @@
+import os
+import sys
+import socket
+import secrets
+import argparse
+import ipaddress
+import threading
+import traceback
+from pathlib import Path
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+# 确保项目根目录和src目录在导入路径中(支持脚本运行和作为video.src.asr_server导入)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from config_loader import config
+
+DEFAULT_MODEL_PATH = BASE_DIR / "video" / "models" / "Faster-Whisper"
+DEFAULT_OPTIONS = {"beam_size": 5}
+# 未配置authkey时使用的本机随机密钥(位于已忽略的缓存目录)，旧版本提交在配置中的默认密钥视为未配置
+AUTHKEY_PATH = BASE_DIR / "video" / "cache" / "asr_authkey"
+LEGACY_AUTHKEY = "cliptolution-asr"
+
+# 进程内模型单例，避免同一进程重复加载
+_local_model = None
+_local_model_lock = threading.Lock()
+
+
+def get_asr_settings():
+    """读取语音识别服务配置并补全默认值"""
+    asr_config = config.get_asr_config()
+    return {
+        "enabled": asr_config.get("enabled", True),
+        "host": asr_config.get("host", "127.0.0.1"),
+        "port": int(asr_config.get("port", 8765)),
+        "authkey": load_authkey(asr_config.get("authkey")),
+        "authkey_configured": bool(asr_config.get("authkey")) and asr_config.get("authkey") != LEGACY_AUTHKEY,
+        "device": asr_config.get("device", "cpu"),
+        "compute_type": asr_config.get("compute_type", "int8"),
+        "max_jobs": max(1, int(asr_config.get("max_jobs", 1))),
+    }
+
+
+def load_authkey(configured=None):
+    """返回连接服务使用的密钥：优先使用配置的authkey，否则读取(首次时生成)本机随机密钥文件"""
+    if configured and configured != LEGACY_AUTHKEY:
+        return str(configured).encode("utf-8")
+    try:
+        return AUTHKEY_PATH.read_bytes().strip()
+    except FileNotFoundError:
+        pass
+    AUTHKEY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    authkey = secrets.token_hex(32).encode("utf-8")
+    temp_path = AUTHKEY_PATH.with_name(f".{AUTHKEY_PATH.name}.{secrets.token_hex(8)}.tmp")
+    fd = os.open(temp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(authkey)
+    try:
+        # 写完整后再硬链接到正式路径，其他进程不会读到空文件；服务端和客户端同时首次生成时以先链接的一方为准
+        os.link(temp_path, AUTHKEY_PATH)
+    except FileExistsError:
+        authkey = AUTHKEY_PATH.read_bytes().strip()
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return authkey
+
+
+def is_loopback(host):
+    """监听地址是否只对本机开放"""
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def resolve_model_path():
+    """解析Whisper模型路径(相对路径以项目根目录为基准)"""
+    model_path = config.get_model_config().get("whisper_path")
+    if not model_path:
+        return DEFAULT_MODEL_PATH
+    model_path = Path(model_path)
+    if not model_path.is_absolute():
+        model_path = BASE_DIR / model_path
+    return model_path
+
+
+def load_model(num_workers=1):
+    """加载Whisper模型(进程内只加载一次)"""
+    global _local_model
+    with _local_model_lock:
+        if _local_model is None:
+            from faster_whisper import WhisperModel
+
+            settings = get_asr_settings()
+            model_path = resolve_model_path()
+            print(f"[ASR] 加载模型: {model_path}")
+            _local_model = WhisperModel(
+                str(model_path),
+                device=settings["device"],
+                compute_type=settings["compute_type"],
+                num_workers=num_workers
+            )
+        return _local_model
+
+
+def run_transcription(model, audio_path, options=None):
+    """执行一次转录，返回可序列化的结果字典
+
+    Returns:
+        dict: {"language", "language_probability", "segments": [(start, end, text), ...]}
+    """
+    params = {**DEFAULT_OPTIONS, **(options or {})}
+    segments, info = model.transcribe(str(audio_path), **params)
+    return {
+        "language": info.language,
+        "language_probability": info.language_probability,
+        "segments": [(segment.start, segment.end, segment.text) for segment in segments],
+    }
+
+
+def window_clips(clip_timestamps, offset, duration):
+    """把整段音频的clip_timestamps换算为某个窗口内的相对时间，窗口内没有有声区间时返回空列表"""
+    clips = []
+    for start, end in zip(clip_timestamps[::2], clip_timestamps[1::2]):
+        start, end = max(start - offset, 0.0), min(end - offset, duration)
+        if end > start:
+            clips.extend([round(start, 3), round(end, 3)])
+    return clips
+
+
+def run_stream_transcription(model, media_path, options=None, window_seconds=600.0):
+    """通过ffmpeg管道流式解码并分窗口转录，不生成中间WAV文件
+
+    首个窗口检测出的语言会用于后续窗口，避免重复语言检测。
+    提供clip_timestamps(整段音频的时间)时换算到各窗口内，没有有声区间的窗口直接跳过。
+
+    Returns:
+        dict: 与run_transcription相同的结构，时间戳为全局时间
+    """
+    from audio_stream import iter_pcm_windows, SAMPLE_RATE
+
+    params = {**DEFAULT_OPTIONS, **(options or {})}
+    clip_timestamps = params.pop("clip_timestamps", None)
+    result = {"language": params.get("language"), "language_probability": 1.0, "segments": []}
+    first_window = True
+
+    for offset, samples in iter_pcm_windows(media_path, window_seconds):
+        window_params = params
+        if clip_timestamps:
+            clips = window_clips(clip_timestamps, offset, len(samples) / SAMPLE_RATE)
+            if not clips:
+                continue
+            window_params = {**params, "clip_timestamps": clips}
+        segments, info = model.transcribe(samples, **window_params)
+        if first_window:
+            result["language"] = info.language
+            result["language_probability"] = info.language_probability
+            params["language"] = info.language
+            first_window = False
+        result["segments"].extend(
+            (segment.start + offset, segment.end + offset, segment.text) for segment in segments
+        )
+
+    return result
+
+
+def execute_request(model, request):
+    """按请求模式执行转录(file: 读取音频文件; stream: ffmpeg管道流式解码)"""
+    if request.get("mode") == "stream":
+        return run_stream_transcription(
+            model,
+            request["audio_path"],
+            request.get("options"),
+            request.get("window_seconds", 600.0)
+        )
+    return run_transcription(model, request["audio_path"], request.get("options"))
+
+
+class ASRServer:
+    """常驻语音识别服务：启动时加载一次模型，通过本地socket接收转录任务"""
+
+    def __init__(self, host=None, port=None, max_jobs=None):
+        settings = get_asr_settings()
+        self.address = (host or settings["host"], port or settings["port"])
+        # 请求以pickle传输，密钥泄露即可在服务进程中执行任意代码，对外监听时必须使用自行配置的密钥
+        if not is_loopback(self.address[0]) and not settings["authkey_configured"]:
+            raise ValueError(
+                f"监听非本机地址{self.address[0]}时必须在services.asr.authkey(或ASR_SERVER_AUTHKEY)中配置自己的密钥"
+            )
+        self.authkey = settings["authkey"]
+        self.max_jobs = max_jobs or settings["max_jobs"]
+        # 限制同时进行的转录任务数，其余连接排队等待
+        self.slots = threading.BoundedSemaphore(self.max_jobs)
+        self.model = load_model(num_workers=self.max_jobs)
+        self.running = True
+
+    def serve_forever(self):
+        """监听本地端口并为每个连接启动处理线程"""
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"[ASR] 服务已启动: {self.address[0]}:{self.address[1]} (并发任务数: {self.max_jobs})")
+            while self.running:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"[ASR] 连接建立失败: {str(e)}")
+                    continue
+                thread = threading.Thread(target=self._handle, args=(conn,))
+                thread.daemon = True
+                thread.start()
+
+    def _handle(self, conn):
+        """处理单个客户端请求"""
+        with conn:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            if request.get("cmd") == "ping":
+                conn.send({"ok": True})
+                return
+
+            try:
+                audio_path = request["audio_path"]
+                print(f"[ASR] 开始转录: {audio_path}")
+                with self.slots:
+                    result = execute_request(self.model, request)
+                print(f"[ASR] 转录完成: {audio_path} ({len(result['segments'])}段)")
+                response = {"ok": True, "result": result}
+            except Exception as e:
+                traceback.print_exc()
+                response = {"ok": False, "error": str(e)}
+
+            try:
+                conn.send(response)
+            except (EOFError, OSError):
+                print("[ASR] 客户端已断开，结果丢弃")
+
+
+def _request_server(request, settings):
+    """向常驻服务发送请求，服务不可达、密钥不一致或处理中断开时返回None"""
+    try:
+        with Client((settings["host"], settings["port"]), authkey=settings["authkey"]) as conn:
+            conn.send(request)
+            return conn.recv()
+    except ConnectionRefusedError:
+        # 服务未启动
+        return None
+    except (OSError, EOFError, AuthenticationError) as e:
+        print(f"[ASR] 语音识别服务请求失败: {type(e).__name__}: {str(e)}")
+        return None
+
+
+def transcribe(audio_path, stream=False, window_seconds=600.0, **options):
+    """转录音频文件
+
+    优先交给常驻语音识别服务处理；服务未启动或请求失败(密钥不一致、处理中断开)时回退到进程内模型(同一进程只加载一次)。
+
+    Args:
+        audio_path: 音频或视频文件路径
+        stream: 是否通过ffmpeg管道流式解码(不生成中间WAV)
+        window_seconds: 流式模式下每个转录窗口的时长(秒)
+        **options: 传递给faster-whisper transcribe的参数，默认beam_size=5
+
+    Returns:
+        dict: {"language", "language_probability", "segments": [(start, end, text), ...]}
+    """
+    settings = get_asr_settings()
+    request = {
+        "cmd": "transcribe",
+        "mode": "stream" if stream else "file",
+        "audio_path": str(Path(audio_path).resolve()),
+        "window_seconds": window_seconds,
+        "options": options,
+    }
+
+    if settings["enabled"]:
+        response = _request_server(request, settings)
+        if response is not None:
+            if not response.get("ok"):
+                raise RuntimeError(f"语音识别服务转录失败: {response.get('error')}")
+            return response["result"]
+
+    model = load_model()
+    return execute_request(model, request)
+
+
+def is_server_running():
+    """检查常驻语音识别服务是否可用"""
+    response = _request_server({"cmd": "ping"}, get_asr_settings())
+    return bool(response and response.get("ok"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="常驻Whisper语音识别服务")
+    parser.add_argument("--host", help="监听地址，默认读取config.json中的services.asr.host")
+    parser.add_argument("--port", type=int, help="监听端口，默认读取config.json中的services.asr.port")
+    parser.add_argument("--max-jobs", type=int, help="同时进行的转录任务数")
+    args = parser.parse_args()
+
+    server = ASRServer(host=args.host, port=args.port, max_jobs=args.max_jobs)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[ASR] 服务已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import time
+import queue
+import threading
+from pathlib import Path
+from datetime import datetime
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+# 后台线程每批最多写入的记录数
+BATCH_SIZE = 512
+
+
+class AsyncLogger:
+    """带缓冲的异步日志
+
+    调用方只把记录放入有界内存队列，由后台线程批量写入JSON Lines文件(每行一条，含ts、level、msg及附加字段)并输出到控制台。
+    队列满时丢弃新记录而不阻塞调用方，丢弃数量会在之后补记一条WARNING。
+    文件超过max_bytes或首条记录的时间距今超过rotate_seconds(进程重启后仍按文件年龄计算)时轮转为<文件名>.1 ~ .<backups>。
+    """
+
+    def __init__(self, path, level="INFO", max_queue=10000, max_bytes=10 * 1024 * 1024,
+                 backups=5, rotate_seconds=86400, console=True):
+        self.path = Path(path)
+        self.level = LEVELS.get(str(level).upper(), LEVELS["INFO"])
+        self.max_bytes = max_bytes
+        self.backups = max(0, int(backups))
+        self.rotate_seconds = rotate_seconds
+        self.console = console
+        self.records = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.dropped_lock = threading.Lock()
+        self.file = None
+        self.opened_at = 0.0
+        self.thread = threading.Thread(target=self._run, name="async-logger", daemon=True)
+        self.thread.start()
+
+    def log(self, message, level="INFO", **fields):
+        """记录一条日志(低于配置级别的直接忽略)"""
+        level = level.upper()
+        if LEVELS.get(level, LEVELS["INFO"]) < self.level:
+            return
+        record = {"ts": time.time(), "level": level, "msg": message}
+        record.update(fields)
+        try:
+            self.records.put_nowait(record)
+        except queue.Full:
+            with self.dropped_lock:
+                self.dropped += 1
+
+    def close(self, timeout=5):
+        """写完队列中剩余的记录后停止后台线程"""
+        try:
+            self.records.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self.records.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            records = [record for record in batch if record is not None]
+            with self.dropped_lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                records.append({"ts": time.time(), "level": "WARNING", "msg": f"日志队列已满，丢弃{dropped}条记录"})
+            try:
+                self._write(records)
+            except Exception as e:
+                print(f"[日志] 写入失败: {str(e)}", file=sys.stderr)
+            if stop:
+                if self.file:
+                    self.file.close()
+                return
+
+    def _write(self, records):
+        if not records:
+            return
+        self._rotate_if_needed()
+        lines = [json.dumps(record, ensure_ascii=False, default=str) for record in records]
+        self.file.write("\n".join(lines) + "\n")
+        self.file.flush()
+        if self.console:
+            print("\n".join(
+                f"[{datetime.fromtimestamp(record['ts']).strftime('%Y-%m-%d %H:%M:%S')}] {record['msg']}"
+                for record in records
+            ))
+
+    def _rotate_if_needed(self):
+        if self.file is None:
+            self._open()
+        too_large = self.max_bytes > 0 and self.file.tell() >= self.max_bytes
+        too_old = self.rotate_seconds > 0 and time.time() - self.opened_at >= self.rotate_seconds
+        if (too_large or too_old) and self.file.tell() > 0:
+            self.file.close()
+            for index in range(self.backups - 1, 0, -1):
+                source = self.path.with_name(f"{self.path.name}.{index}")
+                if source.exists():
+                    os.replace(source, self.path.with_name(f"{self.path.name}.{index + 1}"))
+            if self.backups > 0:
+                os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+            else:
+                self.path.unlink()
+            self._open()
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.opened_at = self._started_at() if self.file.tell() > 0 else time.time()
+
+    def _started_at(self):
+        """已有日志文件的起始时间(首条记录的ts，无法解析时取修改时间)，按文件年龄而不是进程运行时长轮转"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return float(json.loads(f.readline())["ts"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return self.path.stat().st_mtime
@@ -0,0 +1,128 @@
+import subprocess
+import numpy as np
+
+SAMPLE_RATE = 16000
+# 切窗时在窗口末尾多长范围内寻找最安静的位置(秒)
+SPLIT_SEARCH_SECONDS = 5.0
+# 能量计算的帧长(秒)
+ENERGY_FRAME_SECONDS = 0.1
+
+
+def _quietest_split(samples, search_seconds=SPLIT_SEARCH_SECONDS):
+    """在缓冲区末尾search_seconds范围内找到能量最低的帧，返回切分点(样本下标)"""
+    frame = int(ENERGY_FRAME_SECONDS * SAMPLE_RATE)
+    search = min(len(samples), int(search_seconds * SAMPLE_RATE))
+    n_frames = search // frame
+    if n_frames < 2:
+        return len(samples)
+
+    start = len(samples) - n_frames * frame
+    tail = samples[start:].reshape(n_frames, frame)
+    energy = np.einsum("ij,ij->i", tail, tail)
+    return start + int(np.argmin(energy)) * frame + frame // 2
+
+
+def iter_pcm_windows(media_path, window_seconds=600.0):
+    """通过ffmpeg管道解码音频，按窗口产出float32采样，不落地临时文件
+
+    每个窗口在末尾几秒内最安静的位置切开，剩余部分并入下一个窗口，尽量避免切断语句。
+
+    Args:
+        media_path: 视频或音频文件路径
+        window_seconds: 每个窗口的目标时长(秒)
+
+    Yields:
+        (offset, samples): 窗口起始时间(秒)和16kHz单声道float32采样
+    """
+    cmd = [
+        'ffmpeg',
+        '-nostdin',
+        '-i', str(media_path),
+        '-vn',
+        '-acodec', 'pcm_s16le',
+        '-ar', str(SAMPLE_RATE),
+        '-ac', '1',
+        '-f', 's16le',
+        '-'
+    ]
+    window_samples = int(window_seconds * SAMPLE_RATE)
+    read_size = 1 << 20
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    chunks = []
+    buffered = 0
+    offset = 0
+    pending = b""
+    try:
+        while True:
+            data = proc.stdout.read(read_size)
+            if not data:
+                break
+            # 保证按int16边界解码
+            data = pending + data
+            usable = len(data) - len(data) % 2
+            pending = data[usable:]
+            chunk = np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+            chunks.append(chunk)
+            buffered += len(chunk)
+            if buffered < window_samples:
+                continue
+
+            buffer = np.concatenate(chunks)
+            while len(buffer) >= window_samples:
+                split = _quietest_split(buffer[:window_samples])
+                yield offset / SAMPLE_RATE, buffer[:split]
+                offset += split
+                buffer = buffer[split:]
+            chunks = [buffer]
+            buffered = len(buffer)
+
+        if buffered:
+            yield offset / SAMPLE_RATE, np.concatenate(chunks)
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        returncode = proc.wait()
+
+    if returncode != 0:
+        raise RuntimeError(f"音频流解码失败: {media_path}")
+
+
+def load_wav_samples(wav_path):
+    """以内存映射方式读取16位PCM WAV文件，不把整段音频读入内存
+
+    Returns:
+        (samples, sample_rate): int16的np.memmap(单声道)和采样率
+    """
+    with open(wav_path, "rb") as f:
+        header = f.read(12)
+        if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise ValueError(f"不是有效的WAV文件: {wav_path}")
+
+        sample_rate = SAMPLE_RATE
+        channels = 1
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError(f"WAV文件缺少data块: {wav_path}")
+            chunk_id = chunk_header[:4]
+            chunk_size = int.from_bytes(chunk_header[4:], "little")
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                channels = int.from_bytes(fmt[2:4], "little")
+                sample_rate = int.from_bytes(fmt[4:8], "little")
+                bits = int.from_bytes(fmt[14:16], "little")
+                if bits != 16:
+                    raise ValueError(f"仅支持16位PCM WAV: {wav_path}")
+            elif chunk_id == b"data":
+                data_offset = f.tell()
+                break
+            else:
+                f.seek(chunk_size + chunk_size % 2, 1)
+
+    # ffmpeg管道输出的WAV可能把data块长度写成0或占位值，按文件实际大小计算
+    samples = np.memmap(wav_path, dtype=np.int16, mode="r", offset=data_offset)
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)[:, 0]
+    return samples, sample_rate
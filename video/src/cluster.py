@@ -0,0 +1,264 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+from pathlib import Path
+
+# 确保项目根目录和src目录在导入路径中(支持脚本运行和作为video.src模块导入)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from config_loader import config
+
+CLAIMS_DIR_NAME = ".claims"
+CLAIM_SUFFIX = ".claim"
+# 认领结果: acquired由本节点处理、busy其他节点处理中、done/failed其他节点已处理完成或已放弃
+CLAIM_OUTCOMES = ["acquired", "busy", "done", "failed"]
+# 接管后等待多久再确认认领归属(多个节点同时接管时以最后留下的认领为准)
+TAKEOVER_SETTLE_SECONDS = 2.0
+
+
+def get_cluster_settings():
+    """读取多节点部署配置"""
+    settings = config.get_video_config().get("monitor", {}).get("cluster", {})
+    return {
+        "enabled": bool(settings.get("enabled", False)),
+        "node_id": settings.get("node_id") or socket.gethostname(),
+        "claims_dir": settings.get("claims_dir", ""),
+        "heartbeat_seconds": float(settings.get("heartbeat_seconds", 30)),
+        "stale_seconds": float(settings.get("stale_seconds", 120)),
+    }
+
+
+class ClusterClaims:
+    """多个节点共享同一个(NFS挂载的)input目录时，通过共享目录中的认领文件保证每个视频只被一个节点处理
+
+    - 认领: 以O_CREAT|O_EXCL创建<视频名>_<路径摘要>.claim，创建成功的节点获得该视频
+    - 心跳: 持有者每heartbeat_seconds秒更新一次认领文件的修改时间
+    - 接管: 连续stale_seconds秒(按本地时钟计，不依赖节点间时钟同步)观察到修改时间不变时视为持有者已失效，
+      把写好的临时文件原子重命名覆盖旧认领，稍后重新读取确认归属；多个节点同时接管时只有最后覆盖的一个成功
+    - 丢失: 心跳或提交前的检查发现认领已被接管时设置该视频的丢失事件，工作线程据此中止正在执行的步骤且不提交结果
+    - 完成: 持有者把认领文件改写为done或failed状态，视频内容(大小、修改时间)变化后才会重新认领
+
+    认领文件以视频相对input目录的路径命名，各节点的挂载点可以不同。
+    SQLite在NFS上的文件锁不可靠，因此各节点的任务队列仍放在本地磁盘，只有认领文件放在共享目录中。
+    """
+
+    def __init__(self, input_dir, settings=None):
+        self.settings = settings or get_cluster_settings()
+        self.input_dir = Path(input_dir).resolve()
+        claims_dir = self.settings["claims_dir"]
+        if not claims_dir:
+            self.dir = self.input_dir / CLAIMS_DIR_NAME
+        else:
+            self.dir = Path(claims_dir)
+            if not self.dir.is_absolute():
+                self.dir = BASE_DIR / self.dir
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.node = self.settings["node_id"]
+        self.lock = threading.Lock()
+        self.held = {}  # 本节点持有的认领文件 -> token
+        self.lost = {}  # 本节点持有的认领文件 -> 认领丢失时设置的事件
+        self.observed = {}  # 其他节点的认领文件 -> (修改时间, 本地首次观察到该修改时间的时刻)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._heartbeat_loop, name="cluster-heartbeat", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout)
+
+    def relative_path(self, video_path):
+        video_path = Path(video_path).resolve()
+        try:
+            return video_path.relative_to(self.input_dir).as_posix()
+        except ValueError:
+            return video_path.as_posix()
+
+    def claim_path(self, video_path):
+        relative = self.relative_path(video_path)
+        stem = re.sub(r'[^\w\-]+', '_', Path(video_path).stem)[:60]
+        digest = hashlib.sha1(relative.encode("utf-8")).hexdigest()[:12]
+        return self.dir / f"{stem}_{digest}{CLAIM_SUFFIX}"
+
+    def acquire(self, video_path, fingerprint):
+        """认领视频(每一步执行前调用，本节点已持有的认领直接续用)
+
+        Returns:
+            str: CLAIM_OUTCOMES之一
+        """
+        path = self.claim_path(video_path)
+        for _ in range(3):
+            record = {
+                "node": self.node,
+                "token": uuid.uuid4().hex,
+                "video": self.relative_path(video_path),
+                "fingerprint": fingerprint,
+                "state": "running",
+                "claimed_at": time.time(),
+            }
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                current = self._read(path)
+                if current is None:
+                    # 刚被删除或接管，重新尝试创建
+                    continue
+                if current.get("node") == self.node:
+                    # 本节点之前的认领(包括重启前的)，以本地队列的状态为准
+                    self._write(path, record)
+                    self._hold(path, record["token"])
+                    return "acquired"
+                if current.get("fingerprint") == fingerprint and current.get("state") in ("done", "failed"):
+                    return current["state"]
+                if current.get("state") in ("done", "failed") or self._is_stale(path):
+                    # 视频内容已变化，或持有者停止心跳
+                    if self._take_over(path, current, record):
+                        print(f"[集群] 接管认领: {path.name} (原节点{current.get('node', '未知')})")
+                        self._hold(path, record["token"])
+                        return "acquired"
+                return "busy"
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False)
+            self._hold(path, record["token"])
+            return "acquired"
+        return "busy"
+
+    def holds(self, video_path):
+        """重新读取认领文件，确认本节点仍持有该视频(提交步骤结果前调用)，已丢失时设置丢失事件"""
+        path = self.claim_path(video_path)
+        with self.lock:
+            token = self.held.get(path)
+        if token is None:
+            return False
+        current = self._read(path)
+        if current and current.get("token") == token:
+            return True
+        self._mark_lost(path, token)
+        return False
+
+    def lost_event(self, video_path):
+        """本节点持有的认领丢失时被设置的事件，未持有时返回None"""
+        with self.lock:
+            return self.lost.get(self.claim_path(video_path))
+
+    def release(self, video_path, state):
+        """处理结束，把本节点持有的认领改写为done或failed"""
+        path = self.claim_path(video_path)
+        with self.lock:
+            token = self.held.pop(path, None)
+            self.lost.pop(path, None)
+        if token is None:
+            return
+        current = self._read(path)
+        if not current or current.get("token") != token:
+            print(f"[集群] 认领已被其他节点接管，未记录结果: {path.name}")
+            return
+        current.update(state=state, finished_at=time.time())
+        self._write(path, current)
+
+    def forget(self, video_path):
+        """视频被删除时删除其认领文件(其他节点正在处理的除外)"""
+        path = self.claim_path(video_path)
+        with self.lock:
+            self.held.pop(path, None)
+            self.lost.pop(path, None)
+            self.observed.pop(path, None)
+        current = self._read(path)
+        if current is None or (current.get("state") == "running" and current.get("node") != self.node):
+            return
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _hold(self, path, token):
+        with self.lock:
+            self.held[path] = token
+            self.lost[path] = threading.Event()
+            self.observed.pop(path, None)
+
+    def _mark_lost(self, path, token):
+        with self.lock:
+            if self.held.get(path) != token:
+                return
+            del self.held[path]
+            event = self.lost.pop(path, None)
+        print(f"[集群] 认领已被其他节点接管: {path.name}")
+        if event:
+            event.set()
+
+    def _read(self, path):
+        """读取认领文件，不存在时返回None；刚创建尚未写入内容时返回{}"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return {}
+
+    def _write(self, path, record):
+        """先写临时文件再重命名，其他节点不会读到写了一半的内容"""
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def _is_stale(self, path):
+        """修改时间连续stale_seconds秒未变化"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            seen = self.observed.get(path)
+            if seen is None or seen[0] != mtime:
+                self.observed[path] = (mtime, now)
+                return False
+            return now - seen[1] >= self.settings["stale_seconds"]
+
+    def _take_over(self, path, observed, record):
+        """用写好的新认领原子覆盖失效的认领，返回本节点是否最终持有"""
+        temp_path = path.with_name(f".{path.name}.{record['token']}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        current = self._read(path)
+        if current is None or current.get("token") != observed.get("token"):
+            # 其他节点已先接管或持有者已释放
+            temp_path.unlink()
+            return False
+        os.replace(temp_path, path)
+        with self.lock:
+            self.observed.pop(path, None)
+        # 同时判断为失效的节点会先后覆盖，等待片刻后以最终留下的认领为准
+        time.sleep(TAKEOVER_SETTLE_SECONDS)
+        current = self._read(path)
+        return bool(current) and current.get("token") == record["token"]
+
+    def _heartbeat_loop(self):
+        while not self.stopped.wait(self.settings["heartbeat_seconds"]):
+            with self.lock:
+                held = dict(self.held)
+            for path, token in held.items():
+                current = self._read(path)
+                if not current or current.get("token") != token:
+                    self._mark_lost(path, token)
+                    continue
+                try:
+                    os.utime(path)
+                except OSError as e:
+                    print(f"[集群] 心跳失败: {path.name}: {str(e)}")
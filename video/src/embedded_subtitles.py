@@ -0,0 +1,173 @@
+import re
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+# 确保项目根目录和src目录在导入路径中(支持脚本运行和作为video.src模块导入)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from config_loader import config
+
+# 可以直接转换为文本的字幕编码(图形字幕如PGS、VobSub需要OCR，不在此列)
+TEXT_CODECS = {"subrip", "srt", "ass", "ssa", "mov_text", "webvtt", "text"}
+# 常见ISO 639-2语言标签到Whisper语言代码的映射
+LANGUAGE_CODES = {
+    "chi": "zh", "zho": "zh", "chs": "zh", "cht": "zh",
+    "jpn": "ja", "eng": "en", "kor": "ko", "fre": "fr", "fra": "fr",
+    "ger": "de", "deu": "de", "spa": "es", "rus": "ru",
+}
+SRT_TIME = re.compile(r'(\d+):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{3})')
+# ASS覆盖标签({\an8}等)和HTML样式标签
+STYLE_TAGS = re.compile(r'\{\\[^}]*\}|</?[a-zA-Z][^>]*>')
+
+
+def get_embedded_settings():
+    """读取内嵌字幕配置"""
+    settings = config.get_video_config().get("embedded_subtitles", {})
+    return {
+        "enabled": settings.get("enabled", True),
+        "languages": [lang.lower() for lang in settings.get("languages", ["zh", "chi", "zho", "chs", "cht", "中文"])],
+        "fallback_any": settings.get("fallback_any", False),
+        "min_events": int(settings.get("min_events", 10)),
+    }
+
+
+def probe_subtitle_streams(video_path):
+    """用ffprobe列出视频中的字幕流"""
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 's',
+        '-show_entries', 'stream=index,codec_name:stream_tags=language,title:stream_disposition=default,forced',
+        '-of', 'json',
+        str(video_path)
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    except OSError as e:
+        print(f"[内嵌字幕] ffprobe不可用: {str(e)}")
+        return []
+    if result.returncode != 0:
+        return []
+    streams = []
+    for stream in json.loads(result.stdout or "{}").get("streams", []):
+        tags = stream.get("tags", {})
+        disposition = stream.get("disposition", {})
+        streams.append({
+            "index": stream["index"],
+            "codec": stream.get("codec_name", ""),
+            "language": tags.get("language", "").lower(),
+            "title": tags.get("title", ""),
+            "default": bool(disposition.get("default")),
+            "forced": bool(disposition.get("forced")),
+        })
+    return streams
+
+
+def language_rank(stream, languages):
+    """字幕流在语言偏好列表中的位置，不匹配时返回None(标题中包含语言名也算匹配)"""
+    title = stream["title"].lower()
+    for rank, language in enumerate(languages):
+        if stream["language"] == language or stream["language"].startswith(language) or language in title:
+            return rank
+    return None
+
+
+def candidate_streams(streams, languages, fallback_any=False):
+    """按语言偏好和默认标记排序可用的文本字幕流
+
+    强制字幕(forced)通常只包含招牌和外语对白，不作为候选。
+    """
+    candidates = []
+    for stream in streams:
+        if stream["codec"] not in TEXT_CODECS or stream["forced"]:
+            continue
+        rank = language_rank(stream, languages)
+        if rank is None:
+            if not fallback_any:
+                continue
+            rank = len(languages)
+        candidates.append((rank, not stream["default"], stream["index"], stream))
+    return [stream for *_, stream in sorted(candidates, key=lambda item: item[:3])]
+
+
+def extract_stream(video_path, stream_index):
+    """用ffmpeg把字幕流转换为SRT文本"""
+    cmd = [
+        'ffmpeg',
+        '-nostdin',
+        '-v', 'error',
+        '-i', str(video_path),
+        '-map', f'0:{stream_index}',
+        '-f', 'srt',
+        '-'
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    if result.returncode != 0:
+        raise RuntimeError(f"字幕流提取失败: {result.stderr.strip()[-200:]}")
+    return result.stdout
+
+
+def parse_srt(srt_text):
+    """解析SRT文本为[(开始秒, 结束秒, 文本)]，去除样式标签并合并连续重复的字幕"""
+    segments = []
+    for block in re.split(r'\r?\n\s*\r?\n', srt_text.strip()):
+        lines = block.strip().splitlines()
+        for i, line in enumerate(lines):
+            match = SRT_TIME.search(line)
+            if not match:
+                continue
+            h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, match.groups())
+            start = h1 * 3600 + m1 * 60 + s1 + ms1 / 1000
+            end = h2 * 3600 + m2 * 60 + s2 + ms2 / 1000
+            text = " ".join(STYLE_TAGS.sub("", part).replace("\\N", " ").strip() for part in lines[i + 1:])
+            text = re.sub(r'\s+', ' ', text).strip()
+            if text:
+                segments.append((start, end, text))
+            break
+
+    segments.sort(key=lambda segment: segment[0])
+    merged = []
+    for start, end, text in segments:
+        # ASS特效字幕常把同一句拆成多条相邻事件
+        if merged and merged[-1][2] == text and start <= merged[-1][1] + 0.05:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end), text)
+        else:
+            merged.append((start, end, text))
+    return merged
+
+
+def load_embedded_subtitles(video_path, settings=None):
+    """提取视频中可用的内嵌文本字幕
+
+    按语言偏好依次尝试候选字幕流，第一个至少有min_events条字幕的流作为结果。
+
+    Returns:
+        dict | None: 与转录结果相同的结构{"language", "language_probability", "segments"}，
+            另含"stream"(字幕流信息)；没有可用字幕时返回None
+    """
+    settings = settings or get_embedded_settings()
+    streams = probe_subtitle_streams(video_path)
+    for stream in candidate_streams(streams, settings["languages"], settings["fallback_any"]):
+        try:
+            segments = parse_srt(extract_stream(video_path, stream["index"]))
+        except RuntimeError as e:
+            print(f"[内嵌字幕] 流#{stream['index']}提取失败: {str(e)}")
+            continue
+        if len(segments) < settings["min_events"]:
+            print(f"[内嵌字幕] 流#{stream['index']}只有{len(segments)}条字幕，跳过")
+            continue
+        language = stream["language"] or "und"
+        print(f"[内嵌字幕] 使用流#{stream['index']}({stream['codec']}, {language} {stream['title']})，共{len(segments)}条")
+        return {
+            "language": LANGUAGE_CODES.get(language, language),
+            "language_probability": 1.0,
+            "segments": segments,
+            "stream": stream,
+        }
+    return None
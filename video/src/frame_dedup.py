@@ -0,0 +1,61 @@
+import numpy as np
+
+# 差值哈希尺寸：缩放到(HASH_SIZE+1)×HASH_SIZE灰度图，得到HASH_SIZE²位哈希
+HASH_SIZE = 8
+# 0~255每个字节值中1的个数，用于向量化计算汉明距离
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def compute_dhash(frame_paths, hash_size=HASH_SIZE):
+    """批量计算帧的差值哈希(dHash)
+
+    Returns:
+        np.ndarray: 形状为(N, hash_size²)的布尔数组，每行为一帧的哈希位
+    """
+    from PIL import Image
+
+    pixels = np.empty((len(frame_paths), hash_size, hash_size + 1), dtype=np.int16)
+    for i, frame in enumerate(frame_paths):
+        with Image.open(frame) as img:
+            small = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+            pixels[i] = np.asarray(small, dtype=np.int16)
+    # 相邻像素亮度比较，整批一次完成
+    return (pixels[:, :, 1:] > pixels[:, :, :-1]).reshape(len(frame_paths), -1)
+
+
+def frame_hash_hex(frame_paths, hash_size=16):
+    """每帧差值哈希的十六进制字符串(默认256位，用作缓存键)"""
+    hashes = np.packbits(compute_dhash(frame_paths, hash_size), axis=1)
+    return [row.tobytes().hex() for row in hashes]
+
+
+def hamming_matrix(hashes):
+    """所有帧两两之间的汉明距离矩阵"""
+    packed = np.packbits(hashes, axis=1)
+    xor = packed[:, None, :] ^ packed[None, :, :]
+    return POPCOUNT[xor].sum(axis=2, dtype=np.int32)
+
+
+def dedup_frames(frame_paths, threshold=6):
+    """合并近似重复的帧
+
+    按时间顺序遍历，与所有已保留帧的最小汉明距离不超过threshold的帧视为重复并丢弃。
+    静止画面、口播和幻灯片会产生大量几乎相同的帧，去重后再送入视觉模型。
+
+    Args:
+        frame_paths: 按时间排序的帧路径
+        threshold: 判定为重复的最大汉明距离(共HASH_SIZE²位)，小于0时不去重
+
+    Returns:
+        (kept, dropped): 保留的帧路径列表和丢弃的帧数量
+    """
+    if threshold < 0 or len(frame_paths) < 2:
+        return list(frame_paths), 0
+
+    distances = hamming_matrix(compute_dhash(frame_paths))
+    kept = [0]
+    for i in range(1, len(frame_paths)):
+        if distances[i, kept].min() > threshold:
+            kept.append(i)
+
+    return [frame_paths[i] for i in kept], len(frame_paths) - len(kept)
@@ -0,0 +1,193 @@
+import os
+import re
+import uuid
+import shutil
+import subprocess
+from pathlib import Path
+
+# showinfo滤镜输出中的帧序号(从0开始)和时间戳(-copyts时可能为负)
+SHOWINFO_PTS = re.compile(r"Parsed_showinfo.*?\bn:\s*(\d+).*?\bpts_time:\s*(-?[0-9.]+)")
+
+
+def time_str_to_seconds(time_str):
+    """将时间字符串(格式为HH:MM:SS)转换为秒数"""
+    parts = time_str.strip().split(':')
+    if len(parts) == 3:  # HH:MM:SS
+        return int(parts[0]) * 3600 + int(parts[1]) * 60 + float(parts[2])
+    elif len(parts) == 2:  # MM:SS
+        return int(parts[0]) * 60 + float(parts[1])
+    else:  # SS
+        return float(parts[0])
+
+
+def seconds_to_time_str(seconds):
+    """将秒数转换为HH:MM:SS.mmm"""
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600 * 1000)
+    minutes, millis = divmod(millis, 60 * 1000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+def seconds_to_hms(seconds):
+    """将秒数转换为HH:MM:SS(四舍五入到整秒)"""
+    hours, rest = divmod(int(round(seconds)), 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+def segment_dir_name(time_segment):
+    """时间段对应的帧目录名(与逐段提取的命名保持一致)"""
+    return time_segment.replace(':', '_').replace('-', '_')
+
+
+def parse_segment(time_segment):
+    """解析HH:MM:SS-HH:MM:SS格式的时间段，返回(开始秒, 结束秒)"""
+    start, end = time_segment.split('-', 1)
+    return time_str_to_seconds(start), time_str_to_seconds(end)
+
+
+def frame_name(seconds):
+    """按显示时间戳(毫秒)命名帧文件"""
+    return f"pts_{int(round(seconds * 1000)):09d}.jpg"
+
+
+def frame_label(frame_path):
+    """帧文件对应的时间标签：PTS命名的帧返回HH:MM:SS.mmm，其余返回原编号"""
+    stem = Path(frame_path).stem
+    if stem.startswith("pts_"):
+        return seconds_to_time_str(int(stem[4:]) / 1000)
+    return stem.replace('frame_', '')
+
+
+def verify_frames(frame_paths):
+    """过滤无法解码的图片"""
+    from PIL import Image
+
+    frames = []
+    for frame in frame_paths:
+        try:
+            with Image.open(frame) as img:
+                img.verify()
+            frames.append(str(frame))
+        except Exception as e:
+            print(f"无效帧: {frame} - {str(e)}")
+    return frames
+
+
+def extract_keyframes_segment(video_path, time_segment, frame_dir, width=360):
+    """提取单个时间段内的所有I帧(每个时间段单独启动一次ffmpeg)"""
+    segment_dir = Path(frame_dir) / segment_dir_name(time_segment)
+    segment_dir.mkdir(exist_ok=True, parents=True)
+
+    start, end = time_segment.split('-', 1)
+    cmd = [
+        'ffmpeg',
+        '-ss', start.strip(),
+        '-to', end.strip(),
+        '-i', str(video_path),
+        '-vf', f"select='eq(pict_type,I)',scale={width}:-1",
+        '-vsync', 'vfr',
+        '-q:v', '2',
+        str(segment_dir / 'frame_%03d.jpg'),
+        '-y'
+    ]
+    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    return verify_frames(sorted(segment_dir.glob('frame_*.jpg')))
+
+
+def extract_keyframes_multi(video_path, time_segments, frame_dir, width=360, cancel=None):
+    """一次解码提取多个时间段内的全部I帧
+
+    只启动一个ffmpeg进程，从最早的开始时间读到最晚的结束时间，解码器跳过非关键帧；
+    select滤镜保留落在任一时间段内的I帧，showinfo记录每帧的显示时间戳，
+    再按时间戳把帧分发到各时间段目录(命名为pts_<毫秒>.jpg)。
+
+    Args:
+        video_path: 视频文件路径
+        time_segments: HH:MM:SS-HH:MM:SS格式的时间段列表
+        frame_dir: 帧输出根目录
+        width: 输出帧宽度
+        cancel: 可选，每秒调用一次，返回True时终止ffmpeg并抛出RuntimeError
+
+    Returns:
+        dict: 时间段 -> 帧路径列表(按时间排序)，无法解析的时间段对应空列表
+    """
+    frame_dir = Path(frame_dir)
+    bounds = {}
+    for segment in time_segments:
+        try:
+            start, end = parse_segment(segment)
+        except ValueError:
+            print(f"无法解析的时间段: {segment}")
+            continue
+        if end > start:
+            bounds[segment] = (start, end)
+
+    frames_by_segment = {segment: [] for segment in time_segments}
+    if not bounds:
+        return frames_by_segment
+
+    # 每次提取使用独立的扫描目录，允许多个分段并发提取
+    scan_dir = frame_dir / f"_scan_{uuid.uuid4().hex[:8]}"
+    scan_dir.mkdir(parents=True, exist_ok=True)
+
+    first = min(start for start, _ in bounds.values())
+    last = max(end for _, end in bounds.values())
+    ranges = "+".join(f"between(t,{start:.3f},{end:.3f})" for start, end in bounds.values())
+    cmd = [
+        'ffmpeg',
+        '-nostdin',
+        '-hide_banner',
+        '-skip_frame', 'nokey',
+        '-ss', f"{first:.3f}",
+        '-to', f"{last:.3f}",
+        '-copyts',
+        '-i', str(video_path),
+        '-vf', f"select='eq(pict_type,I)*({ranges})',showinfo,scale={width}:-1",
+        '-vsync', 'vfr',
+        '-q:v', '2',
+        str(scan_dir / 'frame_%06d.jpg'),
+        '-y'
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+    while True:
+        try:
+            _, stderr = proc.communicate(timeout=1 if cancel else None)
+            break
+        except subprocess.TimeoutExpired:
+            if cancel():
+                proc.kill()
+                proc.communicate()
+                shutil.rmtree(scan_dir, ignore_errors=True)
+                raise RuntimeError("关键帧提取已取消")
+    if proc.returncode != 0:
+        shutil.rmtree(scan_dir, ignore_errors=True)
+        raise RuntimeError(f"关键帧提取失败: {stderr.strip().splitlines()[-1:]}")
+
+    # 输出文件编号从1开始，与showinfo的帧序号n对应(n+1)
+    timestamps = {int(match.group(1)) + 1: float(match.group(2)) for match in SHOWINFO_PTS.finditer(stderr)}
+    scanned = {int(frame.stem.split('_')[-1]): frame for frame in scan_dir.glob('frame_*.jpg')}
+    unmatched = len(scanned.keys() ^ timestamps.keys())
+    if unmatched:
+        print(f"[关键帧] {unmatched}帧缺少对应的帧文件或时间戳，已跳过")
+
+    for number in sorted(scanned.keys() & timestamps.keys()):
+        frame, seconds = scanned[number], timestamps[number]
+        targets = [segment for segment, (start, end) in bounds.items() if start <= seconds <= end]
+        for index, segment in enumerate(targets):
+            segment_dir = frame_dir / segment_dir_name(segment)
+            segment_dir.mkdir(parents=True, exist_ok=True)
+            target = segment_dir / frame_name(seconds)
+            # 时间段重叠时同一帧需要出现在多个目录
+            if index == len(targets) - 1:
+                os.replace(frame, target)
+            else:
+                shutil.copy2(frame, target)
+            frames_by_segment[segment].append(target)
+
+    shutil.rmtree(scan_dir, ignore_errors=True)
+    for segment, frames in frames_by_segment.items():
+        frames_by_segment[segment] = verify_frames(sorted(frames))
+    return frames_by_segment
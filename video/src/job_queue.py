@@ -0,0 +1,519 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+
+# 确保项目根目录和src目录在导入路径中(支持脚本运行和作为video.src模块导入)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from config_loader import config
+from job_state import VideoJob
+from prefetch import probe_metadata
+
+DEFAULT_QUEUE_PATH = BASE_DIR / "video" / "jobs" / "queue.sqlite"
+# 任务状态: queued等待执行(可能处于重试退避中)、running执行中(持有租约)、failed重试次数用尽、done全部完成
+STATUSES = ["queued", "running", "failed", "done"]
+# 旧版本队列库中缺少的列(启动时自动补上)
+JOB_COLUMNS = {"duration": "REAL", "streams": "TEXT", "folder": "TEXT", "enqueued_at": "REAL"}
+# fair_shares表中记录系统虚拟时间的行(输入目录根下的视频归入"."，不会与之冲突)
+SYSTEM_FOLDER = ""
+
+
+def get_queue_settings():
+    """读取持久化任务队列配置"""
+    settings = config.get_video_config().get("monitor", {}).get("queue", {})
+    return {
+        "path": settings.get("path", "video/jobs/queue.sqlite"),
+        "lease_seconds": float(settings.get("lease_seconds", 300)),
+        "max_attempts": max(1, int(settings.get("max_attempts", 3))),
+        "backoff_seconds": float(settings.get("backoff_seconds", 60)),
+        "max_backoff_seconds": float(settings.get("max_backoff_seconds", 3600)),
+    }
+
+
+def get_scheduling_settings():
+    """读取调度策略配置"""
+    settings = config.get_video_config().get("monitor", {}).get("scheduling", {})
+    policy = str(settings.get("policy", "sjf")).lower()
+    if policy not in SCHEDULING_POLICIES:
+        print(f"[队列] 未知的调度策略{policy}，使用sjf")
+        policy = "sjf"
+    return {
+        "policy": policy,
+        "aging_factor": float(settings.get("aging_factor", 1.0)),
+        "default_duration_seconds": float(settings.get("default_duration_seconds", 1800)),
+        "weights": {str(folder): float(weight) for folder, weight in settings.get("weights", {}).items()},
+    }
+
+
+def probe_video(video_path):
+    """读取视频时长和流信息，结果缓存在任务目录的metadata.json中(预取线程直接复用)
+
+    Returns:
+        dict | None: {"duration", "streams"}，ffprobe失败时返回None
+    """
+    try:
+        job = VideoJob(video_path)
+        if job.has("metadata.json"):
+            return job.read_json("metadata.json")
+        metadata = probe_metadata(video_path)
+        job.write_json("metadata.json", metadata)
+        return metadata
+    except Exception as e:
+        print(f"[队列] 读取视频时长失败: {Path(video_path).name}: {str(e)}")
+        return None
+
+
+def job_cost(job, settings):
+    """任务的估计耗时，按视频时长计(时长未知时使用默认值)"""
+    return job["duration"] if job["duration"] else settings["default_duration_seconds"]
+
+
+def aged_cost(job, now, settings):
+    """考虑等待时间的估计耗时：每等待1秒减去aging_factor秒，长视频等待足够久后也会被选中"""
+    waited = now - (job["enqueued_at"] or job["ctime"] or now)
+    return job_cost(job, settings) - settings["aging_factor"] * waited
+
+
+def schedule_fifo(conn, resource, candidates, now, settings):
+    """按视频创建时间先后"""
+    return min(candidates, key=lambda job: (job["ctime"], job["id"]))
+
+
+def schedule_sjf(conn, resource, candidates, now, settings):
+    """短视频优先，等待时间越长优先级越高"""
+    return min(candidates, key=lambda job: (aged_cost(job, now, settings), job["id"]))
+
+
+def schedule_fair(conn, resource, candidates, now, settings):
+    """输入子目录之间按权重公平分配(起始时间公平排队)，同一子目录内短视频优先
+
+    每个子目录记录一个虚拟完成时间，领取任务后增加 时长/权重；每次选择虚拟时间最小的子目录，
+    空闲后重新出现的子目录从当前系统虚拟时间开始计，不会因为之前空闲而长期独占。
+    """
+    finish = dict(conn.execute("SELECT folder, finish FROM fair_shares WHERE resource = ?", (resource,)).fetchall())
+    system = finish.pop(SYSTEM_FOLDER, 0.0)
+    start = {job["folder"]: max(finish.get(job["folder"], 0.0), system) for job in candidates}
+    folder = min(start, key=lambda name: (start[name], name))
+    job = schedule_sjf(conn, resource, [job for job in candidates if job["folder"] == folder], now, settings)
+    weight = max(settings["weights"].get(folder, 1.0), 0.01)
+    conn.executemany(
+        "INSERT INTO fair_shares (resource, folder, finish) VALUES (?, ?, ?) "
+        "ON CONFLICT(resource, folder) DO UPDATE SET finish = excluded.finish",
+        [(resource, folder, start[folder] + job_cost(job, settings) / weight), (resource, SYSTEM_FOLDER, start[folder])]
+    )
+    return job
+
+
+# 调度策略: 从可领取的任务中选出一个，签名为(conn, resource, candidates, now, settings)
+SCHEDULING_POLICIES = {
+    "fifo": schedule_fifo,
+    "sjf": schedule_sjf,
+    "fair": schedule_fair,
+}
+
+
+def video_fingerprint(video_path):
+    stat = os.stat(video_path)
+    return f"{stat.st_size}:{stat.st_mtime}"
+
+
+class JobQueue:
+    """监控服务的持久化任务队列(SQLite)
+
+    每个视频一行，记录当前步骤、所需资源、状态、重试次数和租约。工作线程领取步骤时取得租约并定期续约，
+    进程崩溃后租约过期，其他工作线程会重新领取(计入重试次数)；失败的步骤按指数退避重试，超过max_attempts次后记为failed。
+    每次步骤执行记录在step_runs中，用于统计各阶段耗时。
+    加入队列时读取一次视频时长和流信息存入jobs表，领取时由调度策略(fifo、sjf、fair)决定先处理哪个视频。
+    """
+
+    def __init__(self, db_path=None, settings=None, scheduling=None):
+        self.settings = settings or get_queue_settings()
+        self.scheduling = scheduling or get_scheduling_settings()
+        db_path = Path(db_path or self.settings["path"] or DEFAULT_QUEUE_PATH)
+        if not db_path.is_absolute():
+            db_path = BASE_DIR / db_path
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, video_path TEXT UNIQUE, fingerprint TEXT, "
+                "ctime REAL, step INTEGER, resource TEXT, status TEXT, attempts INTEGER DEFAULT 0, "
+                "last_error TEXT, lease_owner TEXT, lease_expires REAL, next_run_at REAL, "
+                "created_at REAL, updated_at REAL)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in JOB_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS step_runs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, job_id INTEGER, step INTEGER, stages TEXT, "
+                "started_at REAL, finished_at REAL, success INTEGER, error TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fair_shares ("
+                "resource TEXT, folder TEXT, finish REAL, PRIMARY KEY (resource, folder))"
+            )
+            # 领取任务按资源、状态和可执行时间过滤
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(resource, status, next_run_at, ctime)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(status, lease_expires)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_step_runs_stages ON step_runs(stages, finished_at)")
+
+    def _connect(self):
+        # 每次操作使用独立连接，允许多个线程同时读写
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def enqueue(self, video_path, ctime, resource, folder="."):
+        """加入视频，排队中或执行中的视频保持原状态
+
+        重试次数用尽的视频只有在文件内容(大小、修改时间)变化后才重新排队；
+        已完成的视频再次加入(调用方判断仍需处理，例如报告被删除)时从第一步重新排队。
+        视频时长和流信息只在首次加入或文件内容变化时读取。
+
+        Args:
+            folder: 视频所在的输入子目录(公平调度按此分组)
+
+        Returns:
+            bool: 是否新加入或重新排队
+        """
+        video_path = str(video_path)
+        fingerprint = video_fingerprint(video_path)
+        with self.lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT status, fingerprint, duration, streams FROM jobs WHERE video_path = ?", (video_path,)
+            ).fetchone()
+        if row and (row[0] in ("queued", "running") or (row[0] == "failed" and row[1] == fingerprint)):
+            return False
+
+        # ffprobe可能较慢，不持有队列锁
+        if row and row[1] == fingerprint and row[2]:
+            duration, streams = row[2], row[3]
+        else:
+            metadata = probe_video(video_path)
+            duration = metadata["duration"] if metadata else None
+            streams = json.dumps(metadata["streams"], ensure_ascii=False) if metadata else None
+
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (video_path, fingerprint, ctime, step, resource, status, attempts, "
+                "next_run_at, created_at, updated_at, duration, streams, folder, enqueued_at) "
+                "VALUES (?, ?, ?, 0, ?, 'queued', 0, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(video_path) DO UPDATE SET fingerprint = excluded.fingerprint, ctime = excluded.ctime, "
+                "step = 0, resource = excluded.resource, status = 'queued', attempts = 0, last_error = NULL, "
+                "lease_owner = NULL, lease_expires = NULL, next_run_at = excluded.next_run_at, updated_at = excluded.updated_at, "
+                "duration = excluded.duration, streams = excluded.streams, folder = excluded.folder, "
+                "enqueued_at = excluded.enqueued_at",
+                (video_path, fingerprint, ctime, resource, now, now, now, duration, streams, folder, now)
+            )
+        return True
+
+    def claim(self, resource, owner):
+        """按调度策略领取一个可执行的步骤(排队中且退避结束，或租约已过期的执行中步骤)
+
+        Returns:
+            dict | None: {"id", "video_path", "step", "attempts"}
+        """
+        now = time.time()
+        with self.lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.row_factory = sqlite3.Row
+                # 租约过期说明执行进程崩溃或被终止，计入重试次数，达到上限的不再领取
+                exhausted = conn.execute(
+                    "SELECT video_path FROM jobs WHERE resource = ? AND status = 'running' AND lease_expires < ? "
+                    "AND attempts + 1 >= ?",
+                    (resource, now, self.settings["max_attempts"])
+                ).fetchall()
+                if exhausted:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', attempts = attempts + 1, last_error = ?, lease_owner = NULL, "
+                        "lease_expires = NULL, next_run_at = NULL, updated_at = ? WHERE resource = ? AND status = 'running' "
+                        "AND lease_expires < ? AND attempts + 1 >= ?",
+                        ("租约多次过期(执行进程崩溃或被终止)", now, resource, now, self.settings["max_attempts"])
+                    )
+                candidates = conn.execute(
+                    "SELECT id, video_path, step, attempts, status, ctime, duration, "
+                    "COALESCE(folder, '.') AS folder, enqueued_at FROM jobs WHERE resource = ? AND "
+                    "((status = 'queued' AND next_run_at <= ?) OR (status = 'running' AND lease_expires < ?))",
+                    (resource, now, now)
+                ).fetchall()
+                if not candidates:
+                    conn.execute("COMMIT")
+                    job = None
+                else:
+                    policy = SCHEDULING_POLICIES[self.scheduling["policy"]]
+                    job = policy(conn, resource, candidates, now, self.scheduling)
+                    reclaimed = 1 if job["status"] == "running" else 0
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + ?, lease_owner = ?, lease_expires = ?, "
+                        "updated_at = ? WHERE id = ?",
+                        (reclaimed, owner, now + self.settings["lease_seconds"], now, job["id"])
+                    )
+                    conn.execute("COMMIT")
+            finally:
+                conn.close()
+        for row in exhausted:
+            print(f"[队列] 租约多次过期，不再重试: {Path(row['video_path']).name}")
+        if job is None:
+            return None
+        if reclaimed:
+            print(f"[队列] 租约过期，重新领取: {Path(job['video_path']).name}")
+        return {
+            "id": job["id"], "video_path": job["video_path"], "step": job["step"],
+            "attempts": job["attempts"] + reclaimed, "duration": job["duration"],
+        }
+
+    def renew(self, job_id, owner):
+        """续约，租约已被他人接管时返回False"""
+        with self.lock, self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (time.time() + self.settings["lease_seconds"], job_id, owner)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, owner, next_resource=None):
+        """当前步骤完成：有下一步时进入下一步资源的队列，否则记为done"""
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            if next_resource:
+                conn.execute(
+                    "UPDATE jobs SET step = step + 1, resource = ?, status = 'queued', attempts = 0, last_error = NULL, "
+                    "lease_owner = NULL, lease_expires = NULL, next_run_at = ?, updated_at = ? "
+                    "WHERE id = ? AND lease_owner = ?",
+                    (next_resource, now, now, job_id, owner)
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                    "WHERE id = ? AND lease_owner = ?",
+                    (now, job_id, owner)
+                )
+
+    def fail(self, job_id, owner, error):
+        """当前步骤失败：未超过重试次数时按指数退避重新排队
+
+        Returns:
+            str: 失败后的状态(queued或failed)
+        """
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            if attempts >= self.settings["max_attempts"]:
+                status, next_run_at = "failed", None
+            else:
+                status = "queued"
+                delay = self.settings["backoff_seconds"] * 2 ** (attempts - 1)
+                next_run_at = now + min(delay, self.settings["max_backoff_seconds"])
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, last_error = ?, lease_owner = NULL, lease_expires = NULL, "
+                "next_run_at = ?, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (status, attempts, str(error)[:1000], next_run_at, now, job_id, owner)
+            )
+        return status
+
+    def defer(self, job_id, owner, seconds):
+        """暂不执行(例如其他节点正在处理该视频)，seconds秒后重新领取，不计入重试次数"""
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', lease_owner = NULL, lease_expires = NULL, next_run_at = ?, "
+                "updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (now + seconds, now, job_id, owner)
+            )
+
+    def settle(self, job_id, owner, status, error=None):
+        """直接记为done或failed(其他节点已处理完该视频)"""
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, last_error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ?",
+                (status, error, now, job_id, owner)
+            )
+
+    def remove(self, video_path):
+        """视频被删除时移除其任务"""
+        with self.lock, self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE video_path = ?", (str(video_path),))
+
+    def record_run(self, job_id, step, stages, started_at, success, error=None):
+        """记录一次步骤执行(用于耗时统计)"""
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO step_runs (job_id, step, stages, started_at, finished_at, success, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, step, stages, started_at, time.time(), int(success), error)
+            )
+
+    def retry(self, video_path=None):
+        """把failed的视频(不指定时为全部)重新排队，返回数量"""
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            query = "UPDATE jobs SET status = 'queued', attempts = 0, next_run_at = ?, updated_at = ? WHERE status = 'failed'"
+            params = [now, now]
+            if video_path:
+                query += " AND video_path = ?"
+                params.append(str(video_path))
+            return conn.execute(query, params).rowcount
+
+    def depth(self):
+        """各资源各状态的任务数: {(resource, status): count}"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT resource, status, COUNT(*) FROM jobs GROUP BY resource, status").fetchall()
+        return {(resource, status): count for resource, status, count in rows}
+
+    def latency(self, since=None):
+        """各步骤的执行次数、失败次数和耗时(平均、P50、P95，单位秒)"""
+        query = "SELECT stages, success, finished_at - started_at FROM step_runs"
+        params = []
+        if since:
+            query += " WHERE finished_at >= ?"
+            params.append(since)
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY stages", params).fetchall()
+        stats = {}
+        for stages, success, duration in rows:
+            entry = stats.setdefault(stages, {"runs": 0, "failed": 0, "durations": []})
+            entry["runs"] += 1
+            if success:
+                entry["durations"].append(duration)
+            else:
+                entry["failed"] += 1
+        for entry in stats.values():
+            durations = sorted(entry.pop("durations"))
+            if durations:
+                entry["avg"] = sum(durations) / len(durations)
+                entry["p50"] = durations[len(durations) // 2]
+                entry["p95"] = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        return stats
+
+    def waiting_jobs(self, limit=10):
+        """排队中的视频按领取顺序列出(每类资源前limit个，fair策略按sjf顺序列出，不修改公平调度状态)
+
+        Returns:
+            dict: {resource: [(video_path, duration, folder)]}
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT id, video_path, resource, ctime, duration, COALESCE(folder, '.') AS folder, enqueued_at "
+                "FROM jobs WHERE status = 'queued'"
+            ).fetchall()
+        order = schedule_fifo if self.scheduling["policy"] == "fifo" else schedule_sjf
+        waiting = {}
+        for resource in sorted({row["resource"] for row in rows}):
+            candidates = [row for row in rows if row["resource"] == resource]
+            ranked = []
+            while candidates and len(ranked) < limit:
+                job = order(None, resource, candidates, now, self.scheduling)
+                candidates.remove(job)
+                ranked.append((job["video_path"], job["duration"], job["folder"]))
+            waiting[resource] = ranked
+        return waiting
+
+    def failed_jobs(self):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT video_path, step, attempts, last_error FROM jobs WHERE status = 'failed' ORDER BY updated_at"
+            ).fetchall()
+
+
+class LeaseKeeper:
+    """步骤执行期间在后台线程中定期续约"""
+
+    def __init__(self, job_queue, job_id, owner):
+        self.job_queue = job_queue
+        self.job_id = job_id
+        self.owner = owner
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        interval = max(1.0, self.job_queue.settings["lease_seconds"] / 3)
+        while not self.stopped.wait(interval):
+            try:
+                renewed = self.job_queue.renew(self.job_id, self.owner)
+            except sqlite3.Error as e:
+                # 数据库暂时被锁等错误不结束续约，下一次再试
+                print(f"[队列] 续约失败，稍后重试: 任务{self.job_id}: {str(e)}")
+                continue
+            if not renewed:
+                print(f"[队列] 租约已失效: 任务{self.job_id}")
+                return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+def print_stats(job_queue, hours=24):
+    """打印队列深度、各步骤耗时和失败的视频"""
+    depth = job_queue.depth()
+    resources = sorted({resource for resource, _ in depth})
+    print("队列深度:")
+    print(f"  {'资源':<8}" + "".join(f"{status:>10}" for status in STATUSES))
+    for resource in resources:
+        print(f"  {resource:<8}" + "".join(f"{depth.get((resource, status), 0):>10}" for status in STATUSES))
+
+    print(f"\n最近{hours:g}小时各步骤耗时(秒):")
+    print(f"  {'步骤':<20}{'次数':>6}{'失败':>6}{'平均':>10}{'P50':>10}{'P95':>10}")
+    for stages, entry in sorted(job_queue.latency(time.time() - hours * 3600).items()):
+        if "avg" in entry:
+            timing = f"{entry['avg']:>10.1f}{entry['p50']:>10.1f}{entry['p95']:>10.1f}"
+        else:
+            timing = f"{'-':>10}{'-':>10}{'-':>10}"
+        print(f"  {stages:<20}{entry['runs']:>6}{entry['failed']:>6}{timing}")
+
+    print(f"\n排队中的视频(调度策略: {job_queue.scheduling['policy']}):")
+    for resource, jobs in job_queue.waiting_jobs().items():
+        for video_path, duration, folder in jobs:
+            length = f"{duration / 60:.1f}分钟" if duration else "时长未知"
+            print(f"  {resource:<8}{folder:<16}{length:>12}  {Path(video_path).name}")
+
+    failed = job_queue.failed_jobs()
+    if failed:
+        print("\n失败的视频:")
+        for video_path, step, attempts, error in failed:
+            print(f"  {Path(video_path).name} (步骤{step + 1}，尝试{attempts}次): {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="视频监控任务队列")
+    subparsers = parser.add_subparsers(dest="command")
+    stats_parser = subparsers.add_parser("stats", help="查看队列深度和各步骤耗时")
+    stats_parser.add_argument("--hours", type=float, default=24, help="耗时统计的时间范围(小时)")
+    retry_parser = subparsers.add_parser("retry", help="重新排队失败的视频")
+    retry_parser.add_argument("video_path", nargs="?", help="视频路径(不指定时重试全部)")
+    args = parser.parse_args()
+
+    job_queue = JobQueue()
+    if args.command == "retry":
+        video_path = Path(args.video_path).resolve() if args.video_path else None
+        print(f"已重新排队{job_queue.retry(video_path)}个视频")
+    else:
+        print_stats(job_queue, getattr(args, "hours", 24))
+
+
+if __name__ == "__main__":
+    main()
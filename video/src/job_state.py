@@ -0,0 +1,153 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+
+JOBS_DIR = Path(__file__).parent.parent / "jobs"
+
+# 分析流水线的五个阶段(按执行顺序)
+STAGES = ["audio", "transcribe", "analyze", "vision", "report"]
+# 各阶段产物的文件名或前缀，重跑某阶段时据此清理旧产物
+STAGE_ARTIFACTS = {
+    "audio": ["audio.wav", "embedded_subtitles.txt"],
+    "transcribe": ["subtitles.txt"],
+    "analyze": ["chunks.json", "analysis_"],
+    "vision": ["vision_", "keyframes.skip"],
+    "report": ["report_"],
+}
+# 阶段完成后必须存在于任务目录中的产物，缺失时该阶段视为未完成
+STAGE_OUTPUTS = {
+    "transcribe": ["subtitles.txt"],
+    "analyze": ["chunks.json"],
+}
+
+
+def job_id_for(video_path):
+    """由视频文件名和绝对路径生成任务ID"""
+    video_path = Path(video_path).resolve()
+    stem = re.sub(r'[^\w\-]+', '_', video_path.stem)[:60]
+    digest = hashlib.sha1(str(video_path).encode("utf-8")).hexdigest()[:8]
+    return f"{stem}_{digest}"
+
+
+class VideoJob:
+    """单个视频的分析任务目录与进度清单
+
+    每个阶段完成后把产物写入任务目录并在manifest.json中记录，进程崩溃后重新运行会跳过已完成的阶段。
+    视频文件的大小或修改时间变化时视为新内容，旧产物全部作废。
+    """
+
+    def __init__(self, video_path, jobs_dir=None):
+        self.video_path = Path(video_path).resolve()
+        self.job_id = job_id_for(self.video_path)
+        self.dir = Path(jobs_dir or JOBS_DIR) / self.job_id
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.dir / "manifest.json"
+        self.lock = threading.Lock()
+        self.manifest = self._load()
+
+    def _fingerprint(self):
+        stat = self.video_path.stat()
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def _new_manifest(self):
+        return {
+            "job_id": self.job_id,
+            "video": str(self.video_path),
+            "fingerprint": self._fingerprint(),
+            "created_at": time.time(),
+            "stages": {},
+        }
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return self._new_manifest()
+
+        if manifest.get("fingerprint") != self._fingerprint():
+            print(f"[任务] 视频内容已变化，丢弃旧进度: {self.job_id}")
+            for child in self.dir.iterdir():
+                if child.is_dir():
+                    shutil.rmtree(child, ignore_errors=True)
+                else:
+                    child.unlink()
+            return self._new_manifest()
+        return manifest
+
+    def save(self):
+        """原子写入进度清单"""
+        with self.lock:
+            temp_path = self.manifest_path.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.manifest_path)
+
+    def is_done(self, stage):
+        """阶段已完成且产物都还在(例如output目录中的报告被删除后，report阶段需要重跑)"""
+        entry = self.manifest["stages"].get(stage, {})
+        if entry.get("status") != "done":
+            return False
+        outputs = [self.dir / name for name in STAGE_OUTPUTS.get(stage, [])]
+        outputs += [Path(path) for path in entry.get("outputs", [])]
+        return all(path.exists() for path in outputs)
+
+    def stage_info(self, stage):
+        return self.manifest["stages"].get(stage, {}).get("info", {})
+
+    def mark_started(self, stage):
+        self.manifest["stages"][stage] = {"status": "running", "started_at": time.time()}
+        self.save()
+
+    def mark_done(self, stage, info=None):
+        entry = self.manifest["stages"].setdefault(stage, {})
+        entry.update({"status": "done", "finished_at": time.time(), "info": info or {}})
+        self.save()
+
+    def record_outputs(self, stage, paths):
+        """记录阶段写到任务目录之外的产物(如最终报告)，判断阶段是否完成时检查它们是否存在"""
+        entry = self.manifest["stages"].setdefault(stage, {})
+        entry["outputs"] = [str(Path(path).resolve()) for path in paths]
+        self.save()
+
+    def mark_incomplete(self, stage, error):
+        entry = self.manifest["stages"].setdefault(stage, {})
+        entry.update({"status": "incomplete", "finished_at": time.time(), "error": str(error)})
+        self.save()
+
+    def invalidate(self, stages):
+        """作废指定阶段的进度和产物"""
+        for stage in stages:
+            self.manifest["stages"].pop(stage, None)
+            for pattern in STAGE_ARTIFACTS.get(stage, []):
+                for path in self.dir.glob(f"{pattern}*"):
+                    path.unlink()
+        self.save()
+
+    def path(self, name):
+        return self.dir / name
+
+    def has(self, name):
+        return (self.dir / name).exists()
+
+    def write_text(self, name, content):
+        """原子写入文本产物"""
+        path = self.dir / name
+        temp_path = path.with_name(f".{name}.tmp")
+        temp_path.write_text(content, encoding="utf-8")
+        os.replace(temp_path, path)
+        return path
+
+    def read_text(self, name):
+        return (self.dir / name).read_text(encoding="utf-8")
+
+    def write_json(self, name, data):
+        return self.write_text(name, json.dumps(data, ensure_ascii=False, indent=2))
+
+    def read_json(self, name):
+        return json.loads(self.read_text(name))
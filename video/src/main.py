@@ -7,32 +7,63 @@ from pathlib import Path
 from openai import OpenAI
 import traceback
 import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# 确保项目根目录和src目录在导入路径中(支持脚本运行和作为video.src.main导入)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
 from config_loader import config
+from llm_cache import cached_chat
+from asr_server import transcribe as asr_transcribe
+from sharded_asr import transcribe_sharded
+from transcript_cache import cached_transcription, is_transcript_cached, media_hash
+from job_state import VideoJob, STAGES
+from report_sidecar import build_report_data, write_sidecar
+from frame_dedup import dedup_frames
+from vision_scheduler import VisionScheduler
+from subtitle_chunker import chunk_subtitles, estimate_tokens, parse_entries
+from embedded_subtitles import get_embedded_settings, load_embedded_subtitles
+from speech_index import get_speech_settings, build_speech_index, clip_timestamps, silent_gaps
+from scene_sampler import sample_scene_frames
+from prefetch import (
+    Prefetcher, KEYFRAME_DIR, KEYFRAME_SKIP, get_prefetch_settings, has_keyframe_index, frames_from_index,
+    skip_keyframe_index, wait_for_keyframe_index
+)
+from frame_extractor import (
+    seconds_to_hms, parse_segment, frame_label,
+    extract_keyframes_segment, extract_keyframes_multi
+)
 
 
 # 临时文件目录配置 (统一到video目录下)
 TEMP_DIR = Path(__file__).parent.parent / "temp"
 TEMP_DIR.mkdir(exist_ok=True, parents=True)
-CHUNK_REPORT_DIR = TEMP_DIR / "chunk_reports"
-CHUNK_REPORT_DIR.mkdir(exist_ok=True)
-FRAME_DIR = TEMP_DIR / "frames"
-FRAME_DIR.mkdir(exist_ok=True)
-
-def save_temp_file(content, prefix=""):
-    """保存临时文件到指定子目录"""
-    temp_path = CHUNK_REPORT_DIR / f"{prefix}{uuid.uuid4().hex}.tmp"
-    temp_path.write_text(content, encoding="utf-8")
-    return temp_path
 
-def cleanup_temp_files():
-    """清理所有临时文件"""
-    shutil.rmtree(TEMP_DIR, ignore_errors=True)
+def job_workspace(job):
+    """任务的临时工作目录TEMP_DIR/<任务ID>，同时处理多个视频时各自的帧和分段报告互不干扰"""
+    workspace = TEMP_DIR / job.job_id
+    (workspace / "frames").mkdir(parents=True, exist_ok=True)
+    (workspace / "chunk_reports").mkdir(parents=True, exist_ok=True)
+    return workspace
+
+def clean_job_workspace(job):
+    """只清理本任务的临时工作目录"""
+    workspace = TEMP_DIR / job.job_id
+    if workspace.exists():
+        shutil.rmtree(workspace, ignore_errors=True)
+        print(f"已清理临时目录: {workspace}")
 
 
 # 配置常量
-MODEL_PATH = str(Path(__file__).parent.parent / "models" / "Faster-Whisper")
 OUTPUT_DIR = str(Path(__file__).parent.parent / "output")
 SUPPORTED_VIDEO_EXTS = [".mp4", ".mkv", ".avi", ".mov"]
+# 影响转录结果的参数(同时作为转录缓存键的一部分)
+ASR_OPTIONS = {"beam_size": 5}
 
 # 初始化客户端
 deepseek_api_key = config.get_deepseek_key()
@@ -41,20 +72,15 @@ if not deepseek_api_key:
     exit(1)
 client = OpenAI(api_key=deepseek_api_key, base_url="https://api.deepseek.com")
 
-def time_str_to_seconds(time_str):
-    """将时间字符串(格式为HH:MM:SS)转换为秒数"""
-    parts = time_str.split(':')
-    if len(parts) == 3:  # HH:MM:SS
-        return int(parts[0]) * 3600 + int(parts[1]) * 60 + float(parts[2])
-    elif len(parts) == 2:  # MM:SS
-        return int(parts[0]) * 60 + float(parts[1])
-    else:  # SS
-        return float(parts[0])
-
-def extract_audio(video_path):
-    """从视频中提取音频为WAV格式"""
-    Path(TEMP_DIR).mkdir(exist_ok=True, parents=True)
-    audio_path = Path(TEMP_DIR) / f"{Path(video_path).stem}.wav"
+def extract_audio(video_path, audio_path=None):
+    """从视频中提取音频为WAV格式
+    Args:
+        video_path: 视频文件路径
+        audio_path: 输出路径，默认写入临时目录下的<视频名>_<随机后缀>.wav
+    """
+    if audio_path is None:
+        Path(TEMP_DIR).mkdir(exist_ok=True, parents=True)
+        audio_path = Path(TEMP_DIR) / f"{Path(video_path).stem}_{uuid.uuid4().hex[:8]}.wav"
     
     cmd = [
         'ffmpeg',
@@ -74,39 +100,94 @@ def extract_audio(video_path):
     
     return audio_path
 
-def transcribe_audio(audio_path):
-    """转录音频为字幕"""
-    from faster_whisper import WhisperModel
-    
-    print(f"开始语音识别: {audio_path}")
-    model = WhisperModel(MODEL_PATH, device="cpu", compute_type="int8")
-    segments, info = model.transcribe(str(audio_path), beam_size=5)
-    
-    # 准备字幕内容
+def format_subtitles(result):
+    """把转录结果格式化为字幕文本([start-end]: text)"""
     subtitles = []
-    subtitles.append(f"检测语言: {info.language}")
-    subtitles.append(f"概率: {info.language_probability:.2f}\n")
+    subtitles.append(f"检测语言: {result['language']}")
+    subtitles.append(f"概率: {result['language_probability']:.2f}\n")
     
-    for segment in segments:
-        start = segment.start
-        end = segment.end
-        text = segment.text
+    for start, end, text in result["segments"]:
         subtitles.append(f"[{start:.2f}-{end:.2f}]: {text}")
     
     return "\n".join(subtitles)
 
+def run_asr(audio_path, stream=False, options=None):
+    """执行语音识别，返回转录结果字典(不经过缓存)"""
+    print(f"开始语音识别: {audio_path}")
+    video_config = config.get_video_config()
+    return asr_transcribe(
+        audio_path,
+        stream=stream,
+        window_seconds=float(video_config.get("stream_window_seconds", 600)),
+        **(options or ASR_OPTIONS)
+    )
+
+def transcribe_audio(audio_path, stream=False):
+    """转录音频为字幕(优先使用转录缓存和常驻语音识别服务)
+    Args:
+        audio_path: 音频文件路径(流式模式下可直接传入视频文件)
+        stream: 是否通过ffmpeg管道流式解码，不生成中间WAV
+    """
+    result = cached_transcription(audio_path, ASR_OPTIONS, lambda: run_asr(audio_path, stream))
+    return format_subtitles(result)
+
+def transcription_options(speech=None):
+    """按语音活动索引生成转录参数，返回(参数, 有声区间)
+
+    有声区间只占一部分时通过clip_timestamps让Whisper跳过静音，否则整段转录(有声区间为None)。
+    """
+    clips = clip_timestamps(speech, get_speech_settings()["max_speech_ratio"]) if speech else None
+    if not clips:
+        return dict(ASR_OPTIONS), None
+    return {**ASR_OPTIONS, "clip_timestamps": clips}, speech["regions"]
+
+def transcribe_video(video_path, audio_path=None, speech=None):
+    """提取音频并转录视频字幕
+
+    先按音频流内容哈希查转录缓存；未命中时，asr_mode为stream则直接从ffmpeg管道读取音频，
+    失败后回退到落地WAV的方式；为sharded时在静音处切分WAV并用进程池并行转录。
+    Args:
+        video_path: 视频文件路径
+        audio_path: WAV路径，文件已存在时直接使用，否则在需要时提取到该路径
+        speech: 语音活动索引，提供时只转录有声区间
+    """
+    options, regions = transcription_options(speech)
+    if regions:
+        print(f"[语音检测] 只转录{len(regions)}个有声区间(共{speech['speech_seconds']:.0f}秒)")
+
+    def compute():
+        asr_mode = config.get_video_config().get("asr_mode", "stream")
+        wav_path = Path(audio_path) if audio_path else None
+        if asr_mode == "stream" and (wav_path is None or not wav_path.exists()):
+            try:
+                return run_asr(video_path, stream=True, options=options)
+            except Exception as e:
+                print(f"流式转录失败，回退到WAV模式: {str(e)}")
+
+        if wav_path is None or not wav_path.exists():
+            wav_path = extract_audio(video_path, wav_path)
+        if asr_mode == "sharded":
+            try:
+                return transcribe_sharded(wav_path, regions=regions, **ASR_OPTIONS)
+            except Exception as e:
+                print(f"分片转录失败，回退到单进程转录: {str(e)}")
+        return run_asr(wav_path, options=options)
+
+    return format_subtitles(cached_transcription(video_path, options, compute))
+
 def analyze_subtitles(subtitles, is_chunk=False):
     """分析字幕内容，判断是否需要视觉识别
     Args:
         subtitles: 要分析的字幕内容
         is_chunk: 是否为分批处理的片段(会调整提示词)
     """
-    # 统计字符数
-    char_count = len(subtitles.encode('utf-8'))
-    print(f"[字幕分析] 字符数: {char_count:,}")
+    # 估算token数
+    token_count = estimate_tokens(subtitles)
+    max_tokens = int(config.get_video_config().get("chunk_max_tokens", 16000))
+    print(f"[字幕分析] 估算token数: {token_count:,}")
     
-    if char_count > 64000 and not is_chunk:
-        raise ValueError(f"字幕过长({char_count:,}字符)，请先分割处理")
+    if token_count > max_tokens and not is_chunk:
+        raise ValueError(f"字幕过长(约{token_count:,} tokens)，请先分割处理")
 
     system_prompt = """
 你是一个专业的剪辑脚本设计师，需要根据视频字幕内容完成以下任务：
@@ -130,9 +211,11 @@ def analyze_subtitles(subtitles, is_chunk=False):
 """
 
     # 调用DeepSeek-R1模型
-    response = client.chat.completions.create(
-        model="deepseek-reasoner",
-        messages=[
+    # 相同字幕和提示词的结果直接读取响应缓存
+    return cached_chat(
+        client,
+        "deepseek-reasoner",
+        [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": f"请分析以下视频字幕内容：\n\n{subtitles}"}
         ],
@@ -140,43 +223,27 @@ def analyze_subtitles(subtitles, is_chunk=False):
         stream=False
     )
 
-    return response.choices[0].message.content
+def extract_keyframes(video_path, time_segment, frame_dir):
+    """提取时间段内的所有关键帧(每个时间段单独启动一次ffmpeg)"""
+    return extract_keyframes_segment(video_path, time_segment, frame_dir)
 
-def extract_keyframes(video_path, time_segment):
-    """提取时间段内的所有关键帧"""
-    from PIL import Image
-    
-    # 创建时间段目录
-    segment_name = time_segment.replace(':', '_').replace('-', '_')
-    segment_dir = FRAME_DIR / segment_name
-    segment_dir.mkdir(exist_ok=True, parents=True)
-    
-    # 提取所有关键帧
-    cmd = [
-        'ffmpeg',
-        '-ss', time_segment.split('-')[0],
-        '-to', time_segment.split('-')[1],
-        '-i', str(video_path),
-        '-vf', "select='eq(pict_type,I)',scale=360:-1",
-        '-vsync', 'vfr',
-        '-q:v', '2',
-        str(segment_dir / 'frame_%03d.jpg'),
-        '-y'
-    ]
-    
-    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    
-    # 验证并返回帧列表
-    frames = []
-    for frame in sorted(segment_dir.glob('frame_*.jpg')):
-        try:
-            with Image.open(frame) as img:
-                img.verify()
-            frames.append(str(frame))
-        except Exception as e:
-            print(f"无效帧: {frame} - {str(e)}")
-    
-    return frames
+def sample_segment_frames(video_path, time_segment, frame_dir):
+    """按镜头切换为时间段挑选代表帧，失败时回退到提取I帧"""
+    scene_config = config.get_video_config().get("scene_sampler", {})
+    try:
+        return sample_scene_frames(
+            video_path,
+            time_segment,
+            frame_dir,
+            fps=float(scene_config.get("fps", 4)),
+            threshold=float(scene_config.get("threshold", 0.35)),
+            max_frames=int(scene_config.get("max_frames_per_segment", 20)),
+            frames_per_shot=int(scene_config.get("frames_per_shot", 2)),
+            min_shot_seconds=float(scene_config.get("min_shot_seconds", 1.0))
+        )
+    except Exception as e:
+        print(f"镜头采样失败，改为提取I帧 {time_segment}: {str(e)}")
+        return extract_keyframes(video_path, time_segment, frame_dir)
 
 def check_ollama_connection():
     """简化版Ollama连接检查"""
@@ -204,40 +271,39 @@ def analyze_keyframes(frame_paths):
 
         descriptions = []
         frame_paths = sorted(frame_paths)
-
-        for i in range(0, len(frame_paths), 5):
-            batch = frame_paths[i:i+5]
-            try:
-                ollama_config = config.get_ollama_config()
-                response = client.generate(
-                    model=ollama_config.get('vision_model', 'qwen2.5vl:3b'),
-                    prompt=prompt,
-                    images=batch,
-                    options={'num_thread': 2}
-                )
-                desc = response['response']
-                
-                # 获取时间范围
-                first_frame = Path(batch[0]).stem.replace('frame_', '')
-                last_frame = Path(batch[-1]).stem.replace('frame_', '')
-                time_range = f"{first_frame}-{last_frame}"
-                
-                descriptions.append(f"[{time_range}]\n{desc}")
-            except Exception as e:
-                print(f"分析失败: {str(e)}")
+        
+        # 合并近似重复的帧，减少视觉模型推理次数
+        dedup_config = config.get_video_config().get("frame_dedup", {})
+        if dedup_config.get("enabled", True):
+            total = len(frame_paths)
+            frame_paths, dropped = dedup_frames(frame_paths, int(dedup_config.get("threshold", 6)))
+            print(f"[帧去重] 共{total}帧，去除近似重复{dropped}帧，保留{len(frame_paths)}帧")
+
+        # 每5帧一批，交给调度器并发请求Ollama，已描述过的批次直接读取缓存
+        batches = [frame_paths[i:i+5] for i in range(0, len(frame_paths), 5)]
+        scheduler = VisionScheduler(client)
+        results = scheduler.run(prompt, batches)
+        
+        for batch, result in zip(batches, results):
+            # 获取时间范围
+            time_range = f"{frame_label(batch[0])}-{frame_label(batch[-1])}"
+            if isinstance(result, Exception):
+                print(f"分析失败: {str(result)}")
                 descriptions.append(f"[{time_range}]\n分析失败")
+            else:
+                descriptions.append(f"[{time_range}]\n{result}")
         
         return "\n\n".join(descriptions)
     except Exception as e:
         print(f"视觉分析失败: {str(e)}")
         return "视觉分析失败: Ollama服务异常"
 
-def generate_chunk_report(video_path, subtitles, analysis_result, visual_analysis, chunk_num=None):
-    """生成分段报告"""
+def generate_chunk_report(video_path, subtitles, analysis_result, visual_analysis, report_dir, chunk_num=None):
+    """生成分段报告，写入report_dir下的临时文件"""
     video_name = Path(video_path).stem
     suffix = f"_chunk{chunk_num}" if chunk_num else ""
-    temp_path = CHUNK_REPORT_DIR / f"{video_name}{suffix}_temp_report.txt"
-    Path(CHUNK_REPORT_DIR).mkdir(exist_ok=True, parents=True)
+    temp_path = Path(report_dir) / f"{video_name}{suffix}_temp_report.txt"
+    Path(report_dir).mkdir(exist_ok=True, parents=True)
     
     # 如果有视觉分析内容，先进行整合推理
     integrated_summary = ""
@@ -271,15 +337,15 @@ def generate_chunk_report(video_path, subtitles, analysis_result, visual_analysi
 最终只输出一段话，清楚一个完整的故事，3000字以内.
 """
         try:
-            integrate_response = client.chat.completions.create(
-                model="deepseek-reasoner",
-                messages=[
+            integrated_summary = cached_chat(
+                client,
+                "deepseek-reasoner",
+                [
                     {"role": "system", "content": integrate_prompt},
                     {"role": "user", "content": f"字幕内容：\n{subtitles}\n\n视觉分析：\n{visual_analysis}\n\n初步分析结果：\n{analysis_result}"}
                 ],
                 temperature=1.0
             )
-            integrated_summary = integrate_response.choices[0].message.content
             print("\n=== 整合推理结果 ===")
             print(integrated_summary)  # 输出完整内容
             print(f"完整结果长度: {len(integrated_summary)}字符") 
@@ -335,9 +401,10 @@ def generate_chunk_report(video_path, subtitles, analysis_result, visual_analysi
 """
     
     # 调用模型生成报告
-    response = client.chat.completions.create(
-        model="deepseek-reasoner",
-        messages=[
+    report = cached_chat(
+        client,
+        "deepseek-reasoner",
+        [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_content}
         ],
@@ -346,14 +413,16 @@ def generate_chunk_report(video_path, subtitles, analysis_result, visual_analysi
     )
     
     # 保存临时报告
-    report = response.choices[0].message.content
     with open(temp_path, "w", encoding="utf-8") as f:
         f.write(report)
     
     return temp_path
 
-def merge_reports(video_path, chunk_reports):
-    """合并所有分块报告为最终报告"""
+def merge_reports(video_path, chunk_reports, cleanup=True):
+    """合并所有分块报告为最终报告
+    Args:
+        cleanup: 合并后是否删除分块报告(任务目录中的分块报告需保留以便重跑)
+    """
     video_name = Path(video_path).stem
     # 移除可能存在的_final后缀
     if video_name.endswith('_final'):
@@ -369,45 +438,435 @@ def merge_reports(video_path, chunk_reports):
                 f.write(rf.read())
                 f.write("\n\n")
             # 立即删除临时文件
-            Path(report).unlink()
+            if cleanup:
+                Path(report).unlink()
     
     return final_path
 
-def split_subtitles(subtitles, max_chars=40000):
-    """分割字幕为多个不超过max_chars的部分"""
-    lines = subtitles.split('\n')
-    chunks = []
-    current_chunk = []
-    current_size = 0
-    
-    for line in lines:
-        line_size = len(line.encode('utf-8'))
-        if current_size + line_size > max_chars and current_chunk:
-            chunks.append('\n'.join(current_chunk))
-            current_chunk = []
-            current_size = 0
-        current_chunk.append(line)
-        current_size += line_size
-    
-    if current_chunk:
-        chunks.append('\n'.join(current_chunk))
-    
-    return chunks
-
-def clean_temp_files():
-    """清理临时文件"""
-    if Path(TEMP_DIR).exists():
-        shutil.rmtree(TEMP_DIR)
-        print(f"已清理临时目录: {TEMP_DIR}")
+def parse_visual_segments(analysis_result):
+    """从字幕分析结果的表格中解析需要视觉识别的时间段"""
+    visual_segments = []
+    lines = analysis_result.split('\n')
+    table_start = next((i for i, line in enumerate(lines) if "时间段|核心事件|" in line), -1)
+    if table_start != -1:
+        for line in lines[table_start+1:]:
+            if "|" in line and "是" in line:
+                parts = [p.strip() for p in line.split('|') if p.strip()]
+                if len(parts) >= 3:
+                    time_range = parts[0]
+                    if '-' in time_range:
+                        visual_segments.append(time_range)
+    return visual_segments
+
+def add_silent_segments(visual_segments, speech, start=0.0, end=None):
+    """把[start, end]范围内较长的无声区间补充为视觉识别片段
+
+    无声区间(BGM、纯画面)没有字幕可供分析，只能依靠画面理解；已与模型给出的片段重叠的区间不再补充。
+    """
+    covered = []
+    for segment in visual_segments:
+        try:
+            covered.append(parse_segment(segment))
+        except ValueError:
+            continue
+    
+    min_gap = get_speech_settings()["vision_gap_seconds"]
+    added = []
+    for gap_start, gap_end in silent_gaps(speech, start, end, min_gap):
+        if any(gap_start < covered_end and gap_end > covered_start for covered_start, covered_end in covered):
+            continue
+        added.append(f"{seconds_to_hms(gap_start)}-{seconds_to_hms(gap_end)}")
+    if added:
+        print(f"[语音检测] 补充{len(added)}个无声片段进行视觉识别: {', '.join(added)}")
+    return visual_segments + added
+
+def analyze_visual_segments(video_path, visual_segments, frame_dir, keyframe_index=None):
+    """提取并分析各时间段的关键帧(帧写入frame_dir)，返回时间段 -> 视觉分析段落(没有帧时为空字符串)
+
+    keyframe_index为后台预取的整片关键帧索引目录，可用时直接从中取帧，不再解码视频。
+    """
+    if not visual_segments:
+        print("没有需要视觉识别的片段")
+        return {}
+    
+    print(f"需要视觉识别的片段: {len(visual_segments)}个")
+    
+    video_config = config.get_video_config()
+    use_scene = video_config.get("frame_sampler", "iframe") == "scene"
+    
+    # I帧模式默认一次解码提取所有时间段的关键帧，失败或配置为per_segment时逐段提取
+    frames_by_segment = None
+    if not use_scene and video_config.get("frame_extraction", "single_pass") == "single_pass":
+        try:
+            if keyframe_index is not None:
+                frames_by_segment = frames_from_index(keyframe_index, visual_segments, frame_dir)
+            else:
+                frames_by_segment = extract_keyframes_multi(video_path, visual_segments, frame_dir)
+        except Exception as e:
+            print(f"单次解码提取关键帧失败，改为逐段提取: {str(e)}")
+    
+    sections = {}
+    for segment in visual_segments:
+        sections[segment] = ""
+        try:
+            if use_scene:
+                frame_paths = sample_segment_frames(video_path, segment, frame_dir)
+            elif frames_by_segment is not None:
+                frame_paths = frames_by_segment.get(segment, [])
+            else:
+                frame_paths = extract_keyframes(video_path, segment, frame_dir)
+            if frame_paths:
+                try:
+                    segment_visual = analyze_keyframes(frame_paths)
+                    sections[segment] = f"\n\n## {segment}\n{segment_visual}"
+                except Exception as e:
+                    print(f"视觉分析失败: {str(e)}")
+                    sections[segment] = f"\n\n## {segment}\n分析失败"
+        except Exception as e:
+            print(f"提取关键帧失败 {segment}: {str(e)}")
+            sections[segment] = f"\n\n## {segment}\n关键帧提取失败"
+    return sections
+
+def run_chunks(func, items):
+    """按video.chunk_workers并发处理各分段，返回失败的分段编号"""
+    workers = max(1, int(config.get_video_config().get("chunk_workers", 3)))
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(func, i, item): i for i, item in enumerate(items, 1)}
+        for future, i in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                print(f"分段{i}处理失败: {str(e)}")
+                failed.append(i)
+    return failed
+
+def load_speech_index(job):
+    """读取任务目录中与当前检测参数一致的语音活动索引"""
+    if not job.has("speech.json"):
+        return None
+    index = job.read_json("speech.json")
+    return index if index.get("settings") == get_speech_settings() else None
+
+def run_audio_stage(job):
+    """步骤1: 准备音频并建立语音活动索引(流式转录或命中转录缓存时不落地WAV)
+
+    视频带有可用的内嵌文本字幕时直接使用字幕，不再提取音频和转录。
+    """
+    if get_embedded_settings()["enabled"]:
+        embedded = load_embedded_subtitles(job.video_path)
+        if embedded:
+            job.write_text("embedded_subtitles.txt", format_subtitles(embedded))
+            return {"embedded": "embedded_subtitles.txt", "stream_index": embedded["stream"]["index"]}
+    
+    asr_mode = config.get_video_config().get("asr_mode", "stream")
+    settings = get_speech_settings()
+    if settings["enabled"]:
+        # 索引只取决于视频内容和检测参数，重跑时直接复用
+        speech = load_speech_index(job)
+        if speech and is_transcript_cached(job.video_path, transcription_options(speech)[0]):
+            return {"stream": False, "speech_index": "speech.json"}
+        if asr_mode == "stream":
+            # 流式转录模式下也从ffmpeg管道计算能量，不落地WAV
+            if speech is None:
+                speech = build_speech_index(settings=settings, media_path=job.video_path)
+                speech["settings"] = settings
+                job.write_json("speech.json", speech)
+            return {"stream": True, "speech_index": "speech.json"}
+        wav_path = extract_audio(job.video_path, job.path("audio.wav"))
+        if speech is None:
+            speech = build_speech_index(wav_path, settings)
+            speech["settings"] = settings
+            job.write_json("speech.json", speech)
+        return {"audio": "audio.wav", "speech_index": "speech.json"}
+    
+    if asr_mode == "stream" or is_transcript_cached(job.video_path, ASR_OPTIONS):
+        return {"stream": asr_mode == "stream"}
+    extract_audio(job.video_path, job.path("audio.wav"))
+    return {"audio": "audio.wav"}
+
+def run_transcribe_stage(job):
+    """步骤2: 生成字幕并拷贝到subtitles目录"""
+    audio_info = job.stage_info("audio")
+    if audio_info.get("embedded"):
+        print(f"使用内嵌字幕流#{audio_info.get('stream_index')}，跳过语音识别")
+        subtitles = job.read_text(audio_info["embedded"])
+    else:
+        # 流式转录失败需要回退时也把WAV落在任务目录，不与其他任务共用临时路径
+        speech = load_speech_index(job) if audio_info.get("speech_index") else None
+        subtitles = transcribe_video(job.video_path, job.path("audio.wav"), speech)
+    subtitle_path = job.write_text("subtitles.txt", subtitles)
+    
+    # 同时拷贝到subtitles目录
+    subtitles_dir = Path(__file__).parent.parent / "subtitles"
+    subtitles_dir.mkdir(exist_ok=True, parents=True)
+    dest_path = subtitles_dir / f"{job.video_path.stem}_subtitles.txt"
+    shutil.copy2(subtitle_path, dest_path)
+    
+    # 字幕生成后WAV不再需要
+    job.path("audio.wav").unlink(missing_ok=True)
+    return {"subtitles": "subtitles.txt"}
+
+def run_analyze_stage(job):
+    """步骤3: 分析字幕内容(字幕过长时分段并发分析)"""
+    subtitles = job.read_text("subtitles.txt")
+    video_config = config.get_video_config()
+    # 按估算token数切分，切分点对齐字幕空白，相邻分段带少量重叠
+    chunks = chunk_subtitles(
+        subtitles,
+        max_tokens=int(video_config.get("chunk_max_tokens", 16000)),
+        overlap_seconds=float(video_config.get("chunk_overlap_seconds", 30))
+    )
+    chunked = len(chunks) > 1
+    if chunked:
+        token_count = estimate_tokens(subtitles)
+        print(f"[警告] 字幕过长(约{token_count:,} tokens)，将分批处理")
+        print(f"已分割为 {len(chunks)} 个部分，每个分段约{token_count//len(chunks):,} tokens")
+    job.write_json("chunks.json", {"chunked": chunked, "chunks": chunks})
+    
+    def analyze(i, chunk):
+        name = f"analysis_{i}.txt"
+        if job.has(name):
+            return
+        if chunked:
+            print(f"\n=== 分析分段 {i}/{len(chunks)} ===")
+            print(f"分段长度: 约{estimate_tokens(chunk):,} tokens")
+        analysis_result = analyze_subtitles(chunk, is_chunk=chunked)
+        print(f"分段{i}分析完成" if chunked else f"初步分析结果:\n {analysis_result}")
+        job.write_text(name, analysis_result)
+    
+    failed = run_chunks(analyze, chunks)
+    if not failed and not any(
+        parse_visual_segments(job.read_text(f"analysis_{i}.txt")) for i in range(1, len(chunks) + 1)
+    ):
+        # 没有需要视觉识别的片段，停止后台的关键帧索引
+        skip_keyframe_index(job, "分析结果不需要视觉识别")
+    return failed
+
+def run_vision_stage(job):
+    """步骤4: 提取并分析需要视觉识别的片段"""
+    chunks = job.read_json("chunks.json")["chunks"]
+    speech = load_speech_index(job)
+    keyframe_index = job.path(KEYFRAME_DIR) if has_keyframe_index(job.path(KEYFRAME_DIR)) else None
+    frame_dir = job_workspace(job) / "frames"
+    
+    # 各分段需要视觉识别的时间段(尚未完成的分段)
+    pending = {}
+    for i, chunk in enumerate(chunks, 1):
+        if job.has(f"vision_{i}.txt") or not job.has(f"analysis_{i}.txt"):
+            continue
+        analysis_result = job.read_text(f"analysis_{i}.txt")
+        visual_segments = []
+        if "需要调用视觉识别模型" in analysis_result:
+            visual_segments = parse_visual_segments(analysis_result)
+            if visual_segments and speech:
+                # 分段时只补充本分段字幕覆盖的时间范围
+                entries = parse_entries(chunk)[1] if len(chunks) > 1 else []
+                if entries:
+                    visual_segments = add_silent_segments(visual_segments, speech, entries[0][0], entries[-1][1])
+                else:
+                    visual_segments = add_silent_segments(visual_segments, speech)
+        pending[i] = list(dict.fromkeys(visual_segments))
+    
+    # 相邻分段重叠时可能给出相同的时间段，每个时间段只由第一个包含它的分段提取和分析，
+    # 避免并发的分段写入同一个帧目录
+    owned, seen = {}, set()
+    for i, visual_segments in pending.items():
+        owned[i] = [segment for segment in visual_segments if segment not in seen]
+        seen.update(owned[i])
+    sections = {}
+    
+    def vision(i, chunk):
+        if i in owned:
+            sections.update(analyze_visual_segments(job.video_path, owned[i], frame_dir, keyframe_index))
+    
+    failed = run_chunks(vision, chunks)
+    for i, visual_segments in pending.items():
+        if i in failed:
+            continue
+        if any(segment not in sections for segment in visual_segments):
+            # 共享的时间段所在分段处理失败
+            failed.append(i)
+            continue
+        job.write_text(f"vision_{i}.txt", "".join(sections[segment] for segment in visual_segments))
+    return sorted(failed)
+
+def run_report_stage(job):
+    """步骤5: 生成分段报告并合并为最终报告"""
+    data = job.read_json("chunks.json")
+    chunked, chunks = data["chunked"], data["chunks"]
+    report_dir = job_workspace(job) / "chunk_reports"
+    
+    def report(i, chunk):
+        name = f"report_{i}.txt"
+        if job.has(name) or not job.has(f"analysis_{i}.txt"):
+            return
+        visual_analysis = job.read_text(f"vision_{i}.txt") if job.has(f"vision_{i}.txt") else ""
+        temp_report = generate_chunk_report(
+            job.video_path,
+            chunk,
+            job.read_text(f"analysis_{i}.txt"),
+            visual_analysis,
+            report_dir,
+            chunk_num=i if chunked else None
+        )
+        shutil.move(temp_report, job.path(name))
+    
+    failed = run_chunks(report, chunks)
+    reports = [job.path(f"report_{i}.txt") for i in range(1, len(chunks) + 1) if job.has(f"report_{i}.txt")]
+    if not reports:
+        raise RuntimeError("没有生成任何报告")
+    
+    if chunked:
+        final_path = merge_reports(job.video_path, reports, cleanup=False)
+    else:
+        # 移动报告到output目录
+        final_path = Path(OUTPUT_DIR) / f"{job.video_path.stem}_report.txt"
+        Path(OUTPUT_DIR).mkdir(exist_ok=True, parents=True)
+        shutil.copy2(reports[0], final_path)
+    print(f"最终报告已生成: {final_path}")
+    sidecar = write_report_sidecar(job, final_path, len(chunks))
+    job.record_outputs("report", [final_path] + ([sidecar] if sidecar else []))
+    return failed
+
+def write_report_sidecar(job, report_path, chunk_count):
+    """在文本报告旁写入结构化JSON报告(失败不影响文本报告)，返回JSON报告路径，失败时返回None"""
+    try:
+        try:
+            audio_hash = media_hash(job.video_path)
+        except Exception:
+            audio_hash = None
+        analysis_results = [
+            job.read_text(f"analysis_{i}.txt")
+            for i in range(1, chunk_count + 1) if job.has(f"analysis_{i}.txt")
+        ]
+        data = build_report_data(
+            job.video_path,
+            Path(report_path).read_text(encoding="utf-8"),
+            analysis_results,
+            job.read_text("subtitles.txt"),
+            audio_hash=audio_hash
+        )
+        sidecar = write_sidecar(report_path, data)
+        print(f"结构化报告已生成: {sidecar} ({len(data['segments'])}个分段)")
+        return sidecar
+    except Exception as e:
+        print(f"结构化报告生成失败: {str(e)}")
+        return None
+
+STAGE_RUNNERS = {
+    "audio": ("步骤1/5: 提取音频...", run_audio_stage),
+    "transcribe": ("步骤2/5: 生成字幕...", run_transcribe_stage),
+    "analyze": ("步骤3/5: 分析字幕内容...", run_analyze_stage),
+    "vision": ("步骤4/5: 提取并分析关键帧...", run_vision_stage),
+    "report": ("步骤5/5: 生成报告...", run_report_stage),
+}
+
+def run_pipeline(video_path, from_stage=None, only_stage=None, stages=None, detach_prefetch=False):
+    """按阶段执行视频分析，已完成的阶段从任务目录恢复
+
+    Args:
+        video_path: 视频文件路径
+        from_stage: 从该阶段开始强制重跑(之前未完成的阶段照常补跑)
+        only_stage: 只重跑该阶段，前置阶段必须已完成
+        stages: 只执行这些阶段(已完成的照常跳过)，前置阶段必须已完成；监控服务按资源分步调度时使用
+        detach_prefetch: 本次不执行视觉阶段时不等待关键帧索引，让它在后台继续建立(常驻工作进程中使用，
+            转录步骤不必等待解码完成，视觉步骤再等待索引)
+    """
+    job = VideoJob(video_path)
+    print(f"任务目录: {job.dir}")
+    requested = False
+    
+    if only_stage:
+        missing = [stage for stage in STAGES[:STAGES.index(only_stage)] if not job.is_done(stage)]
+        if missing:
+            raise RuntimeError(f"前置阶段未完成: {', '.join(missing)}")
+        job.invalidate([only_stage])
+        stages = [only_stage]
+    elif stages:
+        requested = True
+        stages = [stage for stage in STAGES if stage in stages]
+        missing = [stage for stage in STAGES[:STAGES.index(stages[0])] if not job.is_done(stage)]
+        if missing:
+            raise RuntimeError(f"前置阶段未完成: {', '.join(missing)}")
+    else:
+        if from_stage:
+            job.invalidate(STAGES[STAGES.index(from_stage):])
+        stages = STAGES
+    
+    # 语音识别期间在后台读取元数据并建立关键帧索引，视觉阶段开始前等待其完成
+    prefetcher = Prefetcher(job).start() if needs_prefetch(job, stages) else None
+    
+    incomplete = None
+    try:
+        for stage in stages:
+            message, runner = STAGE_RUNNERS[stage]
+            if job.is_done(stage):
+                print(f"{message} 已完成，跳过")
+                continue
+            if job.manifest["stages"].get(stage, {}).get("status") == "done":
+                print(f"{message} 产物已缺失，重新执行")
+            if stage == "vision":
+                prepare_keyframe_index(job, prefetcher)
+            print(message)
+            job.mark_started(stage)
+            result = runner(job)
+            # 有分段失败的阶段及其后续阶段都不记为完成，下次运行只补跑缺失的分段产物
+            if isinstance(result, list) and result:
+                incomplete = incomplete or stage
+                job.mark_incomplete(stage, f"失败分段: {result}")
+            elif incomplete:
+                job.mark_incomplete(stage, f"前置阶段未全部完成: {incomplete}")
+            else:
+                job.mark_done(stage, result if isinstance(result, dict) else None)
+            if stage == "vision" and job.is_done(stage):
+                # 关键帧索引只服务于视觉阶段，完成后释放磁盘空间
+                shutil.rmtree(job.path(KEYFRAME_DIR), ignore_errors=True)
+    finally:
+        if prefetcher and not (detach_prefetch and "vision" not in stages):
+            prefetcher.close()
+        clean_job_workspace(job)
+    
+    if requested:
+        # 分步执行时要求本步的阶段全部完成，否则由调用方重试本步
+        unfinished = [stage for stage in stages if not job.is_done(stage)]
+        if unfinished:
+            raise RuntimeError(f"阶段未全部完成: {', '.join(unfinished)}")
+    return job
+
+def prepare_keyframe_index(job, prefetcher):
+    """视觉阶段开始前等待关键帧索引(本进程的预取线程或其他进程中正在建立的)，之后不再需要新的预取"""
+    if prefetcher:
+        prefetcher.wait()
+    else:
+        wait_for_keyframe_index(job, get_prefetch_settings()["max_seconds"])
+    skip_keyframe_index(job, "视觉阶段已开始")
+
+def needs_prefetch(job, stages):
+    """本次运行是否需要后台预取(转录与视觉阶段都待执行、且使用单次解码的I帧提取)
+
+    预取只与转录并行才有意义；分步运行时在转录步骤中预取，索引保存在任务目录供之后的视觉步骤使用。
+    """
+    video_config = config.get_video_config()
+    if not get_prefetch_settings()["enabled"] or job.has(KEYFRAME_SKIP):
+        return False
+    if video_config.get("frame_sampler", "iframe") != "iframe":
+        return False
+    if video_config.get("frame_extraction", "single_pass") != "single_pass":
+        return False
+    return "transcribe" in stages and not job.is_done("transcribe") and not job.is_done("vision")
 
 def main():
     """主函数"""
-    # 从命令行参数获取视频路径
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <video_path>")
-        return
-        
-    video_path = Path(sys.argv[1])
+    parser = argparse.ArgumentParser(description="视频内容分析")
+    parser.add_argument("video_path", help="视频文件路径")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--from-stage", choices=STAGES, help="从指定阶段开始重跑")
+    group.add_argument("--only-stage", choices=STAGES, help="只重跑指定阶段(如修改提示词后只重跑report)")
+    group.add_argument("--stages", help="只执行逗号分隔的阶段，如audio,transcribe(已完成的跳过)")
+    args = parser.parse_args()
+    
+    video_path = Path(args.video_path)
     
     # 验证文件
     if not video_path.exists():
@@ -418,172 +877,17 @@ def main():
         print(f"不支持的视频格式: {video_path.suffix}")
         return
     
+    stages = args.stages.split(",") if args.stages else None
+    if stages and any(stage not in STAGES for stage in stages):
+        print(f"无效的阶段: {args.stages}，可选: {', '.join(STAGES)}")
+        sys.exit(2)
+    
     try:
-        # 1. 提取音频
-        print("步骤1/5: 提取音频...")
-        audio_path = extract_audio(video_path)
-        
-        # 2. 生成字幕
-        print("步骤2/5: 生成字幕...")
-        subtitles = transcribe_audio(audio_path)
-        
-        # 保存临时字幕
-        subtitle_path = Path(TEMP_DIR) / f"{video_path.stem}_subtitles.txt"
-        with open(subtitle_path, "w", encoding="utf-8") as f:
-            f.write(subtitles)
-        
-        # 同时拷贝到subtitles目录
-        subtitles_dir = Path(__file__).parent.parent / "subtitles"
-        subtitles_dir.mkdir(exist_ok=True, parents=True)
-        dest_path = subtitles_dir / f"{video_path.stem}_subtitles.txt"
-        shutil.copy2(subtitle_path, dest_path)
-        
-        # 3. 分析字幕
-        print("步骤3/5: 分析字幕内容...")
-        char_count = len(subtitles.encode('utf-8'))
-        reports = []
-        visual_analysis = ""
-        
-        if char_count > 60000:
-            print(f"[警告] 字幕过长({char_count:,}字符)，将分批处理")
-            chunks = split_subtitles(subtitles)
-            print(f"已分割为 {len(chunks)} 个部分，每个分段约{char_count//len(chunks):,}字符")
-            
-            # 创建临时报告目录
-            temp_reports_dir = Path(TEMP_DIR) / "reports"
-            temp_reports_dir.mkdir(exist_ok=True)
-            
-            for i, chunk in enumerate(chunks, 1):
-                print(f"\n=== 处理分段 {i}/{len(chunks)} ===")
-                print(f"分段长度: {len(chunk.encode('utf-8')):,}字符")
-                try:
-                    chunk_analysis = analyze_subtitles(chunk, is_chunk=True)
-                    print(f"分段分析完成")
-                    
-                    if "需要调用视觉识别模型" in chunk_analysis:
-                        # 解析需要视觉识别的时间段
-                        visual_segments = []
-                        lines = chunk_analysis.split('\n')
-                        table_start = next((i for i, line in enumerate(lines) if "时间段|核心事件|" in line), -1)
-                        if table_start != -1:
-                            for line in lines[table_start+1:]:
-                                if "|" in line and "是" in line:
-                                    parts = [p.strip() for p in line.split('|') if p.strip()]
-                                    if len(parts) >= 3:
-                                        time_range = parts[0]
-                                        if '-' in time_range:
-                                            visual_segments.append(time_range)
-                        
-                        chunk_visual = ""
-                        if visual_segments:
-                            print(f"需要视觉识别的片段: {len(visual_segments)}个")
-                            for segment in visual_segments:
-                                try:
-                                    frame_paths = extract_keyframes(video_path, segment)
-                                    if frame_paths:
-                                        try:
-                                            segment_visual = analyze_keyframes(frame_paths)
-                                            chunk_visual += f"\n\n## {segment}\n{segment_visual}"
-                                        except Exception as e:
-                                            print(f"视觉分析失败: {str(e)}")
-                                            chunk_visual += f"\n\n## {segment}\n分析失败"
-                                except Exception as e:
-                                    print(f"提取关键帧失败 {segment}: {str(e)}")
-                                    chunk_visual += f"\n\n## {segment}\n关键帧提取失败"
-                        else:
-                            print("没有需要视觉识别的片段")
-                            chunk_visual = ""
-                        
-                        # 生成临时分段报告
-                        temp_report = generate_chunk_report(
-                            video_path,
-                            chunk,
-                            chunk_analysis,
-                            chunk_visual,
-                            chunk_num=i
-                        )
-                        reports.append(temp_report)
-                    else:
-                        # 不需要视觉识别的片段也生成临时报告
-                        temp_report = generate_chunk_report(
-                            video_path,
-                            chunk,
-                            chunk_analysis,
-                            "",
-                            chunk_num=i
-                        )
-                        reports.append(temp_report)
-                except Exception as e:
-                    print(f"分段分析失败: {str(e)}")
-                    continue
-            # 合并所有临时报告
-            if reports:
-                final_report = merge_reports(video_path, reports)
-                print(f"最终报告已生成: {final_report}")
-            else:
-                print("没有生成任何报告")
-        else:
-            # 单次处理流程
-            analysis_result = analyze_subtitles(subtitles)
-            print("初步分析结果:\n", analysis_result)
-            
-            if "需要调用视觉识别模型" in analysis_result:
-                print("步骤4/5: 提取并分析关键帧...")
-                # 解析需要视觉识别的时间段
-                visual_segments = []
-                lines = analysis_result.split('\n')
-                table_start = next((i for i, line in enumerate(lines) if "时间段|核心事件|" in line), -1)
-                if table_start != -1:
-                    for line in lines[table_start+1:]:
-                        if "|" in line and "是" in line:
-                            parts = [p.strip() for p in line.split('|') if p.strip()]
-                            if len(parts) >= 3:
-                                time_range = parts[0]
-                                if '-' in time_range:
-                                    visual_segments.append(time_range)
-                
-                visual_analysis = ""
-                if visual_segments:
-                    print(f"需要视觉识别的片段: {len(visual_segments)}个")
-                    for segment in visual_segments:
-                        try:
-                            frame_paths = extract_keyframes(video_path, segment)
-                            if frame_paths:
-                                try:
-                                    segment_visual = analyze_keyframes(frame_paths)
-                                    visual_analysis += f"\n\n## {segment}\n{segment_visual}"
-                                except Exception as e:
-                                    print(f"视觉分析失败: {str(e)}")
-                                    visual_analysis += f"\n\n## {segment}\n分析失败"
-                        except Exception as e:
-                            print(f"提取关键帧失败 {segment}: {str(e)}")
-                            visual_analysis += f"\n\n## {segment}\n关键帧提取失败"
-                else:
-                    print("没有需要视觉识别的片段")
-                    visual_analysis = ""
-            else:
-                visual_analysis = ""
-            
-            # 5. 生成最终报告
-            print("步骤5/5: 生成报告...")
-            report_path = generate_chunk_report(
-                video_path,
-                subtitles,
-                analysis_result,
-                visual_analysis
-            )
-            # 移动报告到output目录
-            final_path = Path(OUTPUT_DIR) / f"{video_path.stem}_report.txt"
-            Path(OUTPUT_DIR).mkdir(exist_ok=True, parents=True)
-            shutil.move(report_path, final_path)
-            print(f"最终报告已生成: {final_path}")
-        return
+        run_pipeline(video_path, from_stage=args.from_stage, only_stage=args.only_stage, stages=stages)
     except Exception as e:
         print(f"处理失败: {str(e)}")
         traceback.print_exc()
-    finally:
-        # 清理临时文件
-        clean_temp_files()
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,102 @@
+import sys
+import traceback
+import multiprocessing
+from pathlib import Path
+
+# 确保项目根目录和src目录在导入路径中(支持脚本运行和作为video.src模块导入)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+
+def _worker_loop(conn):
+    """工作进程主循环：只导入一次流水线，之后逐个执行收到的任务
+
+    Whisper模型(未使用常驻ASR服务时)、DeepSeek和Ollama客户端都在进程内复用。
+    转录步骤启动的关键帧预取在本进程后台继续进行，不占用转录工作线程。
+    """
+    import main as pipeline
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if task is None:
+            break
+        video_path, stages = task
+        try:
+            if Path(video_path).suffix.lower() not in pipeline.SUPPORTED_VIDEO_EXTS:
+                print(f"不支持的视频格式: {Path(video_path).suffix}")
+            else:
+                pipeline.run_pipeline(video_path, stages=stages, detach_prefetch=True)
+            conn.send((True, None))
+        except Exception as e:
+            traceback.print_exc()
+            conn.send((False, str(e)))
+
+
+class PipelineWorker:
+    """常驻的流水线工作进程
+
+    与每个视频启动一次main.py相比，省去重复导入ollama、openai、faster_whisper等模块、
+    读取配置和创建客户端的开销；进程意外退出时下一次任务会自动重启。
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.process = None
+        self.conn = None
+
+    def start(self):
+        # spawn保证Windows和Linux行为一致；不设为守护进程，分片转录需要在其中再创建进程池
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_loop, args=(child_conn,), name=self.name)
+        self.process.start()
+        child_conn.close()
+
+    def run(self, video_path, stages=None, abort=None):
+        """在工作进程中执行流水线，失败时抛出RuntimeError
+
+        Args:
+            abort: 可选的threading.Event，被设置时终止工作进程(例如多节点部署中认领被接管)
+        """
+        if self.process is None or not self.process.is_alive():
+            self.start()
+        try:
+            self.conn.send((str(video_path), stages))
+            while abort is not None and not self.conn.poll(1):
+                if abort.is_set():
+                    self.kill()
+                    raise RuntimeError(f"任务已中止: {Path(video_path).name}")
+            success, error = self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.process.join(timeout=5)
+            self.process = None
+            raise RuntimeError(f"工作进程{self.name}意外退出: {str(e)}")
+        if not success:
+            raise RuntimeError(error)
+
+    def kill(self):
+        """立即终止工作进程，下一次任务时重启"""
+        if self.process is None:
+            return
+        self.process.terminate()
+        self.process.join(timeout=5)
+        self.process = None
+
+    def close(self, timeout=30):
+        """通知工作进程退出并等待结束"""
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
@@ -0,0 +1,211 @@
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# 确保项目根目录和src目录在导入路径中(支持脚本运行和作为video.src模块导入)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from config_loader import config
+from frame_extractor import (
+    seconds_to_time_str, segment_dir_name, parse_segment, verify_frames, extract_keyframes_multi
+)
+
+KEYFRAME_DIR = "keyframes"
+KEYFRAME_INDEX = "index.json"
+# 任务目录中的标记文件: 不再需要关键帧索引(分析结果不需要视觉识别或视觉阶段已开始)、索引正在建立
+KEYFRAME_SKIP = "keyframes.skip"
+KEYFRAME_BUILDING = "keyframes.building"
+# 同一进程内的索引建立串行执行，常驻工作进程中多个视频的预取不会同时解码
+PREFETCH_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+
+
+def get_prefetch_settings():
+    """读取预取配置"""
+    settings = config.get_video_config().get("prefetch", {})
+    return {
+        "enabled": settings.get("enabled", True),
+        "keyframes": settings.get("keyframes", True),
+        "max_seconds": float(settings.get("max_seconds", 600)),
+    }
+
+
+def probe_metadata(video_path):
+    """用ffprobe读取视频时长和各路流的基本信息"""
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-show_entries', 'format=duration,bit_rate:stream=index,codec_type,codec_name,width,height,avg_frame_rate',
+        '-of', 'json',
+        str(video_path)
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace", check=True)
+    data = json.loads(result.stdout or "{}")
+    return {
+        "duration": float(data.get("format", {}).get("duration") or 0),
+        "streams": data.get("streams", []),
+    }
+
+
+def build_keyframe_index(video_path, index_dir, duration, width=360, cancel=None):
+    """提取整个视频的所有I帧，作为后续各视觉片段共用的关键帧索引
+
+    与extract_keyframes_multi使用相同的滤镜和参数，帧按显示时间戳命名，
+    因此从索引中取出的帧与单独提取某个时间段得到的帧一致。cancel返回True时中止并抛出RuntimeError。
+    """
+    index_dir = Path(index_dir)
+    if index_dir.exists():
+        shutil.rmtree(index_dir)
+    whole = f"{seconds_to_time_str(0)}-{seconds_to_time_str(duration)}"
+    frames = extract_keyframes_multi(video_path, [whole], index_dir, width, cancel=cancel)[whole]
+    # 所有帧移动到索引根目录
+    for frame in frames:
+        os.replace(frame, index_dir / Path(frame).name)
+    shutil.rmtree(index_dir / segment_dir_name(whole), ignore_errors=True)
+
+    names = [Path(frame).name for frame in frames]
+    with open(index_dir / KEYFRAME_INDEX, "w", encoding="utf-8") as f:
+        json.dump({"duration": duration, "frames": names}, f)
+    return names
+
+
+def frames_from_index(index_dir, time_segments, frame_dir):
+    """从关键帧索引中取出各时间段的帧，返回与extract_keyframes_multi相同结构的字典"""
+    index_dir = Path(index_dir)
+    with open(index_dir / KEYFRAME_INDEX, "r", encoding="utf-8") as f:
+        names = json.load(f)["frames"]
+    stamps = [(int(Path(name).stem[4:]) / 1000, name) for name in names]
+
+    frames_by_segment = {}
+    for segment in time_segments:
+        frames = []
+        try:
+            start, end = parse_segment(segment)
+        except ValueError:
+            print(f"无法解析的时间段: {segment}")
+            frames_by_segment[segment] = frames
+            continue
+        if end <= start:
+            frames_by_segment[segment] = frames
+            continue
+        segment_dir = Path(frame_dir) / segment_dir_name(segment)
+        for seconds, name in stamps:
+            if start <= seconds <= end:
+                segment_dir.mkdir(parents=True, exist_ok=True)
+                target = segment_dir / name
+                if not target.exists():
+                    shutil.copy2(index_dir / name, target)
+                frames.append(target)
+        frames_by_segment[segment] = verify_frames(sorted(frames))
+    return frames_by_segment
+
+
+def has_keyframe_index(index_dir):
+    return (Path(index_dir) / KEYFRAME_INDEX).exists()
+
+
+def skip_keyframe_index(job, reason):
+    """标记不再需要关键帧索引，正在建立或排队中的预取会随之停止"""
+    job.write_text(KEYFRAME_SKIP, reason)
+
+
+def wait_for_keyframe_index(job, max_seconds):
+    """等待其他进程(如分步执行时的转录工作进程)中正在建立的关键帧索引
+
+    建立标记超过max_seconds未更新时视为该进程已退出。
+
+    Returns:
+        Path | None: 索引完整时返回索引目录
+    """
+    index_dir = job.path(KEYFRAME_DIR)
+    while not has_keyframe_index(index_dir):
+        try:
+            started = job.path(KEYFRAME_BUILDING).stat().st_mtime
+        except FileNotFoundError:
+            return None
+        if time.time() - started > max_seconds:
+            return None
+        time.sleep(1)
+    return index_dir
+
+
+class Prefetcher:
+    """在语音识别进行时于后台线程中准备视觉阶段需要的数据
+
+    - metadata.json: ffprobe得到的时长和流信息
+    - keyframes/: 整个视频的I帧(视觉阶段直接按时间段取用，不再解码视频)
+
+    建立索引超过max_seconds秒、调用cancel()或任务目录中出现keyframes.skip时终止ffmpeg，
+    因此分析结果不需要视觉识别时不会把整个视频解码完。
+    后台任务失败不影响主流程，视觉阶段会回退到原来的提取方式。
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.settings = get_prefetch_settings()
+        self.cancelled = threading.Event()
+        self.future = None
+
+    def start(self):
+        self.future = PREFETCH_POOL.submit(self._run)
+        return self
+
+    def _should_stop(self, started):
+        return (
+            self.cancelled.is_set()
+            or self.job.has(KEYFRAME_SKIP)
+            or time.time() - started > self.settings["max_seconds"]
+        )
+
+    def _run(self):
+        try:
+            if self.job.has("metadata.json"):
+                metadata = self.job.read_json("metadata.json")
+            else:
+                metadata = probe_metadata(self.job.video_path)
+                self.job.write_json("metadata.json", metadata)
+        except Exception as e:
+            print(f"[预取] 读取视频元数据失败: {str(e)}")
+            return
+
+        has_video = any(stream.get("codec_type") == "video" for stream in metadata["streams"])
+        index_dir = self.job.path(KEYFRAME_DIR)
+        if not self.settings["keyframes"] or not has_video or has_keyframe_index(index_dir):
+            return
+        started = time.time()
+        if self._should_stop(started):
+            return
+        self.job.write_text(KEYFRAME_BUILDING, str(os.getpid()))
+        try:
+            names = build_keyframe_index(
+                self.job.video_path, index_dir, metadata["duration"],
+                cancel=lambda: self._should_stop(started)
+            )
+            print(f"[预取] 关键帧索引完成: {len(names)}帧")
+        except Exception as e:
+            shutil.rmtree(index_dir, ignore_errors=True)
+            print(f"[预取] 关键帧索引未完成: {str(e)}")
+        finally:
+            self.job.path(KEYFRAME_BUILDING).unlink(missing_ok=True)
+
+    def wait(self):
+        """等待后台任务完成(最长为max_seconds，超时的索引建立会自行终止)"""
+        if self.future is not None:
+            self.future.result()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def close(self):
+        """终止尚未完成的预取并等待线程退出"""
+        self.cancel()
+        self.wait()
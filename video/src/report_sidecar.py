@@ -0,0 +1,172 @@
+import re
+import sys
+import json
+import time
+import hashlib
+from pathlib import Path
+
+# 确保项目根目录和src目录在导入路径中(支持脚本运行和作为video.src模块导入)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from frame_extractor import time_str_to_seconds
+
+REPORT_SUFFIX = "_report.txt"
+SIDECAR_SUFFIX = "_report.json"
+SCHEMA_VERSION = 1
+# 报告表格中的时间段单元格: HH:MM:SS-HH:MM:SS(允许毫秒和全角横线)
+TIME_RANGE = re.compile(r'^\s*(\d{1,2}:\d{2}(?::\d{2})?(?:\.\d+)?)\s*[-~－—]\s*(\d{1,2}:\d{2}(?::\d{2})?(?:\.\d+)?)\s*$')
+VIDEO_TYPE = re.compile(r'视频类型为[“"]?([^，,。"”\n]+)')
+
+
+def sha256_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def sidecar_path(report_path):
+    """文本报告对应的JSON报告路径"""
+    report_path = Path(report_path)
+    return report_path.with_name(report_path.name[:-len(REPORT_SUFFIX)] + SIDECAR_SUFFIX)
+
+
+def parse_segments(report_text):
+    """解析报告中"| 时间段 | 片段描述 | 片段核心内容 |"表格的所有行
+
+    合并报告包含多个分段报告，分段之间的重叠会产生时间段完全相同的行，只保留第一行。
+    """
+    segments = []
+    seen = set()
+    for line in report_text.split('\n'):
+        if '|' not in line:
+            continue
+        cells = [cell.strip() for cell in line.strip().strip('|').split('|')]
+        if len(cells) < 2:
+            continue
+        match = TIME_RANGE.match(cells[0])
+        if not match:
+            continue
+        start, end = match.group(1), match.group(2)
+        if (start, end) in seen:
+            continue
+        seen.add((start, end))
+        segments.append({
+            "start": start,
+            "end": end,
+            "start_seconds": time_str_to_seconds(start),
+            "end_seconds": time_str_to_seconds(end),
+            "description": cells[1],
+            "content": cells[2] if len(cells) > 2 else "",
+        })
+    segments.sort(key=lambda segment: segment["start_seconds"])
+    return segments
+
+
+def parse_summary(report_text):
+    """提取各"## 视频内容描述"小节的正文"""
+    summaries = []
+    for match in re.finditer(r'^##\s*视频内容描述\s*\n(.*?)(?=^##|\Z)', report_text, re.S | re.M):
+        summary = match.group(1).strip()
+        if summary:
+            summaries.append(summary)
+    return "\n".join(summaries)
+
+
+def parse_video_type(analysis_results):
+    """从字幕初步分析结果中提取视频类型(多个分段取出现最多的一个)"""
+    types = []
+    for analysis in analysis_results:
+        match = VIDEO_TYPE.search(analysis or "")
+        if match:
+            types.append(match.group(1).strip())
+    return max(types, key=types.count) if types else ""
+
+
+def build_report_data(video_path, report_text, analysis_results, subtitles, audio_hash=None):
+    """生成结构化报告
+
+    Args:
+        video_path: 视频文件路径
+        report_text: 最终文本报告内容
+        analysis_results: 各分段的字幕初步分析结果
+        subtitles: 完整字幕文本
+        audio_hash: 视频音频流的内容哈希(可选)
+    """
+    video_path = Path(video_path)
+    stat = video_path.stat()
+    return {
+        "version": SCHEMA_VERSION,
+        "video": video_path.name,
+        "video_type": parse_video_type(analysis_results),
+        "summary": parse_summary(report_text),
+        "segments": parse_segments(report_text),
+        "sources": {
+            "video_size": stat.st_size,
+            "video_mtime": stat.st_mtime,
+            "audio_hash": audio_hash,
+            "subtitles_sha256": sha256_text(subtitles),
+            "report_sha256": sha256_text(report_text),
+        },
+        "generated_at": time.time(),
+    }
+
+
+def write_sidecar(report_path, data):
+    """原子写入JSON报告"""
+    path = sidecar_path(report_path)
+    temp_path = path.with_name(f".{path.name}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    temp_path.replace(path)
+    return path
+
+
+def load_sidecar(report_path):
+    """读取文本报告对应的JSON报告
+
+    JSON报告不存在、无法解析、没有任何分段，或文本报告在生成JSON后被修改过时返回None。
+    """
+    report_path = Path(report_path)
+    try:
+        with open(sidecar_path(report_path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        report_text = report_path.read_text(encoding="utf-8")
+    except (FileNotFoundError, json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if not data.get("segments") or data.get("sources", {}).get("report_sha256") != sha256_text(report_text):
+        return None
+    return data
+
+
+def format_report_data(data):
+    """把结构化报告渲染为紧凑的文本(用于提示词)"""
+    lines = []
+    if data.get("video_type"):
+        lines.append(f"视频类型: {data['video_type']}")
+    if data.get("summary"):
+        lines.append(f"视频内容描述: {data['summary']}")
+    lines.append("| 时间段 | 片段描述 | 片段核心内容 |")
+    for segment in data["segments"]:
+        lines.append(f"| {segment['start']}-{segment['end']} | {segment['description']} | {segment['content']} |")
+    return "\n".join(lines)
+
+
+def read_video_reports(output_dir):
+    """读取报告目录下的所有视频报告
+
+    有有效JSON报告的视频使用其紧凑渲染，否则使用原始文本报告。
+
+    Returns:
+        list[(str, str)]: (文本报告文件名, 报告内容)，按文件名排序
+    """
+    reports = []
+    for report_path in sorted(Path(output_dir).glob(f"*{REPORT_SUFFIX}")):
+        data = load_sidecar(report_path)
+        try:
+            content = format_report_data(data) if data else report_path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            continue
+        reports.append((report_path.name, content))
+    return reports
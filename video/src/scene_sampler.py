@@ -0,0 +1,161 @@
+import uuid
+import shutil
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+from frame_extractor import parse_segment, segment_dir_name, frame_name, verify_frames
+
+# 镜头检测使用的低分辨率灰度画面尺寸
+ANALYSIS_WIDTH = 64
+ANALYSIS_HEIGHT = 36
+# 亮度直方图的分箱数(256级灰度每8级一箱)
+HIST_BINS = 32
+
+
+def decode_luma(video_path, start, end, fps, width=ANALYSIS_WIDTH, height=ANALYSIS_HEIGHT):
+    """以固定帧率解码一段视频的低分辨率灰度画面
+
+    Returns:
+        np.ndarray: 形状为(N, height, width)的uint8数组，第n帧对应start + n / fps秒
+    """
+    cmd = [
+        'ffmpeg',
+        '-nostdin',
+        '-v', 'error',
+        '-ss', f"{start:.3f}",
+        '-to', f"{end:.3f}",
+        '-i', str(video_path),
+        '-vf', f"fps={fps},scale={width}:{height}",
+        '-pix_fmt', 'gray',
+        '-f', 'rawvideo',
+        '-'
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"解码灰度画面失败: {result.stderr.decode('utf-8', 'replace').strip()[-200:]}")
+    frame_size = width * height
+    count = len(result.stdout) // frame_size
+    return np.frombuffer(result.stdout[:count * frame_size], dtype=np.uint8).reshape(count, height, width)
+
+
+def luma_histograms(frames, bins=HIST_BINS):
+    """批量计算每帧归一化的亮度直方图，返回形状为(N, bins)的数组"""
+    count = len(frames)
+    indices = (frames.reshape(count, -1).astype(np.int32) * bins) >> 8
+    # 给每帧的分箱编号加上偏移，一次bincount得到所有帧的直方图
+    indices += (np.arange(count, dtype=np.int32) * bins)[:, None]
+    counts = np.bincount(indices.ravel(), minlength=count * bins).reshape(count, bins)
+    return counts / frames[0].size
+
+
+def detect_shots(histograms, threshold=0.35, min_shot_frames=1):
+    """按相邻帧直方图差异检测镜头切换
+
+    差异为两帧直方图的总变差距离(0~1)，超过threshold且距上一切换点至少min_shot_frames帧时视为新镜头。
+
+    Returns:
+        list[(int, int)]: 每个镜头的[开始帧, 结束帧)区间
+    """
+    count = len(histograms)
+    if count == 0:
+        return []
+    distances = 0.5 * np.abs(np.diff(histograms, axis=0)).sum(axis=1)
+    boundaries = [0]
+    for index in np.flatnonzero(distances > threshold) + 1:
+        if index - boundaries[-1] >= min_shot_frames:
+            boundaries.append(int(index))
+    boundaries.append(count)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _representative(histograms, start, end):
+    """镜头内直方图最接近镜头平均直方图的帧"""
+    shot = histograms[start:end]
+    distances = np.abs(shot - shot.mean(axis=0)).sum(axis=1)
+    return start + int(np.argmin(distances))
+
+
+def pick_frames(histograms, shots, budget, frames_per_shot=2):
+    """为每个镜头挑选代表帧，总数不超过budget
+
+    先按时长从长到短给每个镜头分配一帧；预算还有剩余且frames_per_shot为2时，
+    较长的镜头(至少4帧)前后两半再各取一帧。
+
+    Returns:
+        list[int]: 按时间排序的帧序号
+    """
+    by_length = sorted(shots, key=lambda shot: shot[1] - shot[0], reverse=True)
+    picks = {}
+    for start, end in by_length[:budget]:
+        picks[(start, end)] = [_representative(histograms, start, end)]
+
+    remaining = budget - len(picks)
+    if frames_per_shot >= 2:
+        for start, end in by_length:
+            if remaining <= 0 or (start, end) not in picks or end - start < 4:
+                continue
+            middle = (start + end) // 2
+            picks[(start, end)] = [_representative(histograms, start, middle), _representative(histograms, middle, end)]
+            remaining -= 1
+
+    return sorted(index for indices in picks.values() for index in indices)
+
+
+def export_frames(video_path, start, end, fps, indices, output_dir, width=360):
+    """按帧序号导出代表帧(与decode_luma使用相同的帧率网格)，以显示时间戳命名"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    scan_dir = output_dir / f"_scene_{uuid.uuid4().hex[:8]}"
+    scan_dir.mkdir()
+
+    selector = "+".join(f"eq(n,{index})" for index in indices)
+    cmd = [
+        'ffmpeg',
+        '-nostdin',
+        '-v', 'error',
+        '-ss', f"{start:.3f}",
+        '-to', f"{end:.3f}",
+        '-i', str(video_path),
+        '-vf', f"fps={fps},select='{selector}',scale={width}:-1",
+        '-vsync', 'vfr',
+        '-q:v', '2',
+        str(scan_dir / 'frame_%04d.jpg'),
+        '-y'
+    ]
+    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    frames = []
+    for frame, index in zip(sorted(scan_dir.glob('frame_*.jpg')), indices):
+        target = output_dir / frame_name(start + index / fps)
+        frame.replace(target)
+        frames.append(target)
+    shutil.rmtree(scan_dir, ignore_errors=True)
+    return frames
+
+
+def sample_scene_frames(video_path, time_segment, frame_dir, fps=4.0, threshold=0.35,
+                        max_frames=20, frames_per_shot=2, min_shot_seconds=1.0, width=360):
+    """按镜头切换为一个时间段挑选代表帧
+
+    以fps帧率解码低分辨率灰度画面，计算亮度直方图检测镜头边界，每个镜头取1~2帧，
+    全段不超过max_frames帧。GOP长短不影响取帧数量。
+
+    Returns:
+        list[str]: 按时间排序的帧路径
+    """
+    start, end = parse_segment(time_segment)
+    if end <= start:
+        return []
+
+    frames = decode_luma(video_path, start, end, fps)
+    if len(frames) == 0:
+        return []
+    histograms = luma_histograms(frames)
+    shots = detect_shots(histograms, threshold, max(1, int(round(min_shot_seconds * fps))))
+    indices = pick_frames(histograms, shots, max(1, max_frames), frames_per_shot)
+    print(f"[镜头采样] {time_segment}: 解码{len(frames)}帧，检测到{len(shots)}个镜头，选取{len(indices)}帧")
+
+    segment_dir = Path(frame_dir) / segment_dir_name(time_segment)
+    return verify_frames(export_frames(video_path, start, end, fps, indices, segment_dir, width))
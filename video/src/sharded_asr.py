@@ -0,0 +1,211 @@
+import os
+import sys
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# 确保项目根目录和src目录在导入路径中(进程池子进程同样需要)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from config_loader import config
+from audio_stream import load_wav_samples
+
+# 能量计算帧长(秒)
+FRAME_SECONDS = 0.03
+# 在目标切分点前后多长范围内寻找静音(秒)
+SEARCH_SECONDS = 15.0
+# 最短分片时长(秒)
+MIN_SHARD_SECONDS = 60.0
+
+
+def get_shard_settings(workers=None):
+    """读取分片转录配置
+
+    worker数未配置(0)时按CPU核数除以每个worker的线程数推算；每个worker的线程数未配置(0)时按CPU核数平分。
+    workers参数用于临时指定进程数(如基准测试)。
+    """
+    video_config = config.get_video_config()
+    cpu_count = os.cpu_count() or 1
+    threads = int(video_config.get("shard_threads_per_worker", 4))
+    workers = workers or int(video_config.get("shard_workers", 0)) or max(1, cpu_count // max(1, threads))
+    return {
+        "workers": workers,
+        "threads_per_worker": threads if threads > 0 else max(1, cpu_count // workers),
+        "shard_seconds": float(video_config.get("shard_seconds", 600)),
+    }
+
+
+def frame_energy(samples, sample_rate, frame_seconds=FRAME_SECONDS):
+    """按帧计算对数能量(dB)，返回每帧一个值"""
+    frame = max(1, int(frame_seconds * sample_rate))
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return np.empty(0, dtype=np.float32)
+    energy = np.empty(n_frames, dtype=np.float32)
+    # 分块计算，避免长音频一次性转换为float32占用大量内存
+    block = 20000
+    for i in range(0, n_frames, block):
+        count = min(block, n_frames - i)
+        frames = np.asarray(samples[i * frame:(i + count) * frame], dtype=np.float32).reshape(count, frame)
+        power = np.einsum("ij,ij->i", frames, frames) / frame
+        energy[i:i + count] = 10.0 * np.log10(power + 1e-10)
+    return energy
+
+
+def regions_to_silent_mask(regions, n_frames, frame_seconds=FRAME_SECONDS):
+    """按有声区间列表生成逐帧的无声标记"""
+    silent = np.ones(n_frames, dtype=bool)
+    for start, end in regions:
+        silent[int(start / frame_seconds):int(np.ceil(end / frame_seconds))] = False
+    return silent
+
+
+def find_split_points(samples, sample_rate, shard_seconds, search_seconds=SEARCH_SECONDS, regions=None):
+    """在每个目标切分点附近寻找最长的静音区间，返回切分点(样本下标)列表
+
+    静音取自语音活动索引的有声区间之外(regions)，没有索引时取全局能量的低分位数；
+    每个切分点落在搜索窗口内最长静音段的中点，窗口内没有静音时退化为能量最低的帧。
+    """
+    energy = frame_energy(samples, sample_rate)
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    total = len(samples)
+    if len(energy) == 0 or total <= shard_seconds * sample_rate:
+        return []
+
+    if regions is not None:
+        silent = regions_to_silent_mask(regions, len(energy))
+    else:
+        threshold = np.percentile(energy, 10) + 6.0
+        silent = energy <= threshold
+    search = int(search_seconds / FRAME_SECONDS)
+    step = int(shard_seconds / FRAME_SECONDS)
+
+    points = []
+    last = 0
+    target = step
+    while target < len(energy) - step // 4:
+        lo = max(last + 1, target - search)
+        hi = min(len(energy), target + search)
+        window = silent[lo:hi]
+        if window.any():
+            # 找出窗口内所有静音段，取最长一段的中点
+            padded = np.concatenate(([False], window, [False]))
+            edges = np.flatnonzero(padded[1:] != padded[:-1])
+            starts, ends = edges[::2], edges[1::2]
+            longest = int(np.argmax(ends - starts))
+            best = lo + (starts[longest] + ends[longest]) // 2
+        else:
+            best = lo + int(np.argmin(energy[lo:hi]))
+        points.append(best * frame)
+        last = best
+        target = best + step
+    return points
+
+
+_worker_model = None
+
+
+def _init_worker(cpu_threads):
+    """进程池初始化：每个worker只加载一次模型"""
+    global _worker_model
+    from faster_whisper import WhisperModel
+    from asr_server import resolve_model_path, get_asr_settings
+
+    settings = get_asr_settings()
+    _worker_model = WhisperModel(
+        str(resolve_model_path()),
+        device=settings["device"],
+        compute_type=settings["compute_type"],
+        cpu_threads=cpu_threads
+    )
+
+
+def shard_clips(regions, start, end):
+    """把落在分片[start, end)秒内的有声区间换算为分片内的clip_timestamps"""
+    clips = []
+    for region_start, region_end in regions:
+        clip_start, clip_end = max(region_start, start), min(region_end, end)
+        if clip_end > clip_start:
+            clips += [round(float(clip_start - start), 3), round(float(clip_end - start), 3)]
+    return clips
+
+
+def _transcribe_shard(wav_path, start, end, options):
+    """转录单个分片，时间戳换算为全局时间"""
+    samples, sample_rate = load_wav_samples(wav_path)
+    audio = np.asarray(samples[start:end], dtype=np.float32) / 32768.0
+    offset = start / sample_rate
+    segments, info = _worker_model.transcribe(audio, **options)
+    return {
+        "language": info.language,
+        "language_probability": info.language_probability,
+        "duration": (end - start) / sample_rate,
+        "segments": [(s.start + offset, s.end + offset, s.text) for s in segments],
+    }
+
+
+def transcribe_sharded(wav_path, workers=None, shard_seconds=None, regions=None, **options):
+    """在静音处切分音频，用进程池并行转录各分片并拼接结果
+
+    Args:
+        wav_path: 16kHz单声道WAV文件路径
+        workers: 进程数，默认按CPU核数推算
+        shard_seconds: 目标分片时长(秒)
+        regions: 语音活动索引的有声区间[(开始秒, 结束秒)]，提供时在区间外切分，
+            且每个分片只转录其中的有声部分，没有有声部分的分片直接跳过
+        **options: 传递给faster-whisper transcribe的参数
+
+    Returns:
+        dict: 与asr_server.run_transcription相同的结构，时间戳为全局时间
+    """
+    settings = get_shard_settings(workers)
+    workers, threads = settings["workers"], settings["threads_per_worker"]
+    shard_seconds = shard_seconds or settings["shard_seconds"]
+    options = {"beam_size": 5, **options}
+
+    samples, sample_rate = load_wav_samples(wav_path)
+    duration = len(samples) / sample_rate
+    # 分片数至少与worker数相当，保证进程池被充分利用
+    shard_seconds = max(MIN_SHARD_SECONDS, min(shard_seconds, duration / workers))
+    points = find_split_points(samples, sample_rate, shard_seconds, regions=regions)
+    bounds = list(zip([0] + points, points + [len(samples)]))
+    del samples
+
+    jobs = []
+    for start, end in bounds:
+        shard_options = options
+        if regions is not None:
+            clips = shard_clips(regions, start / sample_rate, end / sample_rate)
+            if not clips:
+                continue
+            shard_options = {**options, "clip_timestamps": clips}
+        jobs.append((start, end, shard_options))
+    if not jobs:
+        # 没有任何有声分片时仍转录第一片，保留语言检测结果
+        jobs = [(*bounds[0], options)]
+
+    print(f"[分片转录] 时长{duration:.0f}秒，切分为{len(bounds)}片(转录{len(jobs)}片)，{workers}个进程 × {threads}线程")
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = [pool.submit(_transcribe_shard, str(wav_path), start, end, shard_options)
+                   for start, end, shard_options in jobs]
+        results = [future.result() for future in futures]
+    print(f"[分片转录] 完成，耗时{time.time() - started:.1f}秒")
+
+    # 语言取各分片按时长加权的多数
+    language_weight = {}
+    for result in results:
+        language_weight[result["language"]] = language_weight.get(result["language"], 0.0) + result["duration"]
+    language = max(language_weight, key=language_weight.get)
+    probabilities = [r["language_probability"] for r in results if r["language"] == language]
+
+    return {
+        "language": language,
+        "language_probability": sum(probabilities) / len(probabilities),
+        "segments": [segment for result in results for segment in result["segments"]],
+    }
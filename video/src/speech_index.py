@@ -0,0 +1,169 @@
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+# 确保项目根目录和src目录在导入路径中(支持脚本运行和作为video.src模块导入)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from config_loader import config
+from audio_stream import load_wav_samples, iter_pcm_windows, SAMPLE_RATE
+from sharded_asr import frame_energy, FRAME_SECONDS
+
+INDEX_VERSION = 1
+
+
+def get_speech_settings():
+    """读取语音活动检测配置"""
+    settings = config.get_video_config().get("speech_index", {})
+    return {
+        "enabled": settings.get("enabled", True),
+        "margin_db": float(settings.get("margin_db", 12)),
+        "min_speech_seconds": float(settings.get("min_speech_seconds", 0.3)),
+        "min_silence_seconds": float(settings.get("min_silence_seconds", 2.0)),
+        "pad_seconds": float(settings.get("pad_seconds", 0.5)),
+        "max_speech_ratio": float(settings.get("max_speech_ratio", 0.9)),
+        "vision_gap_seconds": float(settings.get("vision_gap_seconds", 60)),
+    }
+
+
+def _runs(mask):
+    """布尔数组中连续为True的区间，返回(starts, ends)帧下标"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[::2], edges[1::2]
+
+
+def detect_speech_regions(energy, margin_db=12.0, min_speech_seconds=0.3, min_silence_seconds=2.0,
+                          pad_seconds=0.5, frame_seconds=FRAME_SECONDS):
+    """按帧能量检测有声区间
+
+    阈值为底噪(能量5%分位数)加margin_db；短于min_silence_seconds的静音并入前后有声区间，
+    短于min_speech_seconds的有声区间视为噪声丢弃，最后每个区间两端各扩展pad_seconds。
+
+    Returns:
+        (regions, threshold): [(开始秒, 结束秒), ...]和使用的能量阈值(dB)
+    """
+    if len(energy) == 0:
+        return [], 0.0
+    threshold = float(np.percentile(energy, 5)) + margin_db
+    active = energy > threshold
+
+    # 填补短静音
+    starts, ends = _runs(~active)
+    short = (ends - starts) < min_silence_seconds / frame_seconds
+    for start, end in zip(starts[short], ends[short]):
+        if start > 0 and end < len(active):
+            active[start:end] = True
+
+    # 丢弃短促的有声片段
+    starts, ends = _runs(active)
+    keep = (ends - starts) >= min_speech_seconds / frame_seconds
+    duration = len(energy) * frame_seconds
+    regions = []
+    for start, end in zip(starts[keep], ends[keep]):
+        region_start = max(0.0, start * frame_seconds - pad_seconds)
+        region_end = min(duration, end * frame_seconds + pad_seconds)
+        if regions and region_start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], region_end)
+        else:
+            regions.append((region_start, region_end))
+    return [(round(float(s), 3), round(float(e), 3)) for s, e in regions], threshold
+
+
+def stream_energy(media_path):
+    """通过ffmpeg管道逐窗口计算帧能量，不落地WAV
+
+    窗口长度不是帧长的整数倍，余下的采样并入下一个窗口，保证帧时间与整段计算一致。
+
+    Returns:
+        (energy, duration): 每帧能量(dB)和音频时长(秒)
+    """
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    energies = []
+    rest = np.empty(0, dtype=np.float32)
+    total = 0
+    for _, samples in iter_pcm_windows(media_path):
+        total += len(samples)
+        samples = np.concatenate((rest, samples))
+        usable = len(samples) // frame * frame
+        # 换算回int16刻度，与WAV计算的能量一致
+        energies.append(frame_energy(samples[:usable] * 32768.0, SAMPLE_RATE))
+        rest = samples[usable:]
+    energy = np.concatenate(energies) if energies else np.empty(0, dtype=np.float32)
+    return energy, total / SAMPLE_RATE
+
+
+def build_speech_index(wav_path=None, settings=None, media_path=None):
+    """做能量VAD，生成可持久化的有声区间索引
+
+    Args:
+        wav_path: WAV文件(内存映射读取)
+        media_path: 不提供WAV时直接从视频流式解码音频(流式转录模式不落地WAV)
+    """
+    settings = settings or get_speech_settings()
+    started = time.time()
+    if wav_path is not None:
+        samples, sample_rate = load_wav_samples(wav_path)
+        energy = frame_energy(samples, sample_rate)
+        duration = len(samples) / sample_rate
+    else:
+        energy, duration = stream_energy(media_path)
+    regions, threshold = detect_speech_regions(
+        energy,
+        margin_db=settings["margin_db"],
+        min_speech_seconds=settings["min_speech_seconds"],
+        min_silence_seconds=settings["min_silence_seconds"],
+        pad_seconds=settings["pad_seconds"]
+    )
+    speech_seconds = sum(end - start for start, end in regions)
+    index = {
+        "version": INDEX_VERSION,
+        "duration": round(duration, 3),
+        "frame_seconds": FRAME_SECONDS,
+        "threshold_db": round(threshold, 2),
+        "speech_seconds": round(speech_seconds, 3),
+        "speech_ratio": round(speech_seconds / duration, 4) if duration else 0.0,
+        "regions": [list(region) for region in regions],
+    }
+    print(f"[语音检测] 时长{duration:.0f}秒，有声{speech_seconds:.0f}秒({index['speech_ratio']:.0%})，"
+          f"{len(regions)}个区间，耗时{time.time() - started:.1f}秒")
+    return index
+
+
+def clip_timestamps(index, max_speech_ratio=0.9):
+    """转换为faster-whisper的clip_timestamps参数
+
+    有声比例超过max_speech_ratio时跳过的静音很少，返回None表示整段转录。
+    """
+    if not index or index["speech_ratio"] > max_speech_ratio:
+        return None
+    if not index["regions"]:
+        # 整段没有检测到声音时仍转录一小段，保留语言检测结果
+        return [0.0, min(index["duration"], 30.0)]
+    return [value for region in index["regions"] for value in region]
+
+
+def silent_gaps(index, start=0.0, end=None, min_gap_seconds=60.0):
+    """[start, end]范围内长度不小于min_gap_seconds的无声区间"""
+    if not index:
+        return []
+    end = index["duration"] if end is None else min(end, index["duration"])
+    gaps = []
+    cursor = start
+    for region_start, region_end in index["regions"]:
+        if region_end <= start:
+            continue
+        if region_start >= end:
+            break
+        if region_start - cursor >= min_gap_seconds:
+            gaps.append((cursor, region_start))
+        cursor = max(cursor, region_end)
+    if end - cursor >= min_gap_seconds:
+        gaps.append((cursor, end))
+    return gaps
+
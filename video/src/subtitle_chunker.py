@@ -0,0 +1,142 @@
+import re
+import math
+
+# 字幕行格式: [开始秒-结束秒]: 文本
+ENTRY_PATTERN = re.compile(r'^\[(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)\]')
+# 中日韩文字及全角符号
+CJK_PATTERN = re.compile(r'[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]')
+# DeepSeek分词器的经验比例：每个中文字符约0.6个token，英文等其他字符约0.3个token
+CJK_TOKENS_PER_CHAR = 0.6
+OTHER_TOKENS_PER_CHAR = 0.3
+# 切分点只在分段填充到预算的这一比例之后选择，避免产生过短的分段
+MIN_FILL = 0.6
+# 重叠部分最多占分段预算的比例
+MAX_OVERLAP_RATIO = 0.25
+
+
+def estimate_tokens(text):
+    """估算文本在DeepSeek模型中的token数"""
+    cjk = len(CJK_PATTERN.findall(text))
+    return int(math.ceil(cjk * CJK_TOKENS_PER_CHAR + (len(text) - cjk) * OTHER_TOKENS_PER_CHAR))
+
+
+def parse_entries(subtitles):
+    """解析字幕文本
+
+    Returns:
+        (header, entries): 首条字幕之前的行(语言检测信息)，以及(开始秒, 结束秒, 原始文本)列表；
+        不以时间戳开头的行并入上一条字幕
+    """
+    header = []
+    entries = []
+    for line in subtitles.split('\n'):
+        match = ENTRY_PATTERN.match(line)
+        if match:
+            entries.append((float(match.group(1)), float(match.group(2)), line))
+        elif entries:
+            start, end, text = entries[-1]
+            entries[-1] = (start, end, f"{text}\n{line}")
+        else:
+            header.append(line)
+    return header, entries
+
+
+def _char_tokens(char):
+    return CJK_TOKENS_PER_CHAR if CJK_PATTERN.match(char) else OTHER_TOKENS_PER_CHAR
+
+
+def split_entry(entry, budget):
+    """把超过预算的单条字幕按字符切成多条，时间按字符位置等比例分配，未超过预算时原样返回"""
+    start, end, text = entry
+    if estimate_tokens(text) + 1 <= budget:
+        return [entry]
+    content = text[ENTRY_PATTERN.match(text).end():]
+    content = content[2:] if content.startswith(': ') else content.lstrip(':')
+    limit = max(1.0, budget - estimate_tokens(f"[{end:.2f}-{end:.2f}]: ") - 1)
+
+    pieces = []
+    begin, total = 0, 0.0
+    for index, char in enumerate(content):
+        weight = _char_tokens(char)
+        if total + weight > limit and index > begin:
+            pieces.append((begin, index))
+            begin, total = index, 0.0
+        total += weight
+    pieces.append((begin, len(content)))
+
+    duration = end - start
+    entries = []
+    for piece_start, piece_end in pieces:
+        piece_from = start + duration * piece_start / len(content)
+        piece_to = start + duration * piece_end / len(content)
+        entries.append((piece_from, piece_to, f"[{piece_from:.2f}-{piece_to:.2f}]: {content[piece_start:piece_end]}"))
+    return entries
+
+
+def _pick_cut(entries, tokens, begin, core_start, end, budget):
+    """在entries[begin:end]中选择切分位置c(分段为entries[begin:c])
+
+    只在累计token达到预算MIN_FILL之后的位置中选择，取与前一条字幕间隔最长的空白处(场景切换、停顿)。
+    """
+    if end >= len(entries):
+        return end
+    candidates = []
+    total = 0
+    for c in range(begin + 1, end + 1):
+        total += tokens[c - 1]
+        if c > core_start and (total >= budget * MIN_FILL or c == end):
+            candidates.append(c)
+    # 间隔相同时取更靠后的位置，让分段尽量填满
+    return max(candidates, key=lambda c: (entries[c][0] - entries[c - 1][1], c))
+
+
+def chunk_subtitles(subtitles, max_tokens=16000, overlap_seconds=30.0):
+    """按token预算把字幕切成多个分段，切分点对齐到字幕之间的最长空白
+
+    除第一个分段外，每个分段开头包含上一分段末尾overlap_seconds秒内的字幕作为上下文，
+    保证分段报告衔接连贯；重叠部分计入分段预算，且不超过预算的MAX_OVERLAP_RATIO。
+
+    Args:
+        subtitles: format_subtitles生成的字幕文本
+        max_tokens: 每个分段(含语言检测信息和重叠部分)的估算token上限
+        overlap_seconds: 分段之间的重叠时长
+
+    Returns:
+        list[str]: 字幕分段，不需要切分或没有可解析的字幕时只有原文一个元素
+    """
+    header, entries = parse_entries(subtitles)
+    if estimate_tokens(subtitles) <= max_tokens or not entries:
+        return [subtitles]
+
+    header_text = '\n'.join(header)
+    budget = max(1, max_tokens - estimate_tokens(header_text))
+    # 单条字幕本身超过预算时(如长时间无停顿的转录)先切成多条
+    entries = [piece for entry in entries for piece in split_entry(entry, budget)]
+    tokens = [estimate_tokens(text) + 1 for _, _, text in entries]
+
+    chunks = []
+    begin = core_start = 0
+    while core_start < len(entries):
+        # 从begin开始贪心填充，至少包含一条新字幕
+        end, total = begin, 0
+        while end < len(entries) and (total + tokens[end] <= budget or end <= core_start):
+            total += tokens[end]
+            end += 1
+
+        cut = _pick_cut(entries, tokens, begin, core_start, end, budget)
+        body = '\n'.join(text for _, _, text in entries[begin:cut])
+        chunks.append(f"{header_text}\n{body}" if header_text else body)
+        if cut >= len(entries):
+            break
+
+        # 下一分段从切分点之前overlap_seconds秒开始，重叠部分受token比例限制
+        overlap_start = cut
+        overlap_tokens = 0
+        while (overlap_start - 1 > core_start
+               and entries[overlap_start - 1][0] >= entries[cut][0] - overlap_seconds
+               and overlap_tokens + tokens[overlap_start - 1] <= budget * MAX_OVERLAP_RATIO):
+            overlap_start -= 1
+            overlap_tokens += tokens[overlap_start]
+        begin, core_start = overlap_start, cut
+
+    return chunks
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+import subprocess
+from pathlib import Path
+
+# 确保项目根目录和src目录在导入路径中(支持脚本运行和作为video.src模块导入)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from config_loader import config
+from asr_server import resolve_model_path, get_asr_settings
+
+DEFAULT_CACHE_DIR = BASE_DIR / "video" / "cache" / "transcripts"
+# 无法用ffmpeg哈希音频流时，按文件采样哈希的块大小
+SAMPLE_BLOCK = 1 << 20
+
+
+def _sampled_file_hash(path):
+    """对文件大小和首、中、尾三个数据块做哈希(ffmpeg不可用时的回退)"""
+    digest = hashlib.sha256()
+    size = os.path.getsize(path)
+    digest.update(str(size).encode("utf-8"))
+    with open(path, "rb") as f:
+        for position in (0, max(0, size // 2 - SAMPLE_BLOCK // 2), max(0, size - SAMPLE_BLOCK)):
+            f.seek(position)
+            digest.update(f.read(SAMPLE_BLOCK))
+    return f"file-sha256:{digest.hexdigest()}"
+
+
+# 同一进程内按(路径, 大小, 修改时间)记住已计算的哈希
+_hash_memo = {}
+
+
+def media_hash(media_path):
+    """计算媒体文件音频流的内容哈希
+
+    使用ffmpeg流复制(不解码)对第一条音轨的数据包做SHA256，文件改名、重新封装
+    或修改元数据都不会影响结果。
+    """
+    stat = os.stat(media_path)
+    memo_key = (str(Path(media_path).resolve()), stat.st_size, stat.st_mtime)
+    if memo_key not in _hash_memo:
+        _hash_memo[memo_key] = _compute_media_hash(media_path)
+    return _hash_memo[memo_key]
+
+
+def _compute_media_hash(media_path):
+    """用ffmpeg流复制哈希第一条音轨，失败时回退到文件采样哈希"""
+    cmd = [
+        'ffmpeg',
+        '-nostdin',
+        '-v', 'error',
+        '-i', str(media_path),
+        '-map', '0:a:0',
+        '-c', 'copy',
+        '-f', 'hash',
+        '-hash', 'sha256',
+        '-'
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        line = result.stdout.strip().splitlines()[-1]
+        if line.upper().startswith("SHA256="):
+            return f"audio-sha256:{line.split('=', 1)[1]}"
+    except (subprocess.CalledProcessError, IndexError, OSError) as e:
+        print(f"[转录缓存] 音频流哈希失败，改用文件采样哈希: {str(e)}")
+    return _sampled_file_hash(media_path)
+
+
+def model_identity():
+    """当前语音识别模型的标识(路径名、权重大小和计算精度)"""
+    model_path = resolve_model_path()
+    weights = model_path / "model.bin"
+    weights_size = weights.stat().st_size if weights.exists() else 0
+    return f"{model_path.name}:{weights_size}:{get_asr_settings()['compute_type']}"
+
+
+class TranscriptCache:
+    """按媒体内容哈希、模型和转录参数寻址的转录结果缓存
+
+    每条结果保存为一个JSON文件，读取时刷新修改时间，写入后按修改时间淘汰最久未用的条目，
+    使总大小不超过max_mb。
+    """
+
+    def __init__(self, cache_dir=None, max_mb=None, enabled=None):
+        cache_config = config.get_video_config().get("transcript_cache", {})
+        cache_dir = Path(cache_dir or cache_config.get("dir") or DEFAULT_CACHE_DIR)
+        if not cache_dir.is_absolute():
+            cache_dir = BASE_DIR / cache_dir
+        self.cache_dir = cache_dir
+        self.max_bytes = int(float(max_mb or cache_config.get("max_mb", 512)) * 1024 * 1024)
+        self.enabled = cache_config.get("enabled", True) if enabled is None else enabled
+        self.lock = threading.Lock()
+
+    def make_key(self, media_digest, options):
+        """由媒体哈希、模型标识和转录参数生成缓存键"""
+        payload = json.dumps(
+            {"media": media_digest, "model": model_identity(), "options": options},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, media_digest, options):
+        """读取缓存结果，未命中返回None"""
+        if not self.enabled:
+            return None
+        path = self.cache_dir / f"{self.make_key(media_digest, options)}.json"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # 刷新访问时间，供LRU淘汰使用
+            os.utime(path, None)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        result = entry["result"]
+        result["segments"] = [tuple(segment) for segment in result["segments"]]
+        return result
+
+    def put(self, media_digest, options, result):
+        """写入缓存并按容量淘汰"""
+        if not self.enabled:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{self.make_key(media_digest, options)}.json"
+        entry = {
+            "media": media_digest,
+            "model": model_identity(),
+            "options": options,
+            "created_at": time.time(),
+            "result": result,
+        }
+        temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def evict(self):
+        """删除最久未使用的条目，直到总大小不超过上限"""
+        with self.lock:
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+transcript_cache = TranscriptCache()
+
+
+def is_transcript_cached(media_path, options):
+    """检查媒体文件的转录结果是否已在缓存中"""
+    if not transcript_cache.enabled:
+        return False
+    return transcript_cache.get(media_hash(media_path), options) is not None
+
+
+def cached_transcription(media_path, options, compute):
+    """先查转录缓存，未命中时调用compute()并写入缓存
+
+    Args:
+        media_path: 用于计算内容哈希的视频或音频文件
+        options: 影响转录结果的参数(参与缓存键)
+        compute: 无参函数，返回转录结果字典
+    """
+    if not transcript_cache.enabled:
+        return compute()
+
+    digest = media_hash(media_path)
+    result = transcript_cache.get(digest, options)
+    if result is not None:
+        print(f"[转录缓存] 命中: {Path(media_path).name}")
+        return result
+
+    result = compute()
+    transcript_cache.put(digest, options, result)
+    return result
@@ -1,13 +1,27 @@
 import os
-import re
+import sys
 import time
-import queue
+import socket
 import threading
 import subprocess
 from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
 from watchdog.events import FileSystemEventHandler
 from pathlib import Path
-from datetime import datetime
+
+# 确保项目根目录和src目录在导入路径中(支持脚本运行和作为video.src模块导入)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from config_loader import config
+from pipeline_worker import PipelineWorker
+from job_queue import JobQueue, LeaseKeeper, video_fingerprint
+from cluster import ClusterClaims, get_cluster_settings
+from artifact_index import ArtifactIndex
+from async_logger import AsyncLogger
 
 # 配置参数
 SCRIPT_DIR = Path(__file__).parent.parent
@@ -16,40 +30,213 @@ OUTPUT_DIR = str(SCRIPT_DIR / "output")
 SUBTITLES_DIR = str(SCRIPT_DIR / "subtitles")
 SUPPORTED_EXTS = [".mp4", ".mkv", ".avi", ".mov", ".flv", ".webm", ""]  # 空字符串表示无后缀
 REPORT_SUFFIXES = ["_report.txt"]
-SUBTITLE_SUFFIX = "_subtitles.txt"
 LOG_FILE = str(SCRIPT_DIR / "video_processor.log")
+# 分析流水线按占用的资源拆成几步，每步在对应资源的工作线程中以main.py --stages执行
+# asr: 本地CPU语音识别；llm: DeepSeek请求；vision: Ollama视觉模型
+PIPELINE_STEPS = [
+    ("asr", ["audio", "transcribe"]),
+    ("llm", ["analyze"]),
+    ("vision", ["vision"]),
+    ("llm", ["report"]),
+]
+DEFAULT_WORKERS = {"asr": 1, "llm": 2, "vision": 1}
+
+
+def get_execution_mode():
+    """任务执行方式: process为常驻工作进程内调用流水线，subprocess为每步启动一次main.py"""
+    return config.get_video_config().get("monitor", {}).get("execution", "process")
+
+
+def get_debounce_settings():
+    """读取文件事件合并配置"""
+    settings = config.get_video_config().get("monitor", {}).get("debounce", {})
+    return {
+        "window_seconds": float(settings.get("window_seconds", 2)),
+        "stable_seconds": float(settings.get("stable_seconds", 5)),
+        "full_scan_minutes": float(settings.get("full_scan_minutes", 60)),
+    }
+
+
+def in_directory(path, directory):
+    """path是否位于directory(含子目录)下"""
+    return Path(directory).resolve() in Path(path).resolve().parents
+
+
+def input_folder(video_path):
+    """视频所在的输入子目录(第一级)，直接位于input目录下的视频为"." """
+    try:
+        relative = Path(video_path).resolve().relative_to(Path(INPUT_DIR).resolve())
+    except ValueError:
+        return "."
+    return relative.parts[0] if len(relative.parts) > 1 else "."
+
+
+class EventDebouncer:
+    """合并文件系统事件
+
+    - 视频文件: 出现或变化后记录大小和修改时间，连续stable_seconds秒不变(复制完成)才加入处理队列
+    - 报告、字幕和视频的增删等变化: 收集到集合中，每个窗口(window_seconds)最多触发一次增量的孤儿文件检查
+    - 每隔full_scan_seconds做一次完整扫描，修正遗漏事件造成的索引偏差(为0时不做)
+    """
+
+    def __init__(self, processor, window_seconds=2.0, stable_seconds=5.0, full_scan_seconds=3600.0):
+        self.processor = processor
+        self.window_seconds = window_seconds
+        self.stable_seconds = stable_seconds
+        self.full_scan_seconds = full_scan_seconds
+        self.last_full_scan = time.time()
+        self.lock = threading.Lock()
+        self.pending = {}  # 视频路径 -> ((大小, 修改时间), 首次观察到该状态的时间)，None表示待观察
+        self.changed = set()
+        self.thread = threading.Thread(target=self.run, name="debouncer", daemon=True)
+
+    def video_event(self, path):
+        """视频出现或被写入，重新开始稳定性观察"""
+        with self.lock:
+            self.pending[str(path)] = None
+
+    def change_event(self, path):
+        """需要检查孤儿文件的变化"""
+        with self.lock:
+            self.changed.add(str(path))
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        while self.processor.running:
+            time.sleep(self.window_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                self.processor.log(f"Debouncer error: {str(e)}", "ERROR")
+
+    def flush(self):
+        """检查待观察的视频并处理本窗口内合并的变化"""
+        now = time.time()
+        ready = []
+        with self.lock:
+            observations = list(self.pending.items())
+            changed, self.changed = self.changed, set()
+
+        for path, observed in observations:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self._forget(path, observed)
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            with self.lock:
+                if self.pending.get(path, observed) != observed:
+                    continue  # 检查期间又有新事件
+                if observed is None or observed[0] != signature:
+                    self.pending[path] = (signature, now)
+                elif now - observed[1] >= self.stable_seconds:
+                    del self.pending[path]
+                    ready.append(path)
+
+        for path in ready:
+            if os.path.isfile(path):
+                self.processor.add_to_queue(Path(path))
+        if changed:
+            self.processor.reconcile(changed)
+        if self.full_scan_seconds > 0 and now - self.last_full_scan >= self.full_scan_seconds:
+            self.last_full_scan = now
+            self.processor.clean_orphaned_reports()
+
+    def _forget(self, path, observed):
+        with self.lock:
+            if self.pending.get(path, observed) == observed:
+                self.pending.pop(path, None)
+
+
+def get_log_settings():
+    """读取监控日志配置"""
+    settings = config.get_video_config().get("monitor", {}).get("log", {})
+    return {
+        "level": settings.get("level", "INFO"),
+        "max_queue": int(settings.get("max_queue", 10000)),
+        "max_bytes": int(float(settings.get("max_mb", 10)) * 1024 * 1024),
+        "backups": int(settings.get("backups", 5)),
+        "rotate_seconds": float(settings.get("rotate_hours", 24)) * 3600,
+        "console": settings.get("console", True),
+    }
+
+
+def get_worker_counts():
+    """读取各类资源的并发任务数"""
+    workers = config.get_video_config().get("monitor", {}).get("workers", {})
+    return {resource: max(1, int(workers.get(resource, count))) for resource, count in DEFAULT_WORKERS.items()}
+
 
 class VideoProcessor:
+    """监控input目录并调度视频分析
+
+    每类资源有固定数量的工作线程，从持久化任务队列中领取该资源的步骤，视频完成一步后进入下一步所需资源的队列，
+    因此一个视频做语音识别时，另一个视频可以同时生成报告。各资源按配置的调度策略(先来先服务、短视频优先、子目录公平)选择视频；
+    服务重启后排队和执行中的步骤从队列中恢复，失败的步骤按退避时间重试。
+    """
+
     def __init__(self):
-        self.queue = queue.PriorityQueue()  # (timestamp, video_path)
+        self.logger = AsyncLogger(LOG_FILE, **get_log_settings())
+        self.worker_counts = get_worker_counts()
+        self.job_queue = JobQueue()
+        # 有新步骤进入某资源的队列时唤醒该资源的工作线程
+        self.wakeups = {resource: threading.Event() for resource in self.worker_counts}
         self.lock = threading.Lock()
         self.running = True
-        self.currently_processing = None
         self.processed_files = set()
+        self.workers = []
+        debounce = get_debounce_settings()
+        self.debouncer = EventDebouncer(
+            self, debounce["window_seconds"], debounce["stable_seconds"], debounce["full_scan_minutes"] * 60
+        )
+        self.artifacts = ArtifactIndex(INPUT_DIR, [OUTPUT_DIR, SUBTITLES_DIR], SUPPORTED_EXTS)
+        # 多节点共享input目录时通过认领文件保证每个视频只由一个节点处理
+        cluster = get_cluster_settings()
+        self.claims = ClusterClaims(INPUT_DIR, cluster).start() if cluster["enabled"] else None
         
-        # 初始化时扫描已有文件
+        # 初始化时扫描已有文件(同样等待文件稳定后才加入队列)
         self.initial_scan()
         # 启动时立即清理孤儿报告
         self.log("Performing initial cleanup...")
         self.clean_orphaned_reports()
 
     def initial_scan(self):
-        """初始化时扫描input目录"""
-        for video_path in Path(INPUT_DIR).glob("*"):
+        """初始化时扫描input目录(含子目录)"""
+        for video_path in Path(INPUT_DIR).rglob("*"):
             video_path = Path(video_path)  # 确保Path对象
-            if video_path.suffix.lower() in SUPPORTED_EXTS:
-                self.add_to_queue(video_path)
+            if self.claims and in_directory(video_path, self.claims.dir):
+                continue
+            if video_path.is_file() and video_path.suffix.lower() in SUPPORTED_EXTS:
+                self.debouncer.video_event(video_path)
 
     def add_to_queue(self, video_path):
         """添加视频到处理队列"""
         if not self.should_process(video_path):
             return
             
-        timestamp = os.path.getctime(video_path)
         with self.lock:
-            if str(video_path) not in self.processed_files:
-                self.queue.put((timestamp, str(video_path)))
-                self.log(f"Added to queue: {video_path.name}")
+            if str(video_path.resolve()) in self.processed_files:
+                return
+        try:
+            added = self.job_queue.enqueue(
+                video_path.resolve(), os.path.getctime(video_path), PIPELINE_STEPS[0][0], input_folder(video_path)
+            )
+        except FileNotFoundError:
+            return
+        if added:
+            self.wakeups[PIPELINE_STEPS[0][0]].set()
+            self.log(f"Added to queue: {video_path.name}", video=video_path.name)
+
+    def reconcile(self, changed_paths):
+        """增量处理一个窗口内合并的文件变化：更新索引，只检查受影响视频名的产物"""
+        keys = set()
+        for path in changed_paths:
+            keys |= self.artifacts.update(path)
+        removed_count = self.remove_orphans(self.artifacts.orphans(keys))
+        if removed_count:
+            self.log(f"Reconciled {len(changed_paths)} file changes, removed {removed_count} orphaned files")
 
     def should_process(self, video_path):
         """检查是否需要处理该视频"""
@@ -67,163 +254,218 @@ class VideoProcessor:
                 
         return True
 
-    def process_next(self):
-        """处理队列中的下一个视频"""
+    def start_workers(self):
+        """为每类资源启动对应数量的工作线程"""
+        for resource, count in self.worker_counts.items():
+            for index in range(count):
+                worker = threading.Thread(
+                    target=self.process_next, args=(resource,), name=f"{resource}-{index}", daemon=True
+                )
+                worker.start()
+                self.workers.append(worker)
+        self.log(f"Workers started: {self.worker_counts}")
+
+    def process_next(self, resource):
+        """循环处理指定资源队列中的步骤"""
+        worker = PipelineWorker(threading.current_thread().name) if get_execution_mode() == "process" else None
+        try:
+            self._process_loop(resource, worker)
+        finally:
+            if worker:
+                worker.close()
+
+    def run_step(self, worker, video_path, stages, abort=None):
+        """执行一步，失败时抛出异常；abort(threading.Event)被设置时终止该步骤"""
+        if worker:
+            worker.run(video_path, stages, abort)
+            return
+        cmd = ["python", str(SCRIPT_DIR/"src"/"main.py"), video_path, "--stages", ",".join(stages)]
+        proc = subprocess.Popen(cmd)
+        if abort is None:
+            proc.wait()
+        while proc.poll() is None:
+            if abort.wait(1):
+                proc.kill()
+                proc.wait()
+                raise RuntimeError(f"任务已中止: {Path(video_path).name}")
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+    def claim_in_cluster(self, task, owner):
+        """多节点部署时在共享目录中认领视频，返回是否由本节点执行该步骤"""
+        if self.claims is None:
+            return True
+        video_path = task["video_path"]
+        name = Path(video_path).name
+        try:
+            outcome = self.claims.acquire(video_path, video_fingerprint(video_path))
+        except OSError as e:
+            self.log(f"Cluster claim error: {str(e)}", "ERROR", video=name)
+            outcome = "busy"
+        if outcome == "acquired":
+            return True
+        if outcome == "busy":
+            # 其他节点处理中，过一段时间再检查(持有者失效时接管)
+            self.job_queue.defer(task["id"], owner, self.claims.settings["stale_seconds"])
+            self.log(f"Claimed by another node: {name}", "DEBUG", video=name)
+        else:
+            self.job_queue.settle(task["id"], owner, outcome, f"{outcome} on another node")
+            self.log(f"Already {outcome} on another node: {name}", video=name)
+        return False
+
+    def _process_loop(self, resource, worker):
+        """从任务队列领取本资源的步骤执行，成功后把视频放入下一步的队列"""
+        owner = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
         while self.running:
+            task = self.job_queue.claim(resource, owner)
+            if task is None:
+                # 队列空时等待唤醒，最多5秒后重新检查(退避结束和租约过期的步骤)
+                self.wakeups[resource].wait(5)
+                self.wakeups[resource].clear()
+                continue
+
+            if not self.claim_in_cluster(task, owner):
+                continue
+
+            step, video_path = task["step"], task["video_path"]
+            _, stages = PIPELINE_STEPS[step]
+            step_name = "+".join(stages)
+            name = Path(video_path).name
+            started = time.time()
+            # 多节点部署时认领被其他节点接管则中止本步骤
+            abort = self.claims.lost_event(video_path) if self.claims else None
             try:
-                _, video_path = self.queue.get_nowait()
-                self.currently_processing = video_path
-                
-                try:
-                    self.log(f"Start processing: {Path(video_path).name}")
-                    subprocess.run(
-                        ["python", str(SCRIPT_DIR/"src"/"main.py"), video_path],
-                        check=True
-                    )
+                self.log(f"Start {step_name}: {name}", video=name, step=step_name, video_duration=task["duration"])
+                with LeaseKeeper(self.job_queue, task["id"], owner):
+                    self.run_step(worker, video_path, stages, abort)
+                if self.claims and not self.claims.holds(video_path):
+                    raise RuntimeError(f"认领已被其他节点接管: {name}")
+            except Exception as e:
+                if self.claims and not self.claims.holds(video_path):
+                    # 由接管的节点继续处理，本节点不提交结果也不计入重试次数
+                    self.log(f"Claim lost, discarded {step_name}: {name}", "WARNING", video=name, step=step_name)
+                    self.job_queue.defer(task["id"], owner, self.claims.settings["stale_seconds"])
+                    continue
+                if isinstance(e, (subprocess.CalledProcessError, RuntimeError)):
+                    self.log(f"Error processing {video_path}: {str(e)}", "ERROR", video=name, step=step_name)
+                else:
+                    self.log(f"Unexpected error: {str(e)}", "ERROR", video=name, step=step_name)
+                self.job_queue.record_run(task["id"], step, step_name, started, False, str(e))
+                status = self.job_queue.fail(task["id"], owner, e)
+                if status == "failed":
+                    self.log(f"Giving up after {task['attempts'] + 1} attempts: {name}", "ERROR",
+                             video=name, step=step_name, attempts=task["attempts"] + 1)
+                    if self.claims:
+                        self.claims.release(video_path, "failed")
+                    self.debouncer.change_event(video_path)
+                else:
+                    self.log(f"Will retry {step_name} (attempt {task['attempts'] + 1} failed): {name}", "WARNING",
+                             video=name, step=step_name, attempts=task["attempts"] + 1)
+                continue
+
+            duration = time.time() - started
+            self.log(f"Finished {step_name} in {duration:.1f}s: {name}", video=name, step=step_name,
+                     duration=round(duration, 3))
+            self.job_queue.record_run(task["id"], step, step_name, started, True)
+            if step + 1 < len(PIPELINE_STEPS):
+                self.job_queue.complete(task["id"], owner, PIPELINE_STEPS[step + 1][0])
+                self.wakeups[PIPELINE_STEPS[step + 1][0]].set()
+            else:
+                self.job_queue.complete(task["id"], owner)
+                if self.claims:
+                    self.claims.release(video_path, "done")
+                with self.lock:
                     self.processed_files.add(video_path)
-                    self.log(f"Finished processing: {Path(video_path).name}")
-                except subprocess.CalledProcessError as e:
-                    self.log(f"Error processing {video_path}: {str(e)}")
-                except Exception as e:
-                    self.log(f"Unexpected error: {str(e)}")
-                    
-                self.currently_processing = None
-                self.clean_orphaned_reports()
-                
-            except queue.Empty:
-                time.sleep(5)  # 队列空时短暂等待
+                self.log(f"Finished processing: {name}", video=name)
+                self.debouncer.change_event(video_path)
 
     def clean_orphaned_reports(self):
-        """清理没有对应视频的报告文件和字幕文件"""
-        self.log("Starting orphaned files cleanup...")
-        report_count = 0
-        removed_count = 0
-        
+        """完整扫描: 重建产物索引并清理所有没有对应视频的报告和字幕文件(启动时和定期一致性检查)"""
+        self.log("Starting orphaned files cleanup...", "DEBUG")
+        self.artifacts.rebuild()
+        removed_count = self.remove_orphans(self.artifacts.orphans())
+        video_count, artifact_count = self.artifacts.counts()
+        self.log(f"Cleanup completed. Indexed {video_count} videos and {artifact_count} files, "
+                 f"removed {removed_count} orphaned files.")
 
-        for report_path in Path(OUTPUT_DIR).glob("*_report.txt"):
-            report_path = Path(report_path)  # 确保Path对象
-            report_count += 1
-            
-            # 统一文件名匹配逻辑
-            video_stem = re.sub(r'_report(\.txt)?$', '', report_path.stem)
-            # 保留常见标点符号(!?'等)但不转义
-            video_stem = re.sub(r'([^\w\s\[\]!?\'])', r'\\\1', video_stem)
-            # 处理路径中的空格
-            video_stem = video_stem.replace('\\ ', ' ')
-            
-            self.log(f"Processing report: {report_path.name}")
-            self.log(f"Raw video stem: {report_path.stem}")
-            self.log(f"Cleaned video stem: {video_stem}")
-            
-            video_exists = False
-            for ext in SUPPORTED_EXTS:
-                video_path = Path(INPUT_DIR) / f"{video_stem}{ext}"
-                # 规范化路径处理
-                try:
-                    normalized_path = video_path.resolve()
-                    self.log(f"Checking normalized path: {normalized_path}")
-                    if normalized_path.exists():
-                        video_exists = True
-                        self.log(f"Video exists at: {normalized_path}")
-                        break
-                except Exception as e:
-                    self.log(f"Path resolution error: {str(e)}")
-            
-            if not video_exists:
-                try:
-                    report_path.unlink()
-                    removed_count += 1
-                    self.log(f"Removed orphaned report: {report_path.name}")
-                except PermissionError as e:
-                    self.log(f"Permission denied when removing {report_path.name}: {str(e)}")
-                except FileNotFoundError:
-                    pass  # 文件已被其他进程删除
-                except Exception as e:
-                    self.log(f"Unexpected error removing {report_path.name}: {str(e)}")
-
-        # 清理字幕文件
-        for subtitle_path in Path(SUBTITLES_DIR).glob(f"*{SUBTITLE_SUFFIX}"):
-            subtitle_path = Path(subtitle_path)
-            report_count += 1
-            
-            video_stem = subtitle_path.stem.replace(SUBTITLE_SUFFIX.replace(".txt", ""), "")
-            # 统一文件名处理逻辑
-            video_stem = re.sub(r'_final$', '', video_stem)
-            # 保留常见标点符号(!?'等)但不转义
-            video_stem = re.sub(r'([^\w\s\[\]!?\'])', r'\\\1', video_stem)
-            # 处理路径中的空格
-            video_stem = video_stem.replace('\\ ', ' ')
-            
-            self.log(f"Processing subtitle: {subtitle_path.name}")
-            self.log(f"Raw video stem: {subtitle_path.stem}")
-            self.log(f"Cleaned video stem: {video_stem}")
-            
-            video_exists = False
-            for ext in SUPPORTED_EXTS:
-                video_path = Path(INPUT_DIR) / f"{video_stem}{ext}"
-                # 规范化路径处理
-                try:
-                    normalized_path = video_path.resolve()
-                    self.log(f"Checking normalized path: {normalized_path}")
-                    if normalized_path.exists():
-                        video_exists = True
-                        self.log(f"Video exists at: {normalized_path}")
-                        break
-                except Exception as e:
-                    self.log(f"Path resolution error: {str(e)}")
-            
-            if not video_exists:
-                try:
-                    subtitle_path.unlink()
-                    removed_count += 1
-                    self.log(f"Removed orphaned subtitle: {subtitle_path.name}")
-                except PermissionError as e:
-                    self.log(f"Permission denied when removing {subtitle_path.name}: {str(e)}")
-                except FileNotFoundError:
-                    pass
-                except Exception as e:
-                    self.log(f"Unexpected error removing {subtitle_path.name}: {str(e)}")
-        
-        self.log(f"Cleanup completed. Scanned {report_count} files, removed {removed_count} orphaned files.")
+    def remove_orphans(self, orphan_paths):
+        """删除孤儿文件并更新索引，返回删除数量"""
+        removed_count = 0
+        for path in orphan_paths:
+            name = Path(path).name
+            try:
+                Path(path).unlink()
+                removed_count += 1
+                self.log(f"Removed orphaned file: {name}", file=name)
+            except PermissionError as e:
+                self.log(f"Permission denied when removing {name}: {str(e)}", "WARNING", file=name)
+                continue
+            except FileNotFoundError:
+                pass  # 文件已被其他进程删除
+            except Exception as e:
+                self.log(f"Unexpected error removing {name}: {str(e)}", "ERROR", file=name)
+                continue
+            self.artifacts.discard(path)
+        return removed_count
 
-    def log(self, message):
-        """记录日志"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] {message}\n"
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(log_entry)
-        print(log_entry.strip())
+    def log(self, message, level="INFO", **fields):
+        """记录日志(由后台线程异步写入)"""
+        self.logger.log(message, level, **fields)
 
 class VideoHandler(FileSystemEventHandler):
+    """把文件系统事件交给EventDebouncer合并处理"""
+
     def __init__(self, processor):
         self.processor = processor
+        self.debouncer = processor.debouncer
+
+    def _written(self, path):
+        if in_directory(path, INPUT_DIR) and Path(path).suffix.lower() in SUPPORTED_EXTS:
+            self.debouncer.video_event(path)
+        # 视频也要更新产物索引中的视频名
+        self.debouncer.change_event(path)
+
+    def _removed(self, path):
+        if in_directory(path, INPUT_DIR):
+            self.processor.job_queue.remove(Path(path).resolve())
+            if self.processor.claims and Path(path).suffix.lower() in SUPPORTED_EXTS:
+                self.processor.claims.forget(path)
+        self.debouncer.change_event(path)
 
     def on_created(self, event):
         if not event.is_directory:
-            self.processor.add_to_queue(Path(event.src_path))
+            self._written(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._written(event.src_path)
 
     def on_deleted(self, event):
         if not event.is_directory:
-            self.processor.clean_orphaned_reports()
-            
-    def on_modified(self, event):
-        if not event.is_directory and Path(event.src_path).parent == Path(SUBTITLES_DIR):
-            self.processor.clean_orphaned_reports()
+            self._removed(event.src_path)
+
+    def on_moved(self, event):
+        # 复制工具常先写临时文件再重命名
+        if not event.is_directory:
+            self._removed(event.src_path)
+            self._written(event.dest_path)
 
 def main():
     processor = VideoProcessor()
     
     # 启动文件监控
     event_handler = VideoHandler(processor)
-    observer = Observer()
+    # NFS上inotify收不到其他节点写入的事件，多节点部署时改为轮询
+    observer = PollingObserver() if processor.claims else Observer()
     observer.schedule(event_handler, INPUT_DIR, recursive=True)
     observer.schedule(event_handler, SUBTITLES_DIR, recursive=True)
+    # 报告目录的事件用于维护产物索引
+    observer.schedule(event_handler, OUTPUT_DIR, recursive=False)
     observer.start()
     
-    # 启动处理线程
-    process_thread = threading.Thread(target=processor.process_next)
-    process_thread.daemon = True
-    process_thread.start()
+    # 启动事件合并线程和各资源的工作线程
+    processor.debouncer.start()
+    processor.start_workers()
     
     try:
         while True:
@@ -231,9 +473,13 @@ def main():
     except KeyboardInterrupt:
         processor.running = False
         observer.stop()
-        process_thread.join()
+        for worker in processor.workers:
+            worker.join()
         observer.join()
-        print("Processor stopped gracefully")
+        if processor.claims:
+            processor.claims.stop()
+        processor.log("Processor stopped gracefully")
+        processor.logger.close()
 
 if __name__ == "__main__":
     main()
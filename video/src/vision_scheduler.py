@@ -0,0 +1,210 @@
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+# 确保项目根目录和src目录在导入路径中(支持脚本运行和作为video.src模块导入)
+SRC_DIR = Path(__file__).parent
+BASE_DIR = SRC_DIR.parent.parent
+for _path in (str(BASE_DIR), str(SRC_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from config_loader import config
+from frame_dedup import frame_hash_hex
+
+DEFAULT_CACHE_PATH = BASE_DIR / "video" / "cache" / "vision.sqlite"
+# 视为Ollama过载的HTTP状态码
+SATURATED_STATUS = (429, 503)
+
+
+class VisionCache:
+    """按模型名、提示词和帧感知哈希寻址的视觉描述缓存(SQLite)"""
+
+    def __init__(self, db_path=None, max_entries=None, enabled=None):
+        cache_config = config.get_ollama_config().get("vision_cache", {})
+        db_path = Path(db_path or cache_config.get("path") or DEFAULT_CACHE_PATH)
+        if not db_path.is_absolute():
+            db_path = BASE_DIR / db_path
+        self.db_path = db_path
+        self.max_entries = int(max_entries or cache_config.get("max_entries", 50000))
+        self.enabled = cache_config.get("enabled", True) if enabled is None else enabled
+        if self.enabled:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS vision_cache ("
+                    "key TEXT PRIMARY KEY, model TEXT, description TEXT, created_at REAL, accessed_at REAL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_vision_accessed ON vision_cache(accessed_at)")
+
+    def _connect(self):
+        # 每次操作使用独立连接，允许多个线程同时读写
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    @staticmethod
+    def make_key(model, prompt, frame_hashes):
+        payload = json.dumps([model, prompt, frame_hashes], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._connect() as conn:
+            row = conn.execute("SELECT description FROM vision_cache WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("UPDATE vision_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return row[0] if row else None
+
+    def put(self, key, model, description):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO vision_cache VALUES (?, ?, ?, ?, ?)",
+                (key, model, description, now, now)
+            )
+            # 超出条目上限时删除最久未访问的记录
+            conn.execute(
+                "DELETE FROM vision_cache WHERE key IN ("
+                "SELECT key FROM vision_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+
+class AdaptiveLimiter:
+    """线程安全的自适应并发限制
+
+    成功请求累计到当前上限后并发数加一，Ollama过载时并发数减半并在退避期内暂停发放许可(AIMD)。
+    进程内所有视觉请求共享同一个限制器，多个分段并发时总在途请求数仍受控。
+    """
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = self.max_limit
+        self.in_flight = 0
+        self.successes = 0
+        self.paused_until = 0.0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while True:
+                wait = self.paused_until - time.time()
+                if wait <= 0 and self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                self.cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, success=True, saturated=False, backoff=0.0):
+        with self.cond:
+            self.in_flight -= 1
+            if saturated:
+                self.limit = max(self.min_limit, self.limit // 2)
+                self.successes = 0
+                self.paused_until = max(self.paused_until, time.time() + backoff)
+                print(f"[视觉调度] Ollama过载，并发数降为{self.limit}，暂停{backoff:.1f}秒")
+            elif success:
+                self.successes += 1
+                if self.successes >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self.successes = 0
+            self.cond.notify_all()
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """进程内共享的Ollama并发限制器"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AdaptiveLimiter(int(config.get_ollama_config().get("max_in_flight", 2)))
+        return _limiter
+
+
+def is_saturated(error):
+    """判断异常是否表示Ollama过载(排队已满、限流或超时)"""
+    if getattr(error, "status_code", None) in SATURATED_STATUS:
+        return True
+    name = type(error).__name__.lower()
+    return "timeout" in name or "busy" in str(error).lower()
+
+
+class VisionScheduler:
+    """并发调度Ollama视觉请求，命中缓存的批次直接返回"""
+
+    def __init__(self, client, model=None, limiter=None, cache=None, max_retries=4, backoff_seconds=2.0):
+        ollama_config = config.get_ollama_config()
+        self.client = client
+        self.model = model or ollama_config.get('vision_model', 'qwen2.5vl:3b')
+        self.options = {'num_thread': int(ollama_config.get('num_thread', 2))}
+        self.limiter = limiter or get_limiter()
+        self.cache = cache if cache is not None else VisionCache()
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.cache_hits = 0
+
+    async def describe(self, prompt, batch, fan_out):
+        """描述一批帧，过载时指数退避重试"""
+        async with fan_out:
+            return await self._describe(prompt, batch)
+
+    async def _describe(self, prompt, batch):
+        key = None
+        if self.cache.enabled:
+            key = VisionCache.make_key(self.model, prompt, await asyncio.to_thread(frame_hash_hex, batch))
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+
+        for attempt in range(self.max_retries + 1):
+            await asyncio.to_thread(self.limiter.acquire)
+            try:
+                response = await asyncio.to_thread(
+                    self.client.generate,
+                    model=self.model,
+                    prompt=prompt,
+                    images=batch,
+                    options=self.options
+                )
+            except Exception as e:
+                saturated = is_saturated(e) and attempt < self.max_retries
+                backoff = self.backoff_seconds * (2 ** attempt) * random.uniform(0.8, 1.2)
+                self.limiter.release(success=False, saturated=saturated, backoff=backoff)
+                if not saturated:
+                    raise
+                await asyncio.sleep(backoff)
+                continue
+
+            self.limiter.release()
+            description = response['response']
+            if key:
+                await asyncio.to_thread(self.cache.put, key, self.model, description)
+            return description
+
+    async def describe_all(self, prompt, batches):
+        """并发描述所有批次，结果按输入顺序返回，失败的批次对应异常对象"""
+        # 限制同时等待许可的协程数，避免阻塞的acquire占满默认线程池
+        fan_out = asyncio.Semaphore(self.limiter.max_limit)
+        return await asyncio.gather(
+            *(self.describe(prompt, batch, fan_out) for batch in batches),
+            return_exceptions=True
+        )
+
+    def run(self, prompt, batches):
+        """同步入口(每次调用使用独立的事件循环，可在线程池中调用)"""
+        results = asyncio.run(self.describe_all(prompt, batches))
+        if self.cache_hits:
+            print(f"[视觉缓存] 命中{self.cache_hits}/{len(batches)}批")
+        return results